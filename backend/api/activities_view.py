@@ -2,8 +2,9 @@ import json
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
+from .imports import detect_format, iter_rows
 from .services import ActivityService
-from .views import _api_error, _parse_body, _json_response
+from .views import _api_error, _parse_body, _parse_rows, _json_response
 
 @csrf_exempt
 @require_http_methods(["GET", "POST"])
@@ -25,6 +26,31 @@ def activities_list(request):
         except Exception as e:
             return _api_error(str(e), 500)
 
+@csrf_exempt
+@require_http_methods(["POST"])
+def activities_import(request):
+    """Bulk import: CSV (text/csv or ?format=csv) or NDJSON, read line by line; a JSON array also works."""
+    try:
+        fmt = detect_format(request.content_type, fmt=request.GET.get("format"))
+    except ValueError as e:
+        return _api_error(str(e), 400)
+    if request.content_type == "application/json" and not request.GET.get("format"):
+        rows = _parse_rows(request)
+        if rows is None:
+            return _api_error("Expected a JSON array of activities", 400)
+    else:
+        rows = iter_rows(request, fmt)
+    try:
+        batch_size = max(1, min(int(request.GET.get("batchSize") or 1000), 5000))
+    except ValueError:
+        return _api_error("batchSize must be an integer", 400)
+    try:
+        report = ActivityService.bulk_import(rows, batch_size=batch_size)
+    except Exception as e:
+        return _api_error("Activity import failed", 500, e)
+    status = 400 if report["received"] and not report["inserted"] else 200
+    return _json_response(report, status)
+
 @csrf_exempt
 @require_http_methods(["GET", "PUT", "DELETE"])
 def activities_detail(request, pk):
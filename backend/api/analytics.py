@@ -0,0 +1,361 @@
+"""Daily per-field snapshots behind water/analysis, field-recommendations and ai/recommendations.
+
+    python manage.py precompute_analytics            # today (UTC); run from cron or a scheduled machine
+    python manage.py precompute_analytics --no-ai    # skip the AI water summary
+
+These answers depend on a field's own records and on the date, so they are stored per field
+and day in `analytics_snapshots`:
+
+    {date, kind, fieldId, version, value, computedAt}
+
+`kind` is one of KINDS and `value` is that endpoint's part for the field. `version` is the
+field's [dataVersion, updatedAt] when the row was computed: writes to a field's activities,
+water, temperature, expenses, incomes or register bump dataVersion (api/predictions.py) and
+field edits change updatedAt. A GET reads the day's rows and recomputes, and stores, only
+fields whose row is missing or whose version has moved; with nothing changed a page view is
+two queries. A row with fieldId None holds the day's water summary (AI paragraph and notes);
+its version is summary_version of all fields, so any field change makes the next page view
+request a new summary.
+"""
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta
+
+from asgiref.sync import sync_to_async
+from pymongo import UpdateOne
+
+from . import field_deletion, irrigation, llm
+from .db import get_async_collection, get_collection, generate_id
+
+logger = logging.getLogger("api.analytics")
+
+COLLECTION = "analytics_snapshots"
+KINDS = ("water", "field_recommendations", "ai_recommendations")
+KEEP_DAYS = 7
+
+IRRIGATION_GAP_DAYS = 3
+ACTIVITY_GAP_DAYS = 5
+LOSS_MIN_EXPENSE = 1000
+
+
+def _now():
+    return datetime.utcnow().isoformat() + "Z"
+
+
+# Field documents as the computations read them: dataVersion and updatedAt are needed for
+# field_version, outlines are not
+FIELD_PROJECTION = {"_id": 0, "geometry": 0, "lod": 0}
+
+
+def field_version(field):
+    return [field.get("dataVersion", 0), field.get("updatedAt")]
+
+
+def water(fields, today):
+    """{fieldId: {"entry": per-field plan, "warning": warning or None}}; None for unusable fields."""
+    usable = [f for f in fields if f.get("status") != "not_usable"]
+    plans = irrigation.schedule(usable, today)
+    out = {f.get("id", ""): None for f in fields}
+    for f in usable:
+        fid = f.get("id", "")
+        fname = f.get("name", "Field")
+        plan = plans[fid]
+        status = plan["status"]
+        warning = None
+        if status == "no_water":
+            warning = {"type": "no_water", "message": "No irrigation recorded yet. Consider logging water or schedule first irrigation.", "priority": "medium"}
+        elif status == "overdue":
+            warning = {"type": "overdue", "message": f"Soil water deficit is about {plan['depletionMm']} mm (last irrigation {plan['lastWaterDate']}). Irrigate now.", "priority": "high"}
+        elif status == "due_soon":
+            warning = {"type": "due_soon", "message": f"Last watered {plan['lastWaterDate']}. Soil water runs low by {plan['suggestedNextDate']}; plan irrigation.", "priority": "medium"}
+        out[fid] = {
+            "entry": {
+                "fieldId": fid,
+                "fieldName": fname,
+                "lastWaterDate": plan["lastWaterDate"],
+                "lastDurationMinutes": plan["lastDurationMinutes"],
+                "suggestedNextDate": plan["suggestedNextDate"],
+                "suggestedMinutes": plan["suggestedMinutes"],
+                "depletionMm": plan["depletionMm"],
+                "etcMmPerDay": plan["etcMmPerDay"],
+                "warning": None if status == "ok" else ("no_water_yet" if status == "no_water" else status),
+                "aiNote": None,
+            },
+            "warning": {"fieldId": fid, "fieldName": fname, **warning} if warning else None,
+        }
+    return out
+
+
+def _latest_date_by_field(col, field_ids):
+    """Return {fieldId: latest date} for the given fields in one aggregation."""
+    pipeline = [
+        {"$match": {"fieldId": {"$in": field_ids}}},
+        {"$group": {"_id": "$fieldId", "last": {"$max": "$date"}}},
+    ]
+    return {row["_id"]: row["last"] for row in get_collection(col).aggregate(pipeline)}
+
+
+def _days_since(date, today):
+    try:
+        return (today - datetime.strptime(date, "%Y-%m-%d").date()).days
+    except (TypeError, ValueError):
+        return None
+
+
+def field_recommendations(fields, today):
+    """{fieldId: [recommendation, ...]}: irrigation and activity reminders."""
+    field_ids = [f.get("id", "") for f in fields]
+    last_water_by_field = _latest_date_by_field("water_records", field_ids)
+    last_daily_by_field = _latest_date_by_field("daily_register", field_ids)
+
+    out = {}
+    for f in fields:
+        fid = f.get("id", "")
+        name = f.get("name", "Field")
+        recs = out[fid] = []
+        if f.get("status") == "not_usable":
+            continue
+        last_water_date = last_water_by_field.get(fid)
+        last_activity_date = last_daily_by_field.get(fid)
+        if last_water_date:
+            since = _days_since(last_water_date, today)
+            if since is not None and since >= IRRIGATION_GAP_DAYS:
+                recs.append({
+                    "fieldId": fid,
+                    "fieldName": name,
+                    "reason": "irrigation",
+                    "message": f"No irrigation since {last_water_date}. Consider watering.",
+                    "priority": "high",
+                })
+        else:
+            recs.append({
+                "fieldId": fid,
+                "fieldName": name,
+                "reason": "irrigation",
+                "message": "No water record yet. Add irrigation if needed.",
+                "priority": "medium",
+            })
+        if last_activity_date:
+            since = _days_since(last_activity_date, today)
+            if since is not None and since >= ACTIVITY_GAP_DAYS:
+                recs.append({
+                    "fieldId": fid,
+                    "fieldName": name,
+                    "reason": "activity",
+                    "message": f"No activity since {last_activity_date}. Log today's work.",
+                    "priority": "medium",
+                })
+    return out
+
+
+def _totals_by_field(col, field_ids):
+    """Return {fieldId: (total amount, record count)} for the given fields in one aggregation."""
+    pipeline = [
+        {"$match": {"fieldId": {"$in": field_ids}}},
+        {"$group": {"_id": "$fieldId", "total": {"$sum": "$amount"}, "count": {"$sum": 1}}},
+    ]
+    return {row["_id"]: (row["total"], row["count"]) for row in get_collection(col).aggregate(pipeline)}
+
+
+def ai_recommendations(fields, today):
+    """{fieldId: [recommendation, ...]}: unused land and loss-making fields."""
+    field_ids = [f.get("id", "") for f in fields]
+    expenses = _totals_by_field("expenses", field_ids)
+    incomes = _totals_by_field("incomes", field_ids)
+    now = _now()
+
+    out = {}
+    for f in fields:
+        fid = f.get("id", "")
+        recs = out[fid] = []
+        field_exp = expenses.get(fid, (0, 0))[0]
+        field_inc, income_count = incomes.get(fid, (0, 0))
+        if f.get("status") in ("available", "uncultivated") and not income_count:
+            recs.append({
+                "id": generate_id(),
+                "type": "suggestion",
+                "title": "Unused Land",
+                "message": f'Field "{f.get("name")}" is unused. Consider leasing it on Thaka or cultivating.',
+                "fieldId": fid,
+                "priority": "medium",
+                "createdAt": now,
+            })
+        if field_exp > 0 and field_inc < field_exp and field_exp > LOSS_MIN_EXPENSE:
+            recs.append({
+                "id": generate_id(),
+                "type": "warning",
+                "title": "Loss-Making Field",
+                "message": f'Field "{f.get("name")}" has high expense (Rs {field_exp}) but low income (Rs {field_inc}).',
+                "fieldId": fid,
+                "priority": "high",
+                "createdAt": now,
+            })
+    return out
+
+
+COMPUTE = {
+    "water": water,
+    "field_recommendations": field_recommendations,
+    "ai_recommendations": ai_recommendations,
+}
+
+
+def _store(kind, date, fields, values):
+    now = _now()
+    get_collection(COLLECTION).bulk_write([
+        UpdateOne(
+            {"date": date, "kind": kind, "fieldId": f.get("id", "")},
+            {"$set": {"version": field_version(f), "value": values[f.get("id", "")], "computedAt": now}},
+            upsert=True,
+        )
+        for f in fields
+    ], ordered=False)
+
+
+def _split(fields, rows):
+    """({fieldId: stored value} for fields whose row is current, [fields to recompute])."""
+    values, stale = {}, []
+    for f in fields:
+        row = rows.get(f.get("id", ""))
+        if row and row["version"] == field_version(f):
+            values[f.get("id", "")] = row["value"]
+        else:
+            stale.append(f)
+    return values, stale
+
+
+def _refresh(kind, today, stale, total):
+    fresh = COMPUTE[kind](stale, today)
+    _store(kind, today.isoformat(), stale, fresh)
+    logger.debug("analytics %s %s: recomputed %d of %d field(s)", kind, today.isoformat(), len(stale), total)
+    return fresh
+
+
+def summary_version(fields):
+    """Version of the day's summary row: changes whenever any field's version does, or the set of fields."""
+    versions = sorted((f.get("id", ""), field_version(f)) for f in fields)
+    return hashlib.sha1(json.dumps(versions, default=str).encode()).hexdigest()
+
+
+def _summary(rows, fields):
+    row = rows.get(None)
+    return row["value"] if row and row.get("version") == summary_version(fields) else None
+
+
+def load(kind, fields, today):
+    """The day's `kind` values for `fields`. Returns ({fieldId: value}, recomputed field ids, summary or None).
+
+    `fields` must carry dataVersion and updatedAt. They are read before anything is computed,
+    so a write that lands mid-way leaves an older version on the row and is picked up next time.
+    The summary is None unless it was saved for these same field versions.
+    """
+    date = today.isoformat()
+    rows = {row["fieldId"]: row for row in get_collection(COLLECTION).find({"date": date, "kind": kind}, {"_id": 0})}
+    values, stale = _split(fields, rows)
+    if stale:
+        values.update(_refresh(kind, today, stale, len(fields)))
+    return values, {f.get("id", "") for f in stale}, _summary(rows, fields)
+
+
+async def aload(kind, fields, today):
+    """load on the async driver. Stale fields are recomputed in a worker thread."""
+    col = await get_async_collection(COLLECTION)
+    rows = {row["fieldId"]: row for row in await col.find({"date": today.isoformat(), "kind": kind}, {"_id": 0}).to_list()}
+    values, stale = _split(fields, rows)
+    if stale:
+        values.update(await sync_to_async(_refresh, thread_sensitive=False)(kind, today, stale, len(fields)))
+    return values, {f.get("id", "") for f in stale}, _summary(rows, fields)
+
+
+def _summary_update(kind, today, fields, value):
+    return (
+        {"date": today.isoformat(), "kind": kind, "fieldId": None},
+        {"$set": {"version": summary_version(fields), "value": value, "computedAt": _now()}},
+    )
+
+
+def save_summary(kind, today, fields, value):
+    """Store the day's summary for `fields` as they are now (see summary_version)."""
+    get_collection(COLLECTION).update_one(*_summary_update(kind, today, fields, value), upsert=True)
+
+
+async def asave_summary(kind, today, fields, value):
+    await (await get_async_collection(COLLECTION)).update_one(*_summary_update(kind, today, fields, value), upsert=True)
+
+
+def water_prompt(per_field, today):
+    """(system, user) prompts asking the LLM for the water analysis paragraph and per-field notes."""
+    context_parts = [f"Today: {today.isoformat()}. Fields: {len(per_field)}."]
+    for p in per_field:
+        ctx = f"{p['fieldName']}: last water {p['lastWaterDate'] or 'never'}"
+        if p["lastDurationMinutes"]:
+            ctx += f" ({p['lastDurationMinutes']} min)"
+        ctx += f"; suggested next: {p['suggestedNextDate']}, {p['suggestedMinutes']} min. Warning: {p['warning'] or 'none'}."
+        context_parts.append(ctx)
+    water_context = "\n".join(context_parts)
+
+    system = """You are an irrigation advisor for Pakistan/South Asia. Respond with ONLY valid JSON, no markdown or extra text.
+    Use this exact structure: {"analysis": "2-4 sentence overall analysis of irrigation status and any risks (over/under watering). Mention which fields need attention and when to water next.", "notes": ["one sentence per field in the same order as given: when to water next and brief reason"]}
+    The "notes" array must have exactly one entry per field, in the same order as in the user message."""
+    user = f"Water data:\n{water_context}"
+    return system, user
+
+
+def water_summary(ai_content, model_used, per_field):
+    """Parse the LLM reply to water_prompt into {analysis, model, notes}."""
+    analysis_text = None
+    notes = {}
+    if ai_content:
+        try:
+            # Strip possible markdown code block
+            raw = ai_content.strip()
+            if raw.startswith("```"):
+                raw = raw.split("\n", 1)[-1] if "\n" in raw else raw[3:]
+            if raw.endswith("```"):
+                raw = raw.rsplit("```", 1)[0].strip()
+            data = json.loads(raw)
+            analysis_text = (data.get("analysis") or "").strip() or None
+            notes_list = data.get("notes") or []
+            for i, note in enumerate(notes_list):
+                if i < len(per_field) and isinstance(note, str):
+                    notes[per_field[i]["fieldId"]] = note.strip()
+        except (json.JSONDecodeError, KeyError, AttributeError):
+            analysis_text = ai_content[:800] if ai_content else None
+    return {"analysis": analysis_text, "model": model_used, "notes": notes}
+
+
+def summarize_water(per_field, today):
+    """AI paragraph and per-field notes for the water analysis: {analysis, model, notes}.
+
+    `analysis` is None when no AI reply could be used; callers fall back to built-in text.
+    """
+    ai_content, model_used, _ = llm.chat(*water_prompt(per_field, today))
+    return water_summary(ai_content, model_used, per_field)
+
+
+async def asummarize_water(per_field, today):
+    ai_content, model_used, _ = await llm.achat(*water_prompt(per_field, today))
+    return water_summary(ai_content, model_used, per_field)
+
+
+def precompute(today, summarize=True):
+    """Recompute every kind for every live field for `today`, and drop rows older than KEEP_DAYS.
+
+    With `summarize`, the water summary is requested from the LLM (summarize_water) and stored.
+    Returns {kind: number of fields}.
+    """
+    fields = list(get_collection("fields").find(field_deletion.LIVE, FIELD_PROJECTION))
+    date = today.isoformat()
+    counts = {}
+    for kind in KINDS:
+        values = COMPUTE[kind](fields, today) if fields else {}
+        if fields:
+            _store(kind, date, fields, values)
+        counts[kind] = len(fields)
+        if kind == "water" and summarize:
+            per_field = [values[f.get("id", "")]["entry"] for f in fields if values.get(f.get("id", ""))]
+            save_summary(kind, today, fields, summarize_water(per_field, today))
+    cutoff = (today - timedelta(days=KEEP_DAYS)).isoformat()
+    get_collection(COLLECTION).delete_many({"date": {"$lt": cutoff}})
+    return counts
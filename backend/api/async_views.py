@@ -0,0 +1,197 @@
+"""Async versions of the I/O-bound views, routed instead of api/views.py when ASYNC_VIEWS is on.
+
+    gunicorn config.asgi:application -k uvicorn_worker.UvicornWorker --workers 1
+
+Under WSGI each of these views holds a worker thread while it waits on Mongo or the LLM, so a
+few slow AI calls stall every other request. Here the waits happen on the event loop: Mongo
+goes through the async driver (db.get_async_collection) with independent reads issued
+together, and the LLM through llm.achat (a shared httpx.AsyncClient), so one worker can
+hold hundreds of them. Prompts and responses come from the same helpers as the sync views. What is still
+synchronous (recomputing stale analytics rows, the prediction maths with its NDVI and
+irrigation-history reads) runs in a worker thread so it never blocks the loop.
+"""
+import asyncio
+import logging
+from datetime import datetime
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+
+from . import analytics, field_deletion, llm, lod, temperature
+from .db import get_async_collection
+from .predictions import prediction_cache, prediction_key
+from .views import (
+    CHAT_SYSTEM_PROMPT, DASHBOARD_LEGACY, INSIGHTS_SYSTEM_PROMPT,
+    _api_error, _build_ai_context, _built_in_insights_response, _chat_prompt, _chat_response,
+    _dashboard_payload, _insights_prompt, _insights_response, _json_response, _parse_body,
+    _prediction, _prediction_ai_prompt, _water_analysis_payload, _with_ai_summary, _zoom_projection,
+)
+
+logger = logging.getLogger("api.async_views")
+
+async def _find(name, query=None, projection=None):
+    col = await get_async_collection(name)
+    return await col.find(query or {}, projection or {'_id': 0}).to_list()
+
+
+async def _find_legacy(name):
+    try:
+        return await _find(name)
+    except Exception:
+        return []
+
+
+async def _farm_data():
+    """views._farm_data with the reads issued together."""
+    fields, expenses, incomes, water, rollups, thaka, daily = await asyncio.gather(
+        _find('fields', field_deletion.LIVE),
+        _find('expenses'),
+        _find('incomes'),
+        _find('water_records'),
+        temperature.arollups_for(),
+        _find('thaka_records'),
+        _find('daily_register'),
+    )
+    # Rollups are read for every field alongside the fields themselves; keep the live ones
+    ids = {f.get('id') for f in fields}
+    return {
+        'fields': fields,
+        'expenses': expenses,
+        'incomes': incomes,
+        'water': water,
+        'temp': {fid: rollup for fid, rollup in rollups.items() if fid in ids},
+        'thaka': thaka,
+        'daily': daily,
+    }
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+async def dashboard(request):
+    """Return all data in one response for initial load (see views.dashboard)."""
+    auth_user = getattr(request, "auth_user", None)
+    if not auth_user:
+        return _api_error("Authentication required", status=401)
+
+    try:
+        zoom = lod.parse_zoom(request.GET.get("zoom"))
+    except ValueError as e:
+        return _api_error("Invalid zoom", status=400, detail=e)
+
+    try:
+        fields, activities, thaka, temp, *legacy = await asyncio.gather(
+            _find('fields', field_deletion.LIVE, _zoom_projection(zoom)),
+            _find('activities'),
+            _find('thaka_records'),
+            temperature.alist_readings(),
+            *(_find_legacy(name) for name in DASHBOARD_LEGACY),
+        )
+        legacy = dict(zip(DASHBOARD_LEGACY, legacy))
+        return _json_response(_dashboard_payload(lod.apply(fields, zoom), activities, thaka, temp, legacy))
+    except Exception as e:
+        logger.exception("dashboard: failed to load data")
+        return _api_error("Failed to load dashboard data", status=500, detail=e)
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+async def water_analysis(request):
+    """Return water warnings, AI analysis, and per-field next-water suggestions (see views.water_analysis)."""
+    try:
+        fields = await _find('fields', field_deletion.LIVE, analytics.FIELD_PROJECTION)
+        today = datetime.utcnow().date()
+        values, recomputed, summary = await analytics.aload('water', fields, today)
+        rows = [values[f.get('id', '')] for f in fields if values.get(f.get('id', ''))]
+        per_field = [row['entry'] for row in rows]
+        warnings = [row['warning'] for row in rows if row['warning']]
+
+        if summary is None:
+            summary = await analytics.asummarize_water(per_field, today)
+            await analytics.asave_summary('water', today, fields, summary)
+            recomputed = set()
+        return _json_response(_water_analysis_payload(per_field, warnings, recomputed, summary))
+    except Exception as e:
+        logger.exception("water_analysis: critical failure")
+        return _api_error("Failed to generate water analysis", detail=e)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+async def ai_insights(request):
+    """Generate AI insights. Primary: Hugging Face (HF_TOKEN). Fallback: built-in rule-based."""
+    hf_token, _ = llm.hf_config()
+    data = await _farm_data()
+    if not hf_token:
+        return _built_in_insights_response("built-in", data)
+
+    content, model_used, debug_error = await llm.achat(INSIGHTS_SYSTEM_PROMPT, _insights_prompt(_build_ai_context(data)),
+                                                       temperature=0.3)
+    if not content:
+        return _built_in_insights_response("built-in (API quota exceeded or unavailable)", data, debug_error)
+    return _insights_response(content, model_used)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+async def ai_chat(request):
+    """Chat with Hugging Face (primary); uses land data as context."""
+    body = _parse_body(request)
+    message = (body.get("message") or "").strip()
+    if not message:
+        return JsonResponse({"error": "Missing message", "reply": ""}, status=400)
+
+    context = _build_ai_context(await _farm_data())
+    return _chat_response(*await llm.achat(CHAT_SYSTEM_PROMPT, _chat_prompt(message, context)))
+
+
+async def _field_context(field_id, field=None):
+    """views._get_field_context with the per-field reads issued together."""
+    if field is None and field_id:
+        field = await (await get_async_collection('fields')).find_one(field_deletion.live({'id': field_id}), {'_id': 0})
+    if not field_id:
+        return None, [], [], [], []
+    water, temp, expenses, incomes = await asyncio.gather(
+        _find('water_records', {'fieldId': field_id}),
+        temperature.arollup_for(field_id),
+        _find('expenses', {'fieldId': field_id}),
+        _find('incomes', {'fieldId': field_id}),
+    )
+    water.sort(key=lambda x: x.get('date') or '', reverse=True)
+    return field, water, temp, expenses, incomes
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+async def predict(request):
+    """Field predictions (see views.predict); the maths runs in a worker thread."""
+    try:
+        body = _parse_body(request)
+        pred_type = body.get('type')
+        field_id = (body.get('fieldId') or '').strip()
+        data = body.get('data', {}) or {}
+        include_ai = body.get('includeAiSummary', False)
+        today = datetime.utcnow().strftime('%Y-%m-%d')
+
+        field = None
+        if field_id:
+            field = await (await get_async_collection('fields')).find_one(field_deletion.live({'id': field_id}), {'_id': 0})
+        key = prediction_key(field_id, field, pred_type, data, include_ai, today)
+        cached = prediction_cache.get(key)
+        if cached is not None:
+            return _json_response(cached)
+
+        context = await _field_context(field_id, field)
+        out, status, ai_request = await sync_to_async(_prediction, thread_sensitive=False)(
+            pred_type, field_id, context, data, include_ai, today)
+        ai_text = None
+        if ai_request:
+            ai_text, model, _ = await llm.achat(*_prediction_ai_prompt(field_id, *ai_request))
+            out, status = _with_ai_summary(pred_type, field_id, out, status, ai_text, model)
+        # Like views._run_prediction: an AI summary that could not be fetched is not cached
+        if status == 200 and (not ai_request or ai_text):
+            prediction_cache.set(key, out)
+        return _json_response(out, status)
+    except Exception as e:
+        return _json_response({'error': str(e)}, 500)
@@ -0,0 +1,240 @@
+"""Seeded farms, a Mongo command counter and one request per API route, for measuring routes.
+
+Used by `python manage.py benchmark` and by the query-budget tests:
+
+    ids = seed_farm(100)
+    for route, method, path, body in route_requests(ids):
+        with command_counter.capture() as commands:
+            ...  # issue the request; `commands` lists (command name, collection)
+
+Importing this module registers the counter with pymongo, so it sees clients created after
+the import (call db.reset_clients() to drop older ones). `temporary_mongod()` gives both a
+scratch server when no MONGO_TEST_URI is configured.
+"""
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from pymongo import monitoring
+
+from . import db as api_db, geometry, temperature
+
+# Cursor bookkeeping: these grow with result size and are not separate queries.
+IGNORED_COMMANDS = {"getMore", "killCursors", "endSessions", "ping", "hello", "isMaster"}
+
+
+class CommandCounter(monitoring.CommandListener):
+    """Records Mongo commands issued while `capture()` is active (ignores cursor bookkeeping)."""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    @contextmanager
+    def capture(self):
+        self._local.commands = []
+        try:
+            yield self._local.commands
+        finally:
+            self._local.commands = None
+
+    def started(self, event):
+        commands = getattr(self._local, "commands", None)
+        if commands is None or event.command_name in IGNORED_COMMANDS:
+            return
+        collection = event.command.get(event.command_name)
+        commands.append((event.command_name, collection if isinstance(collection, str) else None))
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+command_counter = CommandCounter()
+monitoring.register(command_counter)  # applies to clients created after import
+
+
+def seed_farm(n_fields, records_per_field=12):
+    """Insert a small synthetic farm: `n_fields` fields, each with activities, water, temperature,
+    expenses, incomes, daily register entries, NDVI statistics and one lease. Returns ids useful for routing.
+
+    Every third field only has legacy water_records (no irrigation activities), so both
+    water lookups are exercised at every size.
+    """
+    db = api_db.get_db()
+    materials = [
+        {"id": f"mat_{i}", "name": f"Material {i}", "category": "fertilizer", "unit": "kg",
+         "stock_quantity": 10_000, "price_per_unit": 50 + i}
+        for i in range(5)
+    ]
+    db["materials"].insert_many(materials)
+
+    fields, activities, water, temps, expenses, incomes, daily, thaka, transactions, ndvi = ([] for _ in range(10))
+    for i in range(n_fields):
+        fid = f"field_{i}"
+        lat, lng = 31.0 + (i // 50) * 0.01, 74.0 + (i % 50) * 0.01
+        coordinates = [{"lat": lat, "lng": lng}, {"lat": lat + 0.005, "lng": lng},
+                       {"lat": lat + 0.005, "lng": lng + 0.005}, {"lat": lat, "lng": lng + 0.005}]
+        fields.append({
+            "id": fid, "name": f"Field {i}", "area": 5 + i % 10,
+            "status": ("cultivated", "available", "thaka", "not_usable")[i % 4],
+            "coordinates": coordinates, **geometry.geometry_fields(coordinates),
+            "createdAt": "2024-01-01T00:00:00Z", "updatedAt": "2024-01-01T00:00:00Z",
+        })
+        for m in range(1, 4):
+            mean = 0.3 + (i + m) % 5 * 0.1
+            ndvi.append({"fieldId": fid, "date": f"2024-{m:02d}-15", "scene": f"scene_{m}", "mean": mean,
+                         "median": mean, "p10": mean - 0.1, "p25": mean - 0.05, "p75": mean + 0.05,
+                         "p90": mean + 0.1, "min": mean - 0.2, "max": mean + 0.2, "stdDev": 0.07,
+                         "pixelCount": 400, "coverage": 1.0, "computedAt": "2024-03-16T00:00:00Z"})
+        thaka.append({"id": f"thaka_{i}", "fieldId": fid, "tenantName": "Tenant", "startDate": "2024-01-01",
+                      "endDate": "2024-12-31", "amount": 50_000, "status": "active"})
+        for j in range(records_per_field):
+            date = f"2024-{1 + j % 12:02d}-{1 + (i + j) % 28:02d}"
+            mat_id = materials[j % len(materials)]["id"]
+            if i % 3:
+                activities.append({"id": f"act_{i}_{j}_irr", "date": date, "field_id": fid,
+                                   "activity_type": "irrigation", "quantity_used": 45, "cost": 0, "income": 0})
+            activities.append({"id": f"act_{i}_{j}_fert", "date": date, "field_id": fid,
+                               "activity_type": "fertilizer_application", "material_id": mat_id,
+                               "quantity_used": 2, "cost": 100, "income": 0})
+            water.append({"id": f"water_{i}_{j}", "fieldId": fid, "date": date, "durationMinutes": 60})
+            temps.append({"id": f"temp_{i}_{j}", "fieldId": fid, "date": date, "temperatureC": 20 + j % 15,
+                          "minTempC": 15, "maxTempC": 35})
+            expenses.append({"id": f"exp_{i}_{j}", "fieldId": fid, "category": "seeds", "amount": 1500, "date": date})
+            incomes.append({"id": f"inc_{i}_{j}", "fieldId": fid, "type": "crop", "amount": 900, "date": date})
+            daily.append({"id": f"daily_{i}_{j}", "date": date, "fieldId": fid, "activity": "weeding",
+                          "materialsUsed": [], "notes": None})
+            transactions.append({"id": f"tx_{i}_{j}", "materialId": mat_id, "type": "in", "quantity": 5,
+                                 "date": date, "fieldId": fid})
+
+    for name, docs in (("fields", fields), ("activities", activities), ("water_records", water),
+                       ("temperature_records", temps), ("expenses", expenses), ("incomes", incomes),
+                       ("daily_register", daily), ("thaka_records", thaka),
+                       ("material_transactions", transactions), ("field_ndvi", ndvi)):
+        if docs:
+            db[name].insert_many(docs, ordered=False)
+    temperature.update_rollups(temps, replace=True)
+    return {
+        "field": "field_1",
+        "material": materials[0]["id"],
+        "activity": "act_1_0_fert",
+        "thaka": "thaka_1",
+        "water": "water_1_0",
+        "transaction": "tx_1_0",
+        "daily": "daily_1_0",
+    }
+
+
+def route_requests(ids):
+    """(route, method, path, body) for every route in api/urls.py against a seed_farm farm;
+    mutating calls come last per target.
+
+    Dict bodies are sent as JSON, str bodies as CSV.
+    """
+    f, m, a, t, w, tx = ids["field"], ids["material"], ids["activity"], ids["thaka"], ids["water"], ids["transaction"]
+    d = ids["daily"]
+    return [
+        ("auth/login", "POST", "/api/auth/login", {"email": "nobody@example.com", "password": "wrong"}),
+        ("dashboard", "GET", "/api/dashboard", None),
+        ("fields", "GET", "/api/fields", None),
+        ("fields", "POST", "/api/fields", {"name": "New", "status": "available", "coordinates": [
+            {"lat": 30.0, "lng": 74.0}, {"lat": 30.01, "lng": 74.0}, {"lat": 30.01, "lng": 74.01}]}),
+        ("fields/within", "GET", "/api/fields/within?bbox=74.0,31.0,74.2,31.05", None),
+        ("fields/near", "GET", "/api/fields/near?lat=31.0&lng=74.0&radius=5000", None),
+        ("tiles/fields/<int:z>/<int:x>/<int:y>", "GET", "/api/tiles/fields/14/11559/6706", None),
+        ("fields/<str:pk>/ndvi", "GET", f"/api/fields/{f}/ndvi", None),
+        ("ndvi", "GET", "/api/ndvi", None),
+        ("fields/<str:pk>", "GET", f"/api/fields/{f}", None),
+        ("fields/<str:pk>", "PUT", f"/api/fields/{f}", {"name": "Renamed", "coordinates": [
+            {"lat": 31.0, "lng": 74.01}, {"lat": 31.005, "lng": 74.01}, {"lat": 31.005, "lng": 74.015}]}),
+        ("activities", "GET", "/api/activities", None),
+        ("activities", "POST", "/api/activities",
+         {"activity_type": "fertilizer_application", "field_id": f, "material_id": m, "quantity_used": 2}),
+        ("activities/import", "POST", "/api/activities/import",
+         "activity_type,field_id,material_id,quantity_used,date\n"
+         f"fertilizer_application,{f},{m},2,2024-06-01\nmaterial_purchase,,{m},20,2024-06-01\n"),
+        ("activities/<str:pk>", "GET", f"/api/activities/{a}", None),
+        ("activities/<str:pk>", "PUT", f"/api/activities/{a}", {"quantity_used": 3}),
+        ("activities/<str:pk>", "DELETE", f"/api/activities/{a}", None),
+        ("thaka", "GET", "/api/thaka", None),
+        ("thaka", "POST", "/api/thaka", {"fieldId": f, "tenantName": "T", "amount": 100}),
+        ("thaka/<str:pk>", "GET", f"/api/thaka/{t}", None),
+        ("thaka/<str:pk>", "PUT", f"/api/thaka/{t}", {"amount": 200}),
+        ("thaka/<str:pk>", "DELETE", f"/api/thaka/{t}", None),
+        ("temperature", "GET", "/api/temperature", None),
+        ("temperature", "POST", "/api/temperature", {"fieldId": f, "date": "2024-06-01", "temperatureC": 31}),
+        ("water", "GET", "/api/water", None),
+        ("water", "POST", "/api/water", {"fieldId": f, "date": "2024-06-01", "durationMinutes": 40}),
+        ("water/analysis", "GET", "/api/water/analysis", None),
+        ("water/<str:pk>", "GET", f"/api/water/{w}", None),
+        ("water/<str:pk>", "PUT", f"/api/water/{w}", {"durationMinutes": 50}),
+        ("water/<str:pk>", "DELETE", f"/api/water/{w}", None),
+        ("ai/recommendations", "GET", "/api/ai/recommendations", None),
+        ("ai/insights", "POST", "/api/ai/insights", {}),
+        ("ai/chat", "POST", "/api/ai/chat", {"message": "How are my fields?"}),
+        ("predict", "POST", "/api/predict", {"type": "crop_health", "fieldId": f}),
+        ("materials", "GET", "/api/materials", None),
+        ("materials", "POST", "/api/materials", {"name": "Urea", "stock_quantity": 10}),
+        ("materials/<str:pk>", "GET", f"/api/materials/{m}", None),
+        ("materials/<str:pk>", "PUT", f"/api/materials/{m}", {"price_per_unit": 60}),
+        ("materials/<str:pk>/stock", "GET", f"/api/materials/{m}/stock?date=2024-06-30", None),
+        ("material-transactions", "GET", "/api/material-transactions", None),
+        ("material-transactions", "POST", "/api/material-transactions",
+         {"materialId": m, "type": "in", "quantity": 4, "date": "2024-06-01"}),
+        ("material-transactions/<str:pk>", "GET", f"/api/material-transactions/{tx}", None),
+        ("material-transactions/<str:pk>", "PUT", f"/api/material-transactions/{tx}", {"quantity": 6}),
+        ("material-transactions/<str:pk>", "DELETE", f"/api/material-transactions/{tx}", None),
+        ("daily-register", "GET", "/api/daily-register?date=2024-01-02", None),
+        ("daily-register", "POST", "/api/daily-register", {"date": "2024-06-01", "entries": [
+            {"fieldId": f, "activity": "fertilizer", "materialsUsed": [{"materialId": m, "quantity": 1}]},
+            {"fieldId": "field_2", "activity": "weeding", "materialsUsed": []},
+        ]}),
+        ("daily-register/<str:pk>", "GET", f"/api/daily-register/{d}", None),
+        ("daily-register/<str:pk>", "PUT", f"/api/daily-register/{d}", {"notes": "checked"}),
+        ("daily-register/<str:pk>", "DELETE", f"/api/daily-register/{d}", None),
+        ("export", "GET", "/api/export", None),
+        ("export/<str:collection>", "GET", "/api/export/activities", None),
+        ("field-recommendations", "GET", "/api/field-recommendations", None),
+        ("materials/<str:pk>", "DELETE", f"/api/materials/{m}", None),
+        ("fields/<str:pk>", "DELETE", f"/api/fields/{f}", None),
+        ("fields/<str:pk>/deletion", "GET", f"/api/fields/{f}/deletion", None),
+    ]
+
+
+@contextmanager
+def temporary_mongod():
+    """Start mongod from PATH on a scratch directory and free port; yields its URI.
+
+    Raises RuntimeError when there is no mongod binary or it does not come up.
+    """
+    binary = shutil.which("mongod")
+    if not binary:
+        raise RuntimeError("no mongod binary on PATH")
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    with tempfile.TemporaryDirectory(prefix="slm-mongod-") as dbpath:
+        proc = subprocess.Popen(
+            [binary, "--dbpath", dbpath, "--port", str(port), "--bind_ip", "127.0.0.1", "--quiet"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            deadline = time.monotonic() + 30
+            while True:
+                try:
+                    socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                    break
+                except OSError:
+                    if proc.poll() is not None or time.monotonic() > deadline:
+                        raise RuntimeError("temporary mongod did not start")
+                    time.sleep(0.2)
+            yield f"mongodb://127.0.0.1:{port}"
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
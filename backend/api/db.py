@@ -1,18 +1,28 @@
 """MongoDB connection and helpers. Production-ready: timeouts, indexes, readiness check."""
+import asyncio
 import logging
 import os
 import ssl
+import weakref
 import certifi
-from pymongo import MongoClient
+from asgiref.sync import sync_to_async
+from pymongo import AsyncMongoClient, MongoClient
+from pymongo.errors import OperationFailure
+from pymongo.read_concern import ReadConcern
+from pymongo.write_concern import WriteConcern
 from django.conf import settings
 
+from .metrics import mongo_listener
+
 os.environ.setdefault("SSL_CERT_FILE", certifi.where())
 
 logger = logging.getLogger("api.db")
 
 _client = None
+_async_clients = weakref.WeakKeyDictionary()  # event loop -> AsyncMongoClient
 _db_ensured = False
 _indexes_ensured = False
+_transactions_supported = None
 
 # Required collections for the app (used by readiness check)
 REQUIRED_COLLECTIONS = [
@@ -24,24 +34,34 @@ REQUIRED_COLLECTIONS = [
 ]
 
 
+def _client_kwargs(uri):
+    kwargs = {
+        "connectTimeoutMS": getattr(settings, "MONGO_CONNECT_TIMEOUT_MS", 30000),
+        "serverSelectionTimeoutMS": getattr(settings, "MONGO_SERVER_SELECTION_TIMEOUT_MS", 30000),
+        "socketTimeoutMS": 30000,
+        "event_listeners": [mongo_listener],
+    }
+    if "mongodb+srv" in uri or "mongodb.net" in uri:
+        kwargs["tls"] = True
+        kwargs["tlsCAFile"] = certifi.where()
+        kwargs["tlsAllowInvalidCertificates"] = True
+    return kwargs
+
+
+def _mongo_uri():
+    uri = getattr(settings, "MONGO_URI", "") or ""
+    if not uri:
+        logger.warning("MONGO_URI is not set")
+        raise ValueError("MONGO_URI is not configured")
+    return uri
+
+
 def get_db():
     global _client
     if _client is None:
-        uri = getattr(settings, "MONGO_URI", "") or ""
-        if not uri:
-            logger.warning("MONGO_URI is not set")
-            raise ValueError("MONGO_URI is not configured")
-        kwargs = {
-            "connectTimeoutMS": getattr(settings, "MONGO_CONNECT_TIMEOUT_MS", 30000),
-            "serverSelectionTimeoutMS": getattr(settings, "MONGO_SERVER_SELECTION_TIMEOUT_MS", 30000),
-            "socketTimeoutMS": 30000,
-        }
-        if "mongodb+srv" in uri or "mongodb.net" in uri:
-            kwargs["tls"] = True
-            kwargs["tlsCAFile"] = certifi.where()
-            kwargs["tlsAllowInvalidCertificates"] = True
+        uri = _mongo_uri()
         try:
-            _client = MongoClient(uri, **kwargs)
+            _client = MongoClient(uri, **_client_kwargs(uri))
             logger.info("MongoDB client created (uri redacted)")
         except Exception as e:
             logger.exception("MongoDB client creation failed: %s", e)
@@ -50,6 +70,64 @@ def get_db():
     return _client[db_name]
 
 
+def get_async_db():
+    """The database on the async driver (pymongo AsyncMongoClient), for async views.
+
+    A client belongs to the event loop it was created on: under uvicorn that is one per
+    worker; elsewhere (async views called from sync code, tests) each loop gets its own.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        uri = _mongo_uri()
+        client = _async_clients[loop] = AsyncMongoClient(uri, **_client_kwargs(uri))
+        logger.info("Async MongoDB client created (uri redacted)")
+    return client[getattr(settings, "MONGO_DB", "land_management")]
+
+
+def reset_clients():
+    """Close the sync client and forget every cached connection and check (tests, benchmarks)."""
+    global _client, _db_ensured, _indexes_ensured, _transactions_supported
+    if _client is not None:
+        _client.close()
+    _client = None
+    _async_clients.clear()
+    _db_ensured = False
+    _indexes_ensured = False
+    _transactions_supported = None
+
+
+def supports_transactions():
+    """True when the deployment is a replica set or sharded cluster (Atlas always is). Cached."""
+    global _transactions_supported
+    if _transactions_supported is None:
+        try:
+            hello = get_db().client.admin.command("hello")
+            _transactions_supported = bool(hello.get("setName") or hello.get("msg") == "isdbgrid")
+        except Exception as e:
+            logger.warning("supports_transactions: check failed, writing without transactions: %s", e)
+            return False
+        if not _transactions_supported:
+            logger.info("MongoDB is standalone; multi-document writes run without transactions")
+    return _transactions_supported
+
+
+def run_in_transaction(callback):
+    """Run callback(session) in one transaction, retried on transient errors, and return its result.
+
+    On a standalone server (local development) the callback runs once with session=None.
+    The callback may run more than once, so it must not mutate state it did not create.
+    """
+    if not supports_transactions():
+        return callback(None)
+    with get_db().client.start_session() as session:
+        return session.with_transaction(
+            callback,
+            read_concern=ReadConcern("snapshot"),
+            write_concern=WriteConcern("majority"),
+        )
+
+
 def ensure_indexes():
     """Create production indexes for common queries. Idempotent. Skips unique if duplicates exist."""
     global _indexes_ensured
@@ -59,9 +137,28 @@ def ensure_indexes():
         db = get_db()
         db["activities"].create_index([("field_id", 1), ("date", -1)])
         db["activities"].create_index([("activity_type", 1)])
-        db["temperature_records"].create_index([("fieldId", 1), ("date", -1)])
+        db["temperature_buckets"].create_index([("fieldId", 1), ("month", -1)], unique=True)
+        db["temperature_rollups"].create_index("fieldId", unique=True)
+        db["water_records"].create_index([("fieldId", 1), ("date", -1)])
+        db["daily_register"].create_index([("fieldId", 1), ("date", -1)])
+        db["expenses"].create_index("fieldId")
+        db["incomes"].create_index("fieldId")
+        db["thaka_records"].create_index("fieldId")
+        db["field_deletion_jobs"].create_index([("fieldId", 1), ("createdAt", -1)])
         db["fields"].create_index("id")  # non-unique so existing duplicates don't break
         db["materials"].create_index("id")
+        db["material_transactions"].create_index("registerId")
+        db["stock_ledger"].create_index([("materialId", 1), ("date", 1)])
+        db["stock_snapshots"].create_index([("materialId", 1), ("date", -1)], unique=True)
+        db["fields"].create_index([("geometry", "2dsphere")])
+        db["field_ndvi"].create_index([("fieldId", 1), ("date", -1)])
+        db["analytics_snapshots"].create_index([("date", 1), ("kind", 1), ("fieldId", 1)], unique=True)
+        try:
+            # Bulk imports upsert on this key; older data may still hold duplicates
+            db["temperature_records"].create_index([("fieldId", 1), ("date", 1)], unique=True)
+        except OperationFailure as e:
+            logger.warning("temperature_records (fieldId, date) is not unique yet; "
+                           "run `python manage.py dedupe_temperature_records`: %s", e)
         _indexes_ensured = True
         logger.debug("Indexes ensured")
     except Exception as e:
@@ -89,6 +186,12 @@ def get_collection(name):
     return get_db()[name]
 
 
+async def get_async_collection(name):
+    if not _db_ensured:
+        await sync_to_async(ensure_database, thread_sensitive=False)()
+    return get_async_db()[name]
+
+
 def get_database_readiness():
     """
     Production readiness: connection, required collections exist, indexes present.
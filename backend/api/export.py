@@ -0,0 +1,250 @@
+"""Streaming data export: one collection (/api/export/<collection>) or everything (/api/export).
+
+Rows go straight from a Mongo cursor through a generator into the response, so memory stays
+bounded however many years of history a farm has. Formats are CSV and NDJSON, optionally
+zipped; the full archive is always a zip with one file per collection.
+
+Every row carries a `_cursor`. If a download breaks, request it again with
+`?after=<last _cursor received>` (and, for the archive, `&collection=<file it broke in>`)
+to continue where it stopped. Rows are ordered by `_id`, so rows written during the export
+either appear once or not at all.
+"""
+import csv
+import io
+import json
+import logging
+import zipfile
+from datetime import datetime
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from django.http import StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+
+from . import field_deletion, temperature
+from .db import get_collection
+from .views import FIELD_PROJECTION, _api_error
+
+logger = logging.getLogger("api.export")
+
+# Exportable collections, in archive order. Temperature goes through its storage adapter.
+COLLECTIONS = (
+    "fields", "activities", "materials", "material_transactions", "daily_register",
+    "thaka_records", "water_records", "temperature_records", "expenses", "incomes",
+)
+TEMPERATURE_COLUMNS = ("id", "fieldId", "date", "temperatureC", "minTempC", "maxTempC", "notes")
+# CSV columns: the shape each collection is written in, then any other key seen in a sample
+SCHEMA_COLUMNS = {
+    "fields": ("id", "name", "coordinates", "area", "status", "notUsableReason", "address", "locationName",
+               "createdAt", "updatedAt", "overlapsWith"),
+    "activities": ("id", "date", "field_id", "activity_type", "material_id", "quantity_used", "cost", "income",
+                   "notes", "created_at"),
+    "materials": ("id", "name", "category", "unit", "stock_quantity", "currentStock", "price_per_unit", "created_at"),
+    "material_transactions": ("id", "materialId", "type", "quantity", "date", "fieldId", "cost", "notes",
+                              "registerId"),
+    "daily_register": ("id", "date", "fieldId", "activity", "materialsUsed", "laborCost", "waterMinutes", "notes"),
+    "thaka_records": ("id", "fieldId", "tenantName", "tenantContact", "startDate", "endDate", "amount", "status"),
+    "water_records": ("id", "fieldId", "date", "durationMinutes", "notes"),
+    "temperature_records": TEMPERATURE_COLUMNS,
+    "expenses": ("id", "fieldId", "category", "amount", "description", "date"),
+    "incomes": ("id", "fieldId", "type", "amount", "description", "date"),
+}
+SAMPLE_SIZE = 1000
+# Internal keys left out of the export, as the list endpoints leave them out (_id is the cursor)
+HIDDEN = {
+    "fields": {**{k: 0 for k in FIELD_PROJECTION if k != "_id"}, "metricsHash": 0, "deleted": 0, "deletedAt": 0},
+}
+FORMATS = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+BATCH_SIZE = 1000
+CHUNK_BYTES = 64 * 1024
+
+
+def _columns(name):
+    """Known columns, then other top-level keys from the first SAMPLE_SIZE documents.
+
+    Bounded, so headers cost one small aggregation however large the collection is. A key
+    that only appears after the sample is not in the CSV; NDJSON rows carry every key.
+    """
+    columns = list(SCHEMA_COLUMNS[name])
+    if name == "temperature_records":
+        return columns
+    pipeline = [
+        {"$match": field_deletion.LIVE if name == "fields" else {}},
+        {"$limit": SAMPLE_SIZE},
+        {"$project": {"_id": 0, "k": {"$map": {"input": {"$objectToArray": "$$ROOT"}, "in": "$$this.k"}}}},
+        {"$unwind": "$k"},
+        {"$group": {"_id": "$k"}},
+    ]
+    known = {*columns, *HIDDEN.get(name, ()), "_id"}
+    return columns + sorted(row["_id"] for row in get_collection(name).aggregate(pipeline) if row["_id"] not in known)
+
+
+def _iter_docs(name, after=None):
+    """Yield (cursor, doc) ordered by _id, strictly after `after`."""
+    if name == "temperature_records":
+        yield from temperature.iter_export(after, BATCH_SIZE)
+        return
+    try:
+        query = {"_id": {"$gt": ObjectId(after)}} if after else {}
+    except InvalidId:
+        raise ValueError("invalid export cursor")
+    if name == "fields":
+        query = field_deletion.live(query)
+    for doc in get_collection(name).find(query, HIDDEN.get(name)).sort("_id", 1).batch_size(BATCH_SIZE):
+        yield str(doc.pop("_id")), doc
+
+
+def _cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    return value
+
+
+def _encode_rows(name, fmt, after=None):
+    """Yield encoded text chunks (~CHUNK_BYTES each) for one collection."""
+    buf = io.StringIO()
+    docs = _iter_docs(name, after)
+    if fmt == "csv":
+        columns = _columns(name)
+        writer = csv.writer(buf)
+        writer.writerow(["_cursor", *columns])
+        for cursor, doc in docs:
+            writer.writerow([cursor, *(_cell(doc.get(c)) for c in columns)])
+            if buf.tell() >= CHUNK_BYTES:
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+    else:
+        for cursor, doc in docs:
+            buf.write(json.dumps({"_cursor": cursor, **doc}, default=str))
+            buf.write("\n")
+            if buf.tell() >= CHUNK_BYTES:
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+
+class _ZipSink(io.RawIOBase):
+    """Unseekable write target for ZipFile; `drain()` hands back what has been written so far."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _zip_stream(members):
+    """Zip (filename, chunk iterator) pairs on the fly, yielding compressed bytes as they are produced."""
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for filename, chunks in members:
+            with zf.open(filename, mode="w", force_zip64=True) as member:
+                for chunk in chunks:
+                    member.write(chunk.encode("utf-8"))
+                    data = sink.drain()
+                    if data:
+                        yield data
+    # Remaining compressed data, data descriptors and the central directory
+    data = sink.drain()
+    if data:
+        yield data
+
+
+def _guarded(chunks, label):
+    """Log failures mid-stream; the status line is already sent, so the client just sees a short body."""
+    try:
+        yield from chunks
+    except Exception:
+        logger.exception("export %s failed mid-stream", label)
+        raise
+
+
+def _export_options(request):
+    fmt = (request.GET.get("format") or "csv").lower()
+    if fmt == "jsonl":
+        fmt = "ndjson"
+    if fmt not in FORMATS:
+        raise ValueError("format must be 'csv' or 'ndjson'")
+    zipped = (request.GET.get("zip") or "").lower() in ("1", "true", "yes")
+    return fmt, zipped, request.GET.get("after") or None
+
+
+def _check_cursor(name, after):
+    """Validate `after` up front so a bad cursor is a 400, not a broken stream."""
+    if not after:
+        return
+    oid, sep, index = after.partition(":")
+    # Only bucketed temperature cursors carry an ":<index>" suffix
+    if not ObjectId.is_valid(oid) or (sep and (name != "temperature_records" or not index.isdigit())):
+        raise ValueError("invalid export cursor")
+
+
+def _streaming_response(chunks, content_type, filename):
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    response["Cache-Control"] = "no-store"
+    response["X-Accel-Buffering"] = "no"  # let nginx-style proxies pass chunks through
+    return response
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def export_collection(request, collection):
+    """Stream one collection: ?format=csv|ndjson&zip=1&after=<cursor>."""
+    if collection not in COLLECTIONS:
+        return _api_error(f"Unknown collection '{collection}'", 404)
+    try:
+        fmt, zipped, after = _export_options(request)
+        _check_cursor(collection, after)
+    except ValueError as e:
+        return _api_error(str(e), 400)
+
+    stamp = datetime.utcnow().strftime("%Y-%m-%d")
+    filename = f"{collection}-{stamp}.{fmt}"
+    chunks = _encode_rows(collection, fmt, after)
+    if zipped:
+        return _streaming_response(
+            _guarded(_zip_stream([(filename, chunks)]), collection), "application/zip", f"{filename}.zip"
+        )
+    return _streaming_response(
+        _guarded((c.encode("utf-8") for c in chunks), collection), FORMATS[fmt], filename
+    )
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def export_archive(request):
+    """Stream every collection as one zip: ?format=csv|ndjson, resume with &collection=<name>&after=<cursor>."""
+    try:
+        fmt, _, after = _export_options(request)
+        start = request.GET.get("collection") or COLLECTIONS[0]
+        if start not in COLLECTIONS:
+            raise ValueError(f"Unknown collection '{start}'")
+        _check_cursor(start, after)
+    except ValueError as e:
+        return _api_error(str(e), 400)
+
+    names = COLLECTIONS[COLLECTIONS.index(start):]
+    members = (
+        (f"{name}.{fmt}", _encode_rows(name, fmt, after if name == start else None))
+        for name in names
+    )
+    stamp = datetime.utcnow().strftime("%Y-%m-%d")
+    return _streaming_response(_guarded(_zip_stream(members), "archive"), "application/zip",
+                               f"land-management-export-{stamp}.zip")
@@ -0,0 +1,197 @@
+"""Field deletion: tombstone immediately, cascade in the background.
+
+DELETE /api/fields/<id> marks the field `deleted: True` (every field read filters with
+`LIVE`) and records a job in `field_deletion_jobs`. A background thread then clears the
+field's records from each collection in parallel, updating the job's per-collection progress
+(GET /api/fields/<id>/deletion), and finally removes the field document itself.
+
+Every step is a delete_many on the field id, so a job can be re-run at any point:
+retrying the DELETE restarts a failed or stalled job (once the job is done the field is
+gone and a DELETE is a 404), and `python manage.py resume_field_deletions` finishes any job
+left behind by a restart. Material stock is not reverted for deleted activities; the
+material was still used. Daily register entries are undone as a register DELETE does: the
+'out' transactions linked to them (registerId) are deleted and their stock is reverted
+through api/stock.py, in one transaction where the deployment supports it.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from . import stock, temperature
+from .db import get_collection, generate_id, run_in_transaction
+from .services import _to_num
+
+logger = logging.getLogger("api.field_deletion")
+
+JOBS_COLLECTION = "field_deletion_jobs"
+
+# Filter for field reads: tombstoned fields are hidden everywhere
+LIVE = {"deleted": {"$ne": True}}
+
+# step name -> (collection, field id key); temperature goes through its storage adapter
+STEPS = {
+    "activities": ("activities", "field_id"),
+    "expenses": ("expenses", "fieldId"),
+    "incomes": ("incomes", "fieldId"),
+    "thaka_records": ("thaka_records", "fieldId"),
+    "water_records": ("water_records", "fieldId"),
+    "daily_register": ("daily_register", "fieldId"),
+    "field_ndvi": ("field_ndvi", "fieldId"),
+    "analytics_snapshots": ("analytics_snapshots", "fieldId"),
+    "temperature": (None, "fieldId"),
+}
+
+# A running job whose progress has not moved for this long is considered abandoned
+STALE_AFTER = timedelta(minutes=10)
+
+_threads = set()
+_threads_lock = threading.Lock()
+
+
+def live(query=None):
+    """`query` restricted to fields that are not being deleted."""
+    return {**(query or {}), **LIVE}
+
+
+def _now():
+    return datetime.utcnow().isoformat() + "Z"
+
+
+def _public(job):
+    if job:
+        job.pop("_id", None)
+    return job
+
+
+def get_job(field_id):
+    return _public(get_collection(JOBS_COLLECTION).find_one({"fieldId": field_id}, sort=[("createdAt", -1)]))
+
+
+def _is_stale(job):
+    if job.get("status") != "running":
+        return False
+    try:
+        updated = datetime.fromisoformat(job.get("updatedAt", "").rstrip("Z"))
+    except ValueError:
+        return True
+    return datetime.utcnow() - updated > STALE_AFTER
+
+
+def start(field_id):
+    """Tombstone the field and start its cascade. Returns the job, or None if there is no such field.
+
+    Calling it again for a field still being deleted returns the existing job, restarting it
+    if it failed or stalled; once the job is done the field no longer exists (None).
+    """
+    fields = get_collection("fields")
+    field = fields.find_one_and_update(
+        live({"id": field_id}), {"$set": {"deleted": True, "deletedAt": _now()}}, projection={"_id": 1},
+    )
+    if field is None:
+        job = get_job(field_id)
+        if job is None or job["status"] == "done":
+            return None
+        if job["status"] == "failed" or _is_stale(job):
+            run_in_background(job["id"])
+        return job
+    now = _now()
+    job = {
+        "id": generate_id(),
+        "fieldId": field_id,
+        "status": "pending",
+        "steps": {name: {"status": "pending", "deleted": 0} for name in STEPS},
+        "error": None,
+        "createdAt": now,
+        "updatedAt": now,
+    }
+    get_collection(JOBS_COLLECTION).insert_one(job)
+    run_in_background(job["id"])
+    return _public(job)
+
+
+def _delete_register(field_id):
+    """Delete the field's register entries and the 'out' transactions they generated, reverting
+    that stock. Returns the number of entries deleted."""
+    register = get_collection("daily_register")
+    transactions = get_collection("material_transactions")
+
+    def write(session):
+        ids = [d["id"] for d in register.find({"fieldId": field_id}, {"_id": 0, "id": 1}, session=session)]
+        linked = list(transactions.find(
+            {"registerId": {"$in": ids}}, {"materialId": 1, "quantity": 1, "date": 1, "registerId": 1}, session=session,
+        )) if ids else []
+        if linked:
+            # Transactions go first, so a re-run never reverts the same usage twice
+            transactions.delete_many({"_id": {"$in": [t["_id"] for t in linked]}}, session=session)
+            stock.apply_deltas([
+                (t.get("materialId"), _to_num(t.get("quantity")), t.get("date"), "daily_register", t["registerId"])
+                for t in linked
+            ], session=session)
+        return register.delete_many({"fieldId": field_id}, session=session).deleted_count
+
+    return run_in_transaction(write)
+
+
+def _run_step(jobs, job_id, field_id, name):
+    collection, key = STEPS[name]
+    if name == "temperature":
+        deleted = temperature.delete_for_field(field_id)
+    elif name == "daily_register":
+        deleted = _delete_register(field_id)
+    else:
+        deleted = get_collection(collection).delete_many({key: field_id}).deleted_count
+    jobs.update_one({"id": job_id}, {"$set": {
+        f"steps.{name}": {"status": "done", "deleted": deleted or 0}, "updatedAt": _now(),
+    }})
+
+
+def run(job_id):
+    """Run (or re-run) a job to completion in the calling thread. Returns the final status."""
+    jobs = get_collection(JOBS_COLLECTION)
+    job = jobs.find_one_and_update(
+        {"id": job_id, "status": {"$ne": "done"}},
+        {"$set": {"status": "running", "error": None, "updatedAt": _now()}},
+    )
+    if job is None:
+        return "done"
+    field_id = job["fieldId"]
+    pending = [name for name in STEPS if job.get("steps", {}).get(name, {}).get("status") != "done"]
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, len(pending))) as pool:
+            for future in [pool.submit(_run_step, jobs, job_id, field_id, name) for name in pending]:
+                future.result()
+        get_collection("fields").delete_many({"id": field_id, "deleted": True})
+    except Exception as e:
+        logger.exception("field deletion %s (field %s) failed", job_id, field_id)
+        jobs.update_one({"id": job_id}, {"$set": {"status": "failed", "error": str(e), "updatedAt": _now()}})
+        return "failed"
+    jobs.update_one({"id": job_id}, {"$set": {"status": "done", "updatedAt": _now(), "finishedAt": _now()}})
+    return "done"
+
+
+def run_in_background(job_id):
+    def target():
+        try:
+            run(job_id)
+        finally:
+            with _threads_lock:
+                _threads.discard(thread)
+
+    thread = threading.Thread(target=target, name=f"field-deletion-{job_id}", daemon=True)
+    with _threads_lock:
+        _threads.add(thread)
+    thread.start()
+    return thread
+
+
+def wait(timeout=None):
+    """Block until background deletions started by this process finish (tests, shutdown)."""
+    with _threads_lock:
+        threads = list(_threads)
+    for thread in threads:
+        thread.join(timeout)
+
+
+def unfinished_jobs():
+    return [_public(j) for j in get_collection(JOBS_COLLECTION).find({"status": {"$ne": "done"}})]
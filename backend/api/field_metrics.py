@@ -0,0 +1,121 @@
+"""Server-side field measurements: spherical area, centroid and bounding box.
+
+Computed from a field's `coordinates` on every write that changes them, so `area` no longer
+depends on what the client sent and the map can use the stored `centroid`/`bbox`:
+
+    area (acres), areaM2, centroid {lat, lng}, bbox [west, south, east, north], metricsHash
+
+Area is approximated on a spherical Earth with the Chamberlain–Duquette formula (not
+exact, but close for field-sized outlines); the centroid is the area-weighted centroid in
+a local equirectangular projection. Many outlines are measured in one vectorized NumPy
+pass (`measure_many`), and results are cached by `metricsHash`, a hash of the outline, so
+unchanged outlines are not recomputed. `python manage.py recompute_field_metrics` refreshes every field.
+"""
+import hashlib
+from collections import OrderedDict
+from threading import Lock
+
+import numpy as np
+
+from .geometry import ring
+
+EARTH_RADIUS_M = 6371008.8
+SQ_M_PER_ACRE = 4046.8564224
+
+# Stored on fields whose outline is not a polygon (area is then left as the client sent it)
+UNMEASURED = {"areaM2": None, "centroid": None, "bbox": None, "metricsHash": None}
+
+_CACHE_SIZE = 4096
+_cache = OrderedDict()  # metricsHash -> metrics
+_cache_lock = Lock()
+
+
+def outline_hash(points):
+    """Stable hash of an outline's (lng, lat) vertices."""
+    return hashlib.sha1(np.round(np.asarray(points, dtype=float), 9).tobytes()).hexdigest()
+
+
+def _measure_rings(rings):
+    """Metrics for outlines of at least 3 vertices each, in one vectorized pass."""
+    lengths = np.array([len(r) for r in rings])
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    ring_of = np.repeat(np.arange(len(rings)), lengths)
+    pts = np.radians(np.array([p for r in rings for p in r], dtype=float))
+    lng, lat = pts[:, 0], pts[:, 1]
+
+    # Index of each vertex's successor, wrapping to the start of its own ring
+    nxt = np.arange(len(pts)) + 1
+    nxt[starts + lengths - 1] = starts
+
+    # Chamberlain–Duquette approximation: R^2/2 * |sum (lng2 - lng1)(2 + sin lat1 + sin lat2)|
+    dlng = (lng[nxt] - lng + np.pi) % (2 * np.pi) - np.pi
+    excess = np.add.reduceat(dlng * (2 + np.sin(lat) + np.sin(lat[nxt])), starts)
+    area_m2 = np.abs(excess) * EARTH_RADIUS_M ** 2 / 2
+
+    # Centroid in a local projection around each ring's mean vertex
+    lat0 = np.add.reduceat(lat, starts) / lengths
+    lng0 = np.add.reduceat(lng, starts) / lengths
+    cos0 = np.cos(lat0)
+    x = (lng - lng0[ring_of]) * cos0[ring_of] * EARTH_RADIUS_M
+    y = (lat - lat0[ring_of]) * EARTH_RADIUS_M
+    cross = x * y[nxt] - x[nxt] * y
+    twice_area = np.add.reduceat(cross, starts)
+    degenerate = np.abs(twice_area) < 1e-9
+    safe = np.where(degenerate, 1.0, twice_area)
+    cx = np.where(degenerate, 0.0, np.add.reduceat((x + x[nxt]) * cross, starts) / (3 * safe))
+    cy = np.where(degenerate, 0.0, np.add.reduceat((y + y[nxt]) * cross, starts) / (3 * safe))
+    c_lat = np.degrees(lat0 + cy / EARTH_RADIUS_M)
+    c_lng = np.degrees(lng0 + cx / (EARTH_RADIUS_M * cos0))
+
+    deg = np.degrees(pts)
+    west, south = np.minimum.reduceat(deg[:, 0], starts), np.minimum.reduceat(deg[:, 1], starts)
+    east, north = np.maximum.reduceat(deg[:, 0], starts), np.maximum.reduceat(deg[:, 1], starts)
+
+    return [{
+        "area": round(float(area_m2[i]) / SQ_M_PER_ACRE, 4),
+        "areaM2": round(float(area_m2[i]), 1),
+        "centroid": {"lat": round(float(c_lat[i]), 7), "lng": round(float(c_lng[i]), 7)},
+        "bbox": [round(float(v[i]), 7) for v in (west, south, east, north)],
+    } for i in range(len(rings))]
+
+
+def measure_many(coordinate_lists):
+    """Metrics (or None for outlines with fewer than 3 vertices) for many `coordinates` lists."""
+    results = [None] * len(coordinate_lists)
+    todo = {}  # hash -> (points, [result indexes])
+    for i, coordinates in enumerate(coordinate_lists):
+        points = ring(coordinates)
+        if len(set(points)) < 3:
+            continue
+        h = outline_hash(points)
+        with _cache_lock:
+            cached = _cache.get(h)
+            if cached is not None:
+                _cache.move_to_end(h)
+        if cached is not None:
+            results[i] = dict(cached)
+        else:
+            todo.setdefault(h, (points, []))[1].append(i)
+
+    if todo:
+        hashes = list(todo)
+        measured = _measure_rings([todo[h][0] for h in hashes])
+        with _cache_lock:
+            for h, metrics in zip(hashes, measured):
+                metrics["metricsHash"] = h
+                _cache[h] = metrics
+                for i in todo[h][1]:
+                    results[i] = dict(metrics)
+            while len(_cache) > _CACHE_SIZE:
+                _cache.popitem(last=False)
+    return results
+
+
+def measure(coordinates):
+    """Metrics for one `coordinates` list, or None if it is not a polygon."""
+    return measure_many([coordinates])[0]
+
+
+def metrics_fields(coordinates):
+    """Values to store for a field whose outline is `coordinates`."""
+    return measure(coordinates) or dict(UNMEASURED)
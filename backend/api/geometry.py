@@ -0,0 +1,145 @@
+"""GeoJSON geometry for fields, kept next to the legacy `coordinates` list.
+
+Fields store their outline as `coordinates: [{lat, lng}, ...]` (what the map draws). Each
+write also stores `geometry`, the same outline as a GeoJSON Polygon, which carries the
+`2dsphere` index that the viewport queries (`fields/within`, `fields/near`) run on.
+
+MongoDB rejects polygons it cannot index (self-intersecting hand-drawn outlines, error 16755
+"Can't extract geo keys"). Such a field gets its bounding box instead and is flagged
+`geometryApprox: true`, so it still shows up in viewport queries.
+Existing fields are migrated with `python manage.py backfill_field_geometry`.
+"""
+from pymongo.errors import WriteError
+
+# "Can't extract geo keys": the geometry is not a valid GeoJSON polygon for a 2dsphere index
+GEO_KEY_ERROR = 16755
+
+# Viewports wider than this are not a useful filter (and flip polygon orientation); skip it
+MAX_BBOX_SPAN = 180.0
+MAX_NEAR_RADIUS_M = 200_000
+
+
+def _point(c):
+    """(lng, lat) from a {lat, lng} dict or a [lat, lng] pair, or None if it is not a point."""
+    try:
+        if isinstance(c, dict):
+            lat, lng = float(c["lat"]), float(c["lng"])
+        else:
+            lat, lng = float(c[0]), float(c[1])
+    except (KeyError, IndexError, TypeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    return lng, lat
+
+
+def ring(coordinates):
+    """Distinct consecutive (lng, lat) vertices of an outline (not closed)."""
+    points = []
+    for c in coordinates or []:
+        p = _point(c)
+        if p is not None and (not points or p != points[-1]):
+            points.append(p)
+    if len(points) > 1 and points[0] == points[-1]:
+        points.pop()
+    return points
+
+
+def polygon(points):
+    if len(set(points)) < 3:
+        return None
+    return {"type": "Polygon", "coordinates": [[list(p) for p in points] + [list(points[0])]]}
+
+
+def bbox(points):
+    """(west, south, east, north) of (lng, lat) points."""
+    lngs = [p[0] for p in points]
+    lats = [p[1] for p in points]
+    return min(lngs), min(lats), max(lngs), max(lats)
+
+
+def bbox_polygon(west, south, east, north):
+    if west == east or south == north:
+        # Degenerate (a line): widen by ~1 m so it is still a polygon
+        west, east = (west - 1e-5, east + 1e-5) if west == east else (west, east)
+        south, north = (south - 1e-5, north + 1e-5) if south == north else (south, north)
+    return {"type": "Polygon", "coordinates": [[
+        [west, south], [east, south], [east, north], [west, north], [west, south],
+    ]]}
+
+
+def to_geojson(coordinates):
+    """GeoJSON Polygon for a `coordinates` list, or None if it has fewer than 3 distinct points."""
+    return polygon(ring(coordinates))
+
+
+def approx_geojson(coordinates):
+    """Bounding-box polygon of the outline (fallback for outlines MongoDB cannot index)."""
+    points = ring(coordinates)
+    return bbox_polygon(*bbox(points)) if points else None
+
+
+def geometry_fields(coordinates):
+    """`$set` values for a field whose outline is `coordinates`."""
+    return {"geometry": to_geojson(coordinates), "geometryApprox": False}
+
+
+def approx_fields(coordinates):
+    return {"geometry": approx_geojson(coordinates), "geometryApprox": True}
+
+
+def write_with_fallback(write, coordinates):
+    """Run `write(geo)` with the exact geometry; on a geo key error retry with the bounding box.
+
+    `write` receives the geometry `$set` values and performs the insert/update.
+    """
+    try:
+        return write(geometry_fields(coordinates))
+    except WriteError as e:
+        if e.code != GEO_KEY_ERROR:
+            raise
+    return write(approx_fields(coordinates))
+
+
+def parse_bbox(value):
+    """Parse "west,south,east,north" (Leaflet's toBBoxString). Raises ValueError."""
+    parts = [float(p) for p in (value or "").split(",")]
+    if len(parts) != 4:
+        raise ValueError("bbox must be west,south,east,north")
+    west, south, east, north = parts
+    if not (west < east and south < north):
+        raise ValueError("bbox must have west < east and south < north")
+    south, north = max(south, -90.0), min(north, 90.0)
+    if east - west >= 360:
+        return -180.0, south, 180.0, north
+    # A panned map reports longitudes past +/-180; wrap them (east < west then crosses the antimeridian)
+    if not -180 <= west <= 180:
+        west = (west + 180) % 360 - 180
+    if not -180 <= east <= 180:
+        east = (east + 180) % 360 - 180
+    return west, south, east, north
+
+
+def within_query(west, south, east, north):
+    """Filter for fields intersecting a viewport, or {} when the viewport is too wide to filter."""
+    span = east - west if east >= west else east + 360 - west
+    if span >= MAX_BBOX_SPAN or north - south >= MAX_BBOX_SPAN / 2:
+        return {}
+    if east < west:
+        return {"$or": [
+            {"geometry": {"$geoIntersects": {"$geometry": bbox_polygon(west, south, 180, north)}}},
+            {"geometry": {"$geoIntersects": {"$geometry": bbox_polygon(-180, south, east, north)}}},
+        ]}
+    return {"geometry": {"$geoIntersects": {"$geometry": bbox_polygon(west, south, east, north)}}}
+
+
+def near_stage(lat, lng, radius_m, query):
+    """$geoNear stage: fields within `radius_m` of the point, nearest first, with `distance` (m)."""
+    return {"$geoNear": {
+        "near": {"type": "Point", "coordinates": [lng, lat]},
+        "distanceField": "distance",
+        "maxDistance": radius_m,
+        "spherical": True,
+        "key": "geometry",
+        "query": query,
+    }}
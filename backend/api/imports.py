@@ -0,0 +1,62 @@
+"""Streaming row readers for bulk imports (CSV and NDJSON).
+
+Both read their input one line at a time and yield (row number, row or None, error or None),
+the same shape as views._parse_rows, so an import never holds the whole file in memory.
+Lines may be bytes (an HTTP request body) or str (an open file).
+"""
+import csv
+import json
+
+CSV_CONTENT_TYPES = ('text/csv', 'application/csv', 'application/vnd.ms-excel')
+
+
+def _text_lines(lines):
+    for line in lines:
+        yield line.decode('utf-8-sig', errors='replace') if isinstance(line, bytes) else line
+
+
+def iter_ndjson(lines):
+    for n, line in enumerate(_text_lines(lines), 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield n, None, f'invalid JSON: {e.msg}'
+            continue
+        if isinstance(row, dict):
+            yield n, row, None
+        else:
+            yield n, None, 'row must be an object'
+
+
+def iter_csv(lines):
+    """CSV with a header row; empty cells are treated as missing. Row numbers are line numbers."""
+    reader = csv.DictReader(_text_lines(lines))
+    try:
+        for raw in reader:
+            if None in raw:
+                yield reader.line_num, None, 'more cells than header columns'
+                continue
+            row = {k.strip(): v.strip() for k, v in raw.items() if k and v is not None and v.strip()}
+            if row:
+                yield reader.line_num, row, None
+    except csv.Error as e:
+        yield reader.line_num, None, f'invalid CSV: {e}'
+
+
+def detect_format(content_type='', name='', fmt=None):
+    """'csv' or 'ndjson' from an explicit format, a content type or a file name."""
+    if fmt:
+        fmt = fmt.lower()
+        if fmt not in ('csv', 'ndjson', 'jsonl'):
+            raise ValueError("format must be 'csv' or 'ndjson'")
+        return 'csv' if fmt == 'csv' else 'ndjson'
+    if content_type in CSV_CONTENT_TYPES or name.lower().endswith('.csv'):
+        return 'csv'
+    return 'ndjson'
+
+
+def iter_rows(lines, fmt):
+    return iter_csv(lines) if fmt == 'csv' else iter_ndjson(lines)
+
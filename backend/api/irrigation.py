@@ -0,0 +1,209 @@
+"""Irrigation scheduling from a daily soil water balance, for many fields at once.
+
+Used by GET /api/water/analysis (every field) and predict `water_forecast` (one field), so
+both give the same, deterministic answer.
+
+Per field and day, over the last LOOKBACK_DAYS:
+
+    ET0   Hargreaves reference evapotranspiration (mm/day) from the field's 7-day temperature
+          rollup (api/temperature.py) and extraterrestrial radiation for its latitude and
+          day of year (FAO-56 eq. 21)
+    ETc   ET0 x crop coefficient (by field status)
+    Dr    root-zone depletion: Dr = clip(Dr + ETc - irrigation, 0, TAW)
+
+Irrigation minutes (irrigation activities, or legacy water records for fields without any)
+are converted to depth with the pump delivery rate (IRRIGATION_FLOW_LPS) and application
+efficiency. The next irrigation is due when Dr reaches the readily available water (RAW);
+its duration refills the root zone. The day loop runs over NumPy arrays of all fields, so
+a few thousand fields take milliseconds.
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+from django.conf import settings
+
+from . import temperature
+from .db import get_collection
+from .field_metrics import SQ_M_PER_ACRE
+
+LOOKBACK_DAYS = 30
+HORIZON_DAYS = 30
+DUE_SOON_DAYS = 2
+
+# Loam, 0.6 m root zone: total available water and the share a crop can use without stress
+TOTAL_AVAILABLE_MM = 100.0
+DEPLETION_FRACTION = 0.5
+# Depletion assumed at the start of the lookback when nothing earlier is known
+INITIAL_DEPLETION_MM = TOTAL_AVAILABLE_MM * DEPLETION_FRACTION / 2
+APPLICATION_EFFICIENCY = 0.6  # surface / flood irrigation
+
+CROP_COEFFICIENTS = {"cultivated": 1.0, "thaka": 1.0}
+BARE_SOIL_COEFFICIENT = 0.4
+
+DEFAULT_LATITUDE = 31.5  # Punjab
+# Used when a field has no temperature readings: mean and diurnal range (°C)
+DEFAULT_TEMPERATURE = (25.0, 12.0)
+MIN_MINUTES = 10
+
+
+def _flow_lps():
+    return float(getattr(settings, "IRRIGATION_FLOW_LPS", 28.0))
+
+
+def extraterrestrial_radiation(lat_deg, day_of_year):
+    """Ra (MJ m-2 day-1) for latitudes (degrees) x days of year, broadcast together."""
+    phi = np.radians(lat_deg)
+    j = np.asarray(day_of_year, dtype=float)
+    dr = 1 + 0.033 * np.cos(2 * np.pi * j / 365)
+    decl = 0.409 * np.sin(2 * np.pi * j / 365 - 1.39)
+    ws = np.arccos(np.clip(-np.tan(phi) * np.tan(decl), -1.0, 1.0))
+    return 24 * 60 / np.pi * 0.0820 * dr * (ws * np.sin(phi) * np.sin(decl) + np.cos(phi) * np.cos(decl) * np.sin(ws))
+
+
+def hargreaves(ra, t_mean, t_min, t_max):
+    """Reference evapotranspiration (mm/day)."""
+    return 0.0023 * 0.408 * ra * (t_mean + 17.8) * np.sqrt(np.maximum(t_max - t_min, 0.0))
+
+
+def irrigation_history(field_ids, since):
+    """{fieldId: {"last": {date, minutes} or None, "events": [(date, minutes), ...]}}.
+
+    Irrigation activities are used where a field has any; other fields fall back to their
+    legacy water_records, as elsewhere in the app. Two aggregations per collection, each
+    streaming one row per field.
+    """
+    out = {fid: {"last": None, "events": []} for fid in field_ids}
+
+    def collect(col, match, key, minutes, ids):
+        event = {"date": "$date", "minutes": f"${minutes}"}
+        match = {**match, key: {"$in": ids}}
+        found = set()
+        # The newest event of all time...
+        for row in get_collection(col).aggregate([
+            {"$match": match},
+            {"$group": {"_id": f"${key}", "last": {"$topN": {"n": 1, "sortBy": {"date": -1}, "output": event}}}},
+        ]):
+            out[row["_id"]]["last"] = row["last"][0] if row["last"] else None
+            found.add(row["_id"])
+        # ...but only the window's events, so the groups stay small
+        for row in get_collection(col).aggregate([
+            {"$match": {**match, "date": {"$gte": since}}},
+            {"$group": {"_id": f"${key}", "events": {"$push": event}}},
+        ]):
+            out[row["_id"]]["events"] = [(e["date"], e["minutes"]) for e in row["events"]]
+        return found
+
+    ids = list(field_ids)
+    with_activity = collect("activities", {"activity_type": "irrigation"}, "field_id", "quantity_used", ids)
+    legacy = [fid for fid in ids if fid not in with_activity]
+    if legacy:
+        collect("water_records", {}, "fieldId", "durationMinutes", legacy)
+    return out
+
+
+def _minutes(value):
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def schedule(fields, today=None, rollups=None, history=None):
+    """Plan the next irrigation for every field. Returns {fieldId: plan}.
+
+    plan: lastWaterDate, lastDurationMinutes, depletionMm, readilyAvailableMm, etcMmPerDay,
+    daysUntilNext, suggestedNextDate, suggestedMinutes, status ('no_water', 'overdue',
+    'due_soon' or 'ok'). `rollups` and `history` are loaded when not given.
+    """
+    today = today or datetime.utcnow().date()
+    start = today - timedelta(days=LOOKBACK_DAYS)
+    ids = [f.get("id", "") for f in fields]
+    if not ids:
+        return {}
+    if rollups is None:
+        rollups = temperature.rollups_for(ids)
+    if history is None:
+        history = irrigation_history(ids, start.isoformat())
+
+    n = len(fields)
+    lat = np.full(n, DEFAULT_LATITUDE)
+    area = np.empty(n)
+    kc = np.empty(n)
+    t_mean = np.full(n, DEFAULT_TEMPERATURE[0])
+    t_min = t_mean - DEFAULT_TEMPERATURE[1] / 2
+    t_max = t_mean + DEFAULT_TEMPERATURE[1] / 2
+    for i, f in enumerate(fields):
+        if (f.get("centroid") or {}).get("lat") is not None:
+            lat[i] = f["centroid"]["lat"]
+        acres = f.get("area")
+        area[i] = f.get("areaM2") or max(0.1, float(acres) if isinstance(acres, (int, float)) else 1.0) * SQ_M_PER_ACRE
+        kc[i] = CROP_COEFFICIENTS.get(f.get("status"), BARE_SOIL_COEFFICIENT)
+        week = (rollups.get(ids[i]) or {}).get("last7d") or {}
+        if week.get("mean") is not None:
+            t_mean[i] = week["mean"]
+            # Readings without min/max give a zero range; fall back to the default range then
+            low, high = week.get("min", week["mean"]), week.get("max", week["mean"])
+            half = (high - low) / 2 if high - low >= 2 else DEFAULT_TEMPERATURE[1] / 2
+            t_min[i], t_max[i] = t_mean[i] - half, t_mean[i] + half
+
+    # Daily crop ET from the lookback start through the forecast horizon
+    days = LOOKBACK_DAYS + 1 + HORIZON_DAYS
+    doy = np.array([(start + timedelta(days=d)).timetuple().tm_yday for d in range(days)])
+    etc = hargreaves(extraterrestrial_radiation(lat[:, None], doy[None, :]),
+                     t_mean[:, None], t_min[:, None], t_max[:, None]) * kc[:, None]
+
+    # Net irrigation depth per field and day
+    depth_per_minute = _flow_lps() * 60 / area * APPLICATION_EFFICIENCY  # litres per m2 = mm
+    irrigation = np.zeros((n, LOOKBACK_DAYS + 1))
+    rows, cols, mins = [], [], []
+    for i, fid in enumerate(ids):
+        for date, minutes in (history.get(fid) or {}).get("events", []):
+            try:
+                d = (datetime.strptime((date or "")[:10], "%Y-%m-%d").date() - start).days
+            except ValueError:
+                continue
+            if 0 <= d <= LOOKBACK_DAYS:
+                rows.append(i)
+                cols.append(d)
+                mins.append(_minutes(minutes))
+    if rows:
+        np.add.at(irrigation, (np.array(rows), np.array(cols)), np.array(mins) * depth_per_minute[rows])
+
+    # Water balance up to and including today
+    raw = TOTAL_AVAILABLE_MM * DEPLETION_FRACTION
+    depletion = np.full(n, INITIAL_DEPLETION_MM)
+    for d in range(LOOKBACK_DAYS + 1):
+        depletion = np.clip(depletion + etc[:, d] - irrigation[:, d], 0.0, TOTAL_AVAILABLE_MM)
+
+    # First future day on which depletion reaches RAW
+    future = depletion[:, None] + np.cumsum(etc[:, LOOKBACK_DAYS + 1:], axis=1)
+    reached = future >= raw
+    days_until = np.where(depletion >= raw, 0,
+                          np.where(reached.any(axis=1), reached.argmax(axis=1) + 1, HORIZON_DAYS))
+    deficit = np.where(days_until == 0, depletion, future[np.arange(n), np.maximum(days_until - 1, 0)])
+    minutes = np.maximum(MIN_MINUTES, np.round(deficit / depth_per_minute))
+    daily_etc = etc[:, LOOKBACK_DAYS]
+
+    plans = {}
+    for i, fid in enumerate(ids):
+        last = (history.get(fid) or {}).get("last") or {}
+        if not last:
+            status = "no_water"
+        elif days_until[i] == 0:
+            status = "overdue"
+        elif days_until[i] <= DUE_SOON_DAYS:
+            status = "due_soon"
+        else:
+            status = "ok"
+        plans[fid] = {
+            "lastWaterDate": (last.get("date") or "")[:10] or None,
+            "lastDurationMinutes": round(_minutes(last.get("minutes"))) if last else None,
+            "depletionMm": round(float(depletion[i]), 1),
+            "readilyAvailableMm": raw,
+            "etcMmPerDay": round(float(daily_etc[i]), 2),
+            "daysUntilNext": int(days_until[i]),
+            "suggestedNextDate": (today + timedelta(days=int(days_until[i]))).isoformat(),
+            "suggestedMinutes": int(minutes[i]),
+            "status": status,
+        }
+    return plans
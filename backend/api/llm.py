@@ -0,0 +1,118 @@
+"""Chat completions from the Hugging Face router, for the AI views and the water summary.
+
+`chat` (sync, urllib) and `achat` (async views, httpx) try HF_MODEL and then the fallback
+models, and return (reply_text, model_name, debug_error); reply_text is None when no model
+answered, and callers fall back to built-in text. The token comes from HF_TOKEN or
+HUGGINGFACE_TOKEN; backend/.env is re-read on every call so a new token needs no restart.
+"""
+import asyncio
+import json
+import logging
+import os
+import weakref
+from pathlib import Path
+
+from .metrics import llm_timer
+
+logger = logging.getLogger("api.llm")
+
+HF_CHAT_URL = "https://router.huggingface.co/v1/chat/completions"
+HF_FALLBACK_MODELS = ("meta-llama/Llama-3.2-3B-Instruct", "Qwen/Qwen2.5-72B-Instruct", "mistralai/Mistral-Nemo-Instruct-2407")
+
+_http_clients = weakref.WeakKeyDictionary()  # event loop -> httpx.AsyncClient
+
+
+def hf_config():
+    """(token, models to try in order) for the Hugging Face router; reloads backend/.env first."""
+    from dotenv import load_dotenv
+    _backend_dir = Path(__file__).resolve().parent.parent
+    load_dotenv(_backend_dir / ".env", override=True)
+
+    hf_token = os.environ.get("HF_TOKEN", "").strip() or os.environ.get("HUGGINGFACE_TOKEN", "").strip()
+    default_hf = os.environ.get("HF_MODEL", "meta-llama/Meta-Llama-3-8B-Instruct")
+    models = []
+    for hf_model in (default_hf, *HF_FALLBACK_MODELS):
+        if hf_model and hf_model not in models:
+            models.append(hf_model)
+    return hf_token, models
+
+
+def _payload(model, system_prompt, user_content, temperature):
+    return {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_content}
+        ],
+        "temperature": temperature
+    }
+
+
+def _reply_text(resp_data):
+    return (resp_data.get("choices", [{}])[0].get("message", {}).get("content", "")).strip()
+
+
+def _failed(hf_model, error):
+    logger.warning("HF API failed model=%s: %s", hf_model, error)
+    if os.environ.get("DEBUG", "").lower() in ("true", "1"):
+        logger.exception("HF full traceback")
+
+
+def chat(system_prompt: str, user_content: str, temperature: float = 0.4) -> tuple[str | None, str, str | None]:
+    """Primary: Hugging Face. Fallback: None (caller uses built-in or 503). Returns (reply_text, model_name, debug_error)."""
+    hf_token, hf_models = hf_config()
+    last_hf_error = None
+
+    # Hugging Face (primary) – try configured model then fallback models
+    if hf_token:
+        import urllib.request
+        for hf_model in hf_models:
+            try:
+                payload = _payload(hf_model, system_prompt, user_content, temperature)
+                req = urllib.request.Request(HF_CHAT_URL, data=json.dumps(payload).encode("utf-8"), method="POST")
+                req.add_header("Authorization", f"Bearer {hf_token}")
+                req.add_header("Content-Type", "application/json")
+                with llm_timer(), urllib.request.urlopen(req, timeout=10) as resp:
+                    resp_data = json.loads(resp.read().decode())
+                text = _reply_text(resp_data)
+                if text:
+                    return (text, hf_model, None)
+            except Exception as _hf_err:
+                last_hf_error = _hf_err
+                _failed(hf_model, _hf_err)
+
+    # No Gemini/OpenAI: fallback is built-in (handled by caller) or 503 for chat
+    return (None, "", str(last_hf_error) if last_hf_error else None)
+
+
+def _http_client():
+    """The client for the running loop; keeps connections to the router open between calls."""
+    import httpx
+    loop = asyncio.get_running_loop()
+    client = _http_clients.get(loop)
+    if client is None:
+        client = _http_clients[loop] = httpx.AsyncClient(timeout=10)
+    return client
+
+
+async def achat(system_prompt, user_content, temperature=0.4):
+    """chat on the async HTTP client, for api/async_views.py."""
+    hf_token, hf_models = hf_config()
+    last_hf_error = None
+
+    if hf_token:
+        client = _http_client()
+        for hf_model in hf_models:
+            try:
+                with llm_timer():
+                    resp = await client.post(HF_CHAT_URL, json=_payload(hf_model, system_prompt, user_content, temperature),
+                                             headers={"Authorization": f"Bearer {hf_token}"})
+                resp.raise_for_status()
+                text = _reply_text(resp.json())
+                if text:
+                    return (text, hf_model, None)
+            except Exception as _hf_err:
+                last_hf_error = _hf_err
+                _failed(hf_model, _hf_err)
+
+    return (None, "", str(last_hf_error) if last_hf_error else None)
@@ -0,0 +1,116 @@
+"""Simplified field outlines for zoomed-out map views (levels of detail).
+
+Hand-drawn outlines can have hundreds of vertices, far more than a zoomed-out map can show.
+Each write that changes a field's `coordinates` also stores `lod`, Douglas–Peucker
+simplifications at a few zoom levels, each with a tolerance of about one screen pixel:
+
+    lod: {"10": [{lat, lng}, ...], "13": [...], "16": [...]}
+
+A level is only stored when it actually drops vertices. `GET /api/fields?zoom=` and
+`GET /api/dashboard?zoom=` return, for each field, the coarsest level still accurate at
+that zoom (the smallest stored level >= zoom), or the full outline.
+"""
+import numpy as np
+
+from .field_metrics import EARTH_RADIUS_M
+from .geometry import ring
+
+LEVELS = (10, 13, 16)
+# Ground metres per 256px-tile pixel at zoom 0 on the equator
+METRES_PER_PIXEL_Z0 = 2 * np.pi * EARTH_RADIUS_M / 256
+
+
+def tolerance_m(zoom, lat):
+    return METRES_PER_PIXEL_Z0 * np.cos(np.radians(lat)) / 2 ** zoom
+
+
+def _douglas_peucker(xy, tol):
+    """Indexes of the vertices of open polyline `xy` (n x 2) kept at tolerance `tol`."""
+    keep = np.zeros(len(xy), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(xy) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        a, b = xy[start], xy[end]
+        inner = xy[start + 1:end]
+        ab = b - a
+        length = np.hypot(*ab)
+        if length == 0:
+            dist = np.hypot(*(inner - a).T)
+        else:
+            dist = np.abs(ab[0] * (inner[:, 1] - a[1]) - ab[1] * (inner[:, 0] - a[0])) / length
+        i = int(np.argmax(dist))
+        if dist[i] > tol:
+            mid = start + 1 + i
+            keep[mid] = True
+            stack.append((start, mid))
+            stack.append((mid, end))
+    return np.flatnonzero(keep)
+
+
+def simplify(points, tol_m):
+    """Simplify a closed ring of (lng, lat) points; always keeps at least 3 vertices."""
+    pts = np.asarray(points, dtype=float)
+    lat0 = np.radians(pts[:, 1].mean())
+    xy = np.radians(pts) * EARTH_RADIUS_M
+    xy[:, 0] *= np.cos(lat0)
+    # Split the ring at the vertex farthest from the first, and simplify both halves
+    far = int(np.argmax(np.hypot(*(xy - xy[0]).T)))
+    if far == 0:
+        return points
+    closed = np.vstack([xy, xy[:1]])
+    first = _douglas_peucker(closed[:far + 1], tol_m)
+    second = _douglas_peucker(closed[far:], tol_m) + far
+    kept = np.concatenate([first, second[1:-1]])
+    if len(kept) < 3:
+        # Too coarse to be a polygon: keep the vertex farthest from the split line as well
+        rest = np.setdiff1d(np.arange(len(xy)), [0, far])
+        ab = xy[far] - xy[0]
+        dist = np.abs(ab[0] * (xy[rest, 1] - xy[0, 1]) - ab[1] * (xy[rest, 0] - xy[0, 0]))
+        kept = np.sort(np.append(kept, rest[int(np.argmax(dist))]))
+    return [points[i] for i in kept]
+
+
+def build(coordinates):
+    """`lod` for an outline: {zoom: simplified {lat, lng} list}, only levels that drop vertices."""
+    points = ring(coordinates)
+    if len(set(points)) < 4:
+        return {}
+    lat = float(np.mean([p[1] for p in points]))
+    levels = {}
+    previous = len(points)
+    for zoom in sorted(LEVELS, reverse=True):
+        simplified = simplify(points, tolerance_m(zoom, lat))
+        if len(simplified) < previous:
+            levels[str(zoom)] = [{"lat": p[1], "lng": p[0]} for p in simplified]
+            previous = len(simplified)
+    return levels
+
+
+def lod_fields(coordinates):
+    """Values to store for a field whose outline is `coordinates`."""
+    return {"lod": build(coordinates)}
+
+
+def parse_zoom(value):
+    """Zoom from a query parameter, or None if absent. Raises ValueError."""
+    if value in (None, ""):
+        return None
+    zoom = float(value)
+    if not 0 <= zoom <= 30:
+        raise ValueError("zoom must be between 0 and 30")
+    return zoom
+
+
+def apply(fields, zoom):
+    """Swap each field's `coordinates` for its outline at `zoom` (in place); drops `lod`."""
+    for field in fields:
+        levels = field.pop("lod", None) or {}
+        if zoom is None:
+            continue
+        usable = [int(z) for z in levels if int(z) >= zoom]
+        if usable:
+            field["coordinates"] = levels[str(min(usable))]
+    return fields
@@ -0,0 +1,58 @@
+"""Store a GeoJSON `geometry` on existing fields (needed by fields/within and fields/near).
+
+Fields written since the geometry index was added already have it; by default only fields
+without one are touched, so the command can be re-run or resumed safely. Outlines MongoDB
+cannot index get their bounding box instead (`geometryApprox: true`).
+"""
+from django.core.management.base import BaseCommand
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from api import geometry, tiles
+from api.db import get_collection
+
+
+class Command(BaseCommand):
+    help = "Set GeoJSON geometry on fields from their coordinates."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--all", action="store_true", help="Recompute fields that already have a geometry.")
+
+    def handle(self, *args, **options):
+        col = get_collection("fields")
+        batch_size = max(1, options["batch_size"])
+        query = {} if options["all"] else {"geometry": {"$exists": False}}
+
+        exact = approx = 0
+        batch = []
+        for doc in col.find(query, {"_id": 1, "coordinates": 1}).batch_size(batch_size):
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                done, fallback = self._write(col, batch)
+                exact, approx, batch = exact + done, approx + fallback, []
+        if batch:
+            done, fallback = self._write(col, batch)
+            exact, approx = exact + done, approx + fallback
+
+        tiles.invalidate()
+        self.stdout.write(self.style.SUCCESS(
+            f"Set geometry on {exact + approx} field(s); {approx} stored as a bounding box."
+        ))
+
+    @staticmethod
+    def _write(col, docs):
+        ops = [UpdateOne({"_id": d["_id"]}, {"$set": geometry.geometry_fields(d.get("coordinates"))}) for d in docs]
+        try:
+            col.bulk_write(ops, ordered=False)
+            return len(docs), 0
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if not errors or any(err.get("code") != geometry.GEO_KEY_ERROR for err in errors):
+                raise
+            failed = [err["index"] for err in errors]
+        col.bulk_write([
+            UpdateOne({"_id": docs[i]["_id"]}, {"$set": geometry.approx_fields(docs[i].get("coordinates"))})
+            for i in failed
+        ], ordered=False)
+        return len(docs) - len(failed), len(failed)
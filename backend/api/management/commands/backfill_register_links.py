@@ -0,0 +1,71 @@
+"""Link existing daily-register material transactions to their register entry (registerId).
+
+Transactions generated by the daily register before registerId existed are matched to an
+entry by field, date, material and quantity, one transaction per `materialsUsed` line.
+Unlinked candidates are read once (anchored `^Daily register:` notes) and links are written
+with batched bulk_writes. Safe to re-run: only transactions without a registerId are touched.
+"""
+from django.core.management.base import BaseCommand
+from pymongo import UpdateOne
+
+from api.db import get_collection
+from api.services import _to_num
+
+
+class Command(BaseCommand):
+    help = "Set registerId on material transactions generated by daily register entries."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--dry-run", action="store_true", help="Report matches without writing.")
+
+    def handle(self, *args, **options):
+        trans_col = get_collection("material_transactions")
+        batch_size = max(1, options["batch_size"])
+
+        # (fieldId, date, materialId, quantity) -> unlinked transaction ids, oldest first
+        candidates = {}
+        cursor = trans_col.find(
+            {"registerId": {"$exists": False}, "type": "out", "notes": {"$regex": "^Daily register:"}},
+            {"_id": 1, "fieldId": 1, "date": 1, "materialId": 1, "quantity": 1},
+        ).sort("_id", 1)
+        for t in cursor:
+            key = (t.get("fieldId"), t.get("date"), t.get("materialId"), t.get("quantity"))
+            candidates.setdefault(key, []).append(t["_id"])
+        total = sum(len(ids) for ids in candidates.values())
+        self.stdout.write(f"{total} unlinked daily-register transaction(s) found.")
+
+        linked = unmatched = 0
+        ops = []
+        entries = get_collection("daily_register").find(
+            {"materialsUsed.0": {"$exists": True}},
+            {"_id": 0, "id": 1, "fieldId": 1, "date": 1, "materialsUsed": 1},
+        ).sort("date", 1)
+        for entry in entries:
+            for mu in entry.get("materialsUsed") or []:
+                # Quantities normalised as the register stored them on its transactions
+                qty = _to_num(mu.get("quantity", 0)) if isinstance(mu, dict) and mu.get("materialId") else 0
+                if qty <= 0:
+                    continue
+                ids = candidates.get((entry.get("fieldId"), entry.get("date"), mu.get("materialId"), qty))
+                if not ids:
+                    unmatched += 1
+                    continue
+                ops.append(UpdateOne({"_id": ids.pop(0), "registerId": {"$exists": False}},
+                                     {"$set": {"registerId": entry["id"]}}))
+                linked += 1
+                if len(ops) >= batch_size:
+                    self._flush(trans_col, ops, options["dry_run"])
+                    ops = []
+        self._flush(trans_col, ops, options["dry_run"])
+
+        verb = "Would link" if options["dry_run"] else "Linked"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {linked} transaction(s); {total - linked} transaction(s) left unlinked; "
+            f"{unmatched} material line(s) had nothing unlinked to match (already linked or missing)."
+        ))
+
+    @staticmethod
+    def _flush(col, ops, dry_run):
+        if ops and not dry_run:
+            col.bulk_write(ops, ordered=False)
@@ -0,0 +1,220 @@
+"""Benchmark every API route on a seeded synthetic farm; results as JSON for comparing commits.
+
+    python manage.py benchmark --mongo-uri mongodb://localhost:27017 --fields 100,1000 --output before.json
+    python manage.py benchmark --mongod --fields 1000 --compare before.json
+
+The farm (fields x records per field of activities, water, temperature, expenses, ...) is
+seeded into a throwaway database, `slm_bench_<pid>`, on the given server, which is dropped
+afterwards. `--mongod` starts a temporary mongod from PATH on a scratch directory instead.
+Every route in api/urls.py is driven through the Django test client with the requests used
+by the query-budget tests (api/benchmarking.py); the LLM is replaced by a stub, so AI routes measure only our code.
+
+Per route and size: p50/p95/mean latency over `--repeat` calls (deletes run once), the Mongo
+commands issued by the first call (and by the last, where it differs: snapshotted and
+cached routes get cheaper) and peak Python memory (tracemalloc) of one call. Memory is
+measured in a second pass on a freshly seeded farm, so tracing does not skew the timings.
+"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from contextlib import ExitStack
+from datetime import datetime
+from unittest import mock
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+
+from api import db as api_db, field_deletion
+from api.auth import create_token, get_admin_credentials
+from api.benchmarking import command_counter, route_requests, seed_farm, temporary_mongod
+
+AI_STUB = ('{"analysis": "Benchmark stub.", "notes": []}', "benchmark-stub", None)
+
+
+def _percentile(values, p):
+    values = sorted(values)
+    k = (len(values) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = "Benchmark API routes (latency, Mongo commands, peak memory) on a seeded farm; prints JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fields", default="100", help="Farm sizes to run, comma-separated (default 100).")
+        parser.add_argument("--records", type=int, default=12,
+                            help="Records per field of each kind: activities, water, temperature, ... (default 12).")
+        parser.add_argument("--repeat", type=int, default=20, help="Timed calls per route (default 20).")
+        parser.add_argument("--route", action="append", default=[],
+                            help="Only routes whose pattern starts with this (repeatable), e.g. --route water.")
+        server = parser.add_mutually_exclusive_group()
+        server.add_argument("--mongo-uri", help="Server for the throwaway database (default: MONGO_TEST_URI).")
+        server.add_argument("--mongod", action="store_true", help="Start a temporary mongod from PATH.")
+        parser.add_argument("--output", help="Write the JSON report here instead of stdout.")
+        parser.add_argument("--compare", help="Earlier report: print p50 and query-count changes against it.")
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(n) for n in options["fields"].split(",") if n.strip()]
+        except ValueError:
+            raise CommandError("--fields must be comma-separated integers, e.g. 100,1000")
+        if not sizes or min(sizes) < 2:
+            raise CommandError("every farm size must be at least 2 fields")
+        baseline = None
+        if options["compare"]:
+            with open(options["compare"], encoding="utf-8") as fh:
+                baseline = json.load(fh)
+
+        with ExitStack() as stack:
+            if options["mongod"]:
+                try:
+                    uri = stack.enter_context(temporary_mongod())
+                except RuntimeError as exc:
+                    raise CommandError(f"--mongod: {exc}")
+            else:
+                uri = options["mongo_uri"] or os.environ.get("MONGO_TEST_URI", "").strip()
+                if not uri:
+                    raise CommandError("pass --mongo-uri, set MONGO_TEST_URI, or use --mongod")
+            report = self._run(uri, sizes, options)
+
+        text = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as fh:
+                fh.write(text + "\n")
+            self.stderr.write(f"Wrote {options['output']}")
+        else:
+            self.stdout.write(text)
+        if baseline:
+            self._compare(baseline, report)
+
+    def _run(self, uri, sizes, options):
+        settings = override_settings(
+            MONGO_URI=uri,
+            MONGO_DB=f"slm_bench_{os.getpid()}",
+            ALLOWED_HOSTS=["testserver"],
+        )
+        settings.enable()
+        api_db.reset_clients()
+        stub_env = {"HF_TOKEN": "", "HUGGINGFACE_TOKEN": "", "GEMINI_API_KEY": "", "OPENAI_API_KEY": ""}
+        try:
+            with mock.patch("api.llm.chat", return_value=AI_STUB), \
+                    mock.patch("dotenv.load_dotenv"), mock.patch.dict(os.environ, stub_env):
+                db = api_db.get_db()
+                report = {
+                    "meta": {
+                        "commit": _git_commit(),
+                        "date": datetime.utcnow().isoformat() + "Z",
+                        "python": platform.python_version(),
+                        "mongo": db.client.server_info().get("version"),
+                        "recordsPerField": options["records"],
+                        "repeat": options["repeat"],
+                    },
+                    "sizes": {},
+                }
+                for n in sizes:
+                    self.stderr.write(f"Benchmarking {n} fields...")
+                    report["sizes"][str(n)] = self._run_size(n, options)
+            return report
+        finally:
+            try:
+                db = api_db.get_db()
+                db.client.drop_database(db.name)
+            finally:
+                api_db.reset_clients()
+                settings.disable()
+
+    def _seed(self, n, records):
+        db = api_db.get_db()
+        for name in db.list_collection_names():
+            if not name.startswith("system."):
+                db[name].delete_many({})
+        started = time.perf_counter()
+        ids = seed_farm(n, records)
+        return ids, time.perf_counter() - started
+
+    def _selected(self, ids, prefixes):
+        return [r for r in route_requests(ids) if not prefixes or any(r[0].startswith(p) for p in prefixes)]
+
+    def _call(self, client, method, path, body):
+        kwargs = {}
+        if isinstance(body, str):
+            kwargs = {"data": body, "content_type": "text/csv"}
+        elif body is not None:
+            kwargs = {"data": json.dumps(body), "content_type": "application/json"}
+        with command_counter.capture() as commands:
+            started = time.perf_counter()
+            response = getattr(client, method.lower())(path, **kwargs)
+            if response.streaming:
+                b"".join(response.streaming_content)
+            elapsed = time.perf_counter() - started
+        return response.status_code, elapsed, len(commands)
+
+    def _run_size(self, n, options):
+        client = Client(HTTP_AUTHORIZATION="Bearer " + create_token(get_admin_credentials()[0]))
+        repeat = max(1, options["repeat"])
+
+        # Pass 1: timings and query counts
+        ids, seed_seconds = self._seed(n, options["records"])
+        routes = {}
+        for route, method, path, body in self._selected(ids, options["route"]):
+            calls = [self._call(client, method, path, body) for _ in range(1 if method == "DELETE" else repeat)]
+            times = [elapsed * 1000 for _, elapsed, _ in calls]
+            entry = {
+                "status": calls[0][0],
+                "calls": len(calls),
+                "p50Ms": round(_percentile(times, 50), 2),
+                "p95Ms": round(_percentile(times, 95), 2),
+                "meanMs": round(statistics.fmean(times), 2),
+                "queries": calls[0][2],
+            }
+            if calls[-1][2] != calls[0][2]:
+                entry["queriesLast"] = calls[-1][2]
+            routes[f"{method} {route}"] = entry
+        field_deletion.wait()
+
+        # Pass 2: peak memory of one call per route, on a fresh farm
+        ids, _ = self._seed(n, options["records"])
+        tracemalloc.start()
+        try:
+            for route, method, path, body in self._selected(ids, options["route"]):
+                tracemalloc.reset_peak()
+                baseline = tracemalloc.get_traced_memory()[0]
+                self._call(client, method, path, body)
+                routes[f"{method} {route}"]["peakKb"] = round((tracemalloc.get_traced_memory()[1] - baseline) / 1024, 1)
+        finally:
+            tracemalloc.stop()
+        field_deletion.wait()
+        return {"seedSeconds": round(seed_seconds, 2), "routes": routes}
+
+    def _compare(self, baseline, report):
+        out = self.stderr
+        out.write(f"\nAgainst {baseline['meta'].get('commit') or 'baseline'}:\n")
+        for size, current in report["sizes"].items():
+            before = baseline.get("sizes", {}).get(size)
+            if not before:
+                out.write(f"  {size} fields: not in baseline\n")
+                continue
+            out.write(f"  {size} fields\n")
+            for key, now in current["routes"].items():
+                old = before["routes"].get(key)
+                if not old:
+                    out.write(f"    {key:55} new\n")
+                    continue
+                change = (now["p50Ms"] - old["p50Ms"]) / old["p50Ms"] * 100 if old["p50Ms"] else 0.0
+                queries = "" if now["queries"] == old["queries"] else f"  queries {old['queries']} -> {now['queries']}"
+                out.write(f"    {key:55} p50 {old['p50Ms']:>9.2f} -> {now['p50Ms']:>9.2f} ms ({change:+.0f}%){queries}\n")
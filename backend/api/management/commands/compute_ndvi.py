@@ -0,0 +1,52 @@
+"""Compute per-field NDVI statistics from one scene's red and near-infrared bands.
+
+    python manage.py compute_ndvi --red B04.tif --nir B08.tif --date 2026-10-01
+    python manage.py compute_ndvi --red red.npy --nir nir.npy --bounds 74.2,31.3,74.5,31.6
+
+Re-running for the same scene and date overwrites that scene's statistics. See api/ndvi.py.
+"""
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import ndvi
+
+
+def _bounds(value):
+    try:
+        west, south, east, north = (float(v) for v in value.split(","))
+    except ValueError:
+        raise CommandError("--bounds must be west,south,east,north")
+    return west, south, east, north
+
+
+class Command(BaseCommand):
+    help = "Compute NDVI zonal statistics for every field inside a red/NIR scene."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--red", required=True, help="Red band (.tif or .npy).")
+        parser.add_argument("--nir", required=True, help="Near-infrared band (.tif or .npy).")
+        parser.add_argument("--date", default=None, help="Acquisition date YYYY-MM-DD (default: today).")
+        parser.add_argument("--bounds", type=_bounds, default=None,
+                            help="west,south,east,north in degrees; required for .npy bands.")
+        parser.add_argument("--scene", default=None, help="Scene name (default: red band file name).")
+        parser.add_argument("--tile-size", type=int, default=ndvi.DEFAULT_TILE_SIZE,
+                            help="Pixels per tile side; bounds memory use.")
+
+    def handle(self, *args, **options):
+        date = options["date"] or datetime.utcnow().strftime("%Y-%m-%d")
+        try:
+            datetime.strptime(date, "%Y-%m-%d")
+        except ValueError:
+            raise CommandError("--date must be YYYY-MM-DD")
+        try:
+            summary = ndvi.compute_scene(
+                options["red"], options["nir"], date, bounds=options["bounds"], scene=options["scene"],
+                tile_size=max(64, options["tile_size"]),
+            )
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f"Scene {summary['scene']} ({summary['date']}): NDVI stored for {summary['fields']} field(s)"
+            + (f"; {len(summary['noData'])} without valid pixels." if summary["noData"] else ".")
+        ))
@@ -0,0 +1,54 @@
+"""Remove duplicate temperature_records and make (fieldId, date) unique.
+
+Bulk imports upsert readings keyed on (fieldId, date), and the unique index keeps that key
+intact under concurrent writers. Readings stored before it may repeat a field and date: the
+most recently inserted one (highest _id) is kept, as a re-import would have done, and the
+rollups are rebuilt afterwards. Safe to re-run. Pass --dry-run to only count duplicates.
+"""
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from api import temperature
+from api.db import get_collection
+
+
+class Command(BaseCommand):
+    help = "Delete duplicate temperature readings per field and date, then add the unique index."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000, help="Readings per delete.")
+        parser.add_argument("--dry-run", action="store_true", help="Count duplicates without deleting.")
+
+    def handle(self, *args, **options):
+        col = get_collection(temperature.RECORDS_COLLECTION)
+        batch_size = max(1, options["batch_size"])
+        groups = col.aggregate([
+            {"$group": {"_id": {"fieldId": "$fieldId", "date": "$date"}, "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+            {"$match": {"count": {"$gt": 1}}},
+        ], allowDiskUse=True)
+
+        keys = removed = 0
+        batch = []
+        for group in groups:
+            keys += 1
+            batch.extend(sorted(group["ids"])[:-1])
+            if len(batch) >= batch_size:
+                removed += self._delete(col, batch, options["dry_run"])
+                batch = []
+        if batch:
+            removed += self._delete(col, batch, options["dry_run"])
+
+        if options["dry_run"]:
+            self.stdout.write(f"{removed} duplicate reading(s) across {keys} field/date pair(s); nothing deleted.")
+            return
+        col.create_index([("fieldId", 1), ("date", 1)], unique=True)
+        self.stdout.write(self.style.SUCCESS(
+            f"Removed {removed} duplicate reading(s) across {keys} field/date pair(s); (fieldId, date) is unique."
+        ))
+        if removed:
+            call_command("rebuild_temperature_rollups", stdout=self.stdout, stderr=self.stderr)
+
+    def _delete(self, col, ids, dry_run):
+        if dry_run:
+            return len(ids)
+        return col.delete_many({"_id": {"$in": ids}}).deleted_count
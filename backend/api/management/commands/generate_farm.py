@@ -0,0 +1,58 @@
+"""Write a deterministic synthetic farm (fields, seasons of activities, weather, leases, stock).
+
+    python manage.py generate_farm --fields 2500 --seasons 2 --replace   # about a million records
+    python manage.py generate_farm --fields 5 --seed 1                   # a small demo farm
+
+Everything is written under the `--prefix` id prefix (default "syn"), so `--replace` removes
+an earlier run without touching real data. See api/synthetic.py for what is generated.
+"""
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import synthetic
+from api.db import get_collection
+
+
+class Command(BaseCommand):
+    help = "Generate a deterministic synthetic farm of N fields into the configured database."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fields", type=int, default=100, help="Number of fields (default 100).")
+        parser.add_argument("--seasons", type=int, default=2, help="Half-year crop seasons of history (default 2).")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed; same seed, same farm (default 0).")
+        parser.add_argument("--end", help="Last day of history, YYYY-MM-DD (default: today, UTC).")
+        parser.add_argument("--prefix", default=synthetic.DEFAULT_PREFIX,
+                            help=f"Id prefix of everything written (default {synthetic.DEFAULT_PREFIX!r}).")
+        parser.add_argument("--batch-size", type=int, default=5000, help="Documents per insert_many (default 5000).")
+        parser.add_argument("--replace", action="store_true", help="Delete an earlier farm with this prefix first.")
+
+    def handle(self, *args, **options):
+        if options["fields"] < 1 or options["seasons"] < 1 or options["batch_size"] < 1 or options["seed"] < 0:
+            raise CommandError("--fields, --seasons and --batch-size must be positive and --seed not negative")
+        try:
+            end = datetime.strptime(options["end"], "%Y-%m-%d").date() if options["end"] else None
+        except ValueError:
+            raise CommandError("--end must be YYYY-MM-DD")
+        prefix = options["prefix"]
+        if options["replace"]:
+            deleted = synthetic.clear(prefix)
+            self.stderr.write(f"Removed {deleted} document(s) of the earlier {prefix!r} farm")
+        elif get_collection("fields").find_one({"id": synthetic.field_id(prefix, 0)}, {"_id": 1}):
+            raise CommandError(f"a farm with prefix {prefix!r} already exists; pass --replace or another --prefix")
+
+        started = time.perf_counter()
+        result = synthetic.generate(
+            options["fields"], seed=options["seed"], seasons=options["seasons"], end=end, prefix=prefix,
+            batch_size=options["batch_size"],
+            progress=lambda done, total: self.stderr.write(f"  {done}/{total} fields") if options["verbosity"] > 1 else None,
+        )
+        seconds = time.perf_counter() - started
+        counts = result["counts"]
+        total = sum(counts.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {options['fields']} field(s), {total} document(s) in {seconds:.1f}s "
+            f"({total / seconds if seconds else 0:,.0f}/s): "
+            + ", ".join(f"{name} {n}" for name, n in sorted(counts.items()))
+        ))
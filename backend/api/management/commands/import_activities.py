@@ -0,0 +1,40 @@
+"""Bulk-import activities from a CSV or NDJSON file (e.g. a digitized paper register).
+
+The file is streamed line by line and written in batches: one material price lookup, one
+insert_many and one aggregated stock bulk_write per batch. Rows that fail are reported by
+line number and skipped; the rest are imported.
+"""
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.imports import detect_format, iter_rows
+from api.services import ActivityService
+
+
+class Command(BaseCommand):
+    help = "Import activities from a CSV (with header row) or NDJSON file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=("csv", "ndjson"),
+                            help="Defaults to csv for *.csv files, ndjson otherwise.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = detect_format(name=path, fmt=options["format"])
+        try:
+            with open(path, encoding="utf-8-sig", newline="") as fh:
+                report = ActivityService.bulk_import(iter_rows(fh, fmt), batch_size=max(1, options["batch_size"]))
+        except OSError as e:
+            raise CommandError(f"Cannot read {path}: {e}")
+
+        for err in report["errors"]:
+            self.stderr.write(f"row {err['row']}: {err['error']}")
+        self.stdout.write(json.dumps({k: v for k, v in report.items() if k != "errors"}))
+        style = self.style.SUCCESS if not report["errors"] else self.style.WARNING
+        self.stdout.write(style(
+            f"Imported {report['inserted']} of {report['received']} row(s); "
+            f"{len(report['errors'])} error(s); {report['materialsUpdated']} material stock update(s)."
+        ))
@@ -0,0 +1,54 @@
+"""Copy temperature_records into per-field monthly buckets (temperature_buckets).
+
+Idempotent: readings are merged by date, one per field and day as in temperature_records
+(the most recently inserted wins), so the command can be re-run or resumed safely.
+After it finishes, set TEMPERATURE_STORAGE=buckets and restart the app. Pass --drop-source
+to delete temperature_records once you have verified the buckets.
+"""
+from django.core.management.base import BaseCommand
+
+from api import temperature
+from api.db import get_collection
+
+
+class Command(BaseCommand):
+    help = "Migrate temperature_records into temperature_buckets (per field, per month)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--drop-source", action="store_true",
+                            help="Delete temperature_records after a successful migration.")
+
+    def handle(self, *args, **options):
+        source = get_collection(temperature.RECORDS_COLLECTION)
+        batch_size = options["batch_size"]
+        total = source.count_documents({})
+        self.stdout.write(f"Migrating {total} reading(s) in batches of {batch_size}")
+
+        moved = writes = 0
+        batch = []
+        cursor = source.find({}).sort([("fieldId", 1), ("date", 1), ("_id", 1)]).batch_size(batch_size)
+        for doc in cursor:
+            doc.pop("_id")
+            if not doc.get("id"):
+                # Legacy rows without an id still need a stable one
+                doc["id"] = f"{doc.get('fieldId', '')}:{doc.get('date', '')}:{doc.get('temperatureC')}"
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                writes += temperature.merge_into_buckets(batch, key="date")
+                moved += len(batch)
+                batch = []
+        if batch:
+            writes += temperature.merge_into_buckets(batch, key="date")
+            moved += len(batch)
+
+        buckets = get_collection(temperature.BUCKETS_COLLECTION).count_documents({})
+        self.stdout.write(self.style.SUCCESS(
+            f"Merged {moved} reading(s) with {writes} bucket write(s); {buckets} bucket(s) total."
+        ))
+        if options["drop_source"]:
+            if moved != total:
+                self.stderr.write("Reading count changed during migration; not dropping the source.")
+                return
+            source.delete_many({})
+            self.stdout.write("temperature_records cleared.")
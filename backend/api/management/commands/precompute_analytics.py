@@ -0,0 +1,31 @@
+"""Write today's analytics snapshot (water analysis, field and AI recommendations) for every field.
+
+Run daily, shortly after midnight UTC (cron, or a Fly scheduled machine:
+`fly machine run . --schedule daily -- python manage.py precompute_analytics`). The GET
+endpoints then serve the snapshot and recompute only fields whose data changed since.
+Re-running rewrites the day's snapshot; rows older than a week are dropped.
+"""
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import analytics
+
+
+class Command(BaseCommand):
+    help = "Precompute the daily per-field analytics snapshot (default: today, UTC)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", help="YYYY-MM-DD (default: today, UTC).")
+        parser.add_argument("--no-ai", action="store_true",
+                            help="Skip the AI water summary; the first page view of the day requests it instead.")
+
+    def handle(self, *args, **options):
+        try:
+            day = datetime.strptime(options["date"], "%Y-%m-%d").date() if options["date"] else datetime.utcnow().date()
+        except ValueError:
+            raise CommandError("--date must be YYYY-MM-DD")
+        counts = analytics.precompute(day, summarize=not options["no_ai"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Analytics snapshot for {day.isoformat()}: " + ", ".join(f"{kind} {n} field(s)" for kind, n in counts.items())
+        ))
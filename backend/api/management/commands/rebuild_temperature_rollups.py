@@ -0,0 +1,45 @@
+"""Recompute temperature_rollups (7/14/30-day aggregates per field) from the stored readings.
+
+Readings are grouped per field and day in the database; each field's rollup document is then
+rewritten from its last 30 days of bins. Rollups of fields that no longer have readings are
+removed. Safe to re-run; needed once for readings stored before rollups existed.
+"""
+from django.core.management.base import BaseCommand
+
+from api import temperature
+from api.db import get_collection
+
+
+class Command(BaseCommand):
+    help = "Rebuild per-field rolling temperature aggregates from the readings."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="Fields per bulk write.")
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options["batch_size"])
+        keep = max(temperature.WINDOWS)
+        seen, batch = set(), {}
+
+        def flush():
+            for bins in batch.values():
+                last = max(bins)
+                for day in [d for d in bins if d <= last - keep]:
+                    del bins[day]
+            temperature.write_rollup_bins(batch, replace=True, reset=True)
+            batch.clear()
+
+        for field_id, day_bin in temperature.daily_bins():
+            if field_id not in batch and len(batch) >= batch_size:
+                flush()
+            batch.setdefault(field_id, {})[day_bin["day"]] = day_bin
+            seen.add(field_id)
+        if batch:
+            flush()
+
+        removed = get_collection(temperature.ROLLUPS_COLLECTION).delete_many(
+            {"fieldId": {"$nin": sorted(seen)}}
+        ).deleted_count
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt temperature rollups for {len(seen)} field(s); removed {removed} stale rollup(s)."
+        ))
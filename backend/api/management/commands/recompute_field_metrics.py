@@ -0,0 +1,59 @@
+"""Recompute area, centroid, bbox and simplified outlines (lod) for every field.
+
+Outlines are measured a batch at a time in one vectorized pass. Fields whose stored
+metricsHash already matches their outline (and that have a lod) are skipped unless --all
+is given, so the command is cheap to re-run. Fields without a polygon outline keep their
+existing area. Rewritten fields get their dataVersion bumped, so predictions cached with
+the old area are recomputed.
+"""
+from django.core.management.base import BaseCommand
+from pymongo import UpdateOne
+
+from api import field_metrics, lod, tiles
+from api.db import get_collection
+from api.predictions import bump_data_version
+
+
+class Command(BaseCommand):
+    help = "Recompute server-side area, centroid, bbox and lod for all fields."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--all", action="store_true", help="Rewrite fields whose metrics are already current.")
+
+    def handle(self, *args, **options):
+        col = get_collection("fields")
+        batch_size = max(1, options["batch_size"])
+
+        seen = updated = unmeasured = 0
+        batch = []
+        cursor = col.find({}, {"_id": 1, "id": 1, "coordinates": 1, "metricsHash": 1, "lod": 1}).batch_size(batch_size)
+        for doc in cursor:
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                u, n = self._write(col, batch, options["all"])
+                seen, updated, unmeasured, batch = seen + len(batch), updated + u, unmeasured + n, []
+        if batch:
+            u, n = self._write(col, batch, options["all"])
+            seen, updated, unmeasured = seen + len(batch), updated + u, unmeasured + n
+
+        tiles.invalidate()
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {seen} field(s): updated {updated}, {unmeasured} without a polygon outline."
+        ))
+
+    @staticmethod
+    def _write(col, docs, rewrite_all):
+        ops, changed = [], []
+        unmeasured = 0
+        for doc, metrics in zip(docs, field_metrics.measure_many([d.get("coordinates") for d in docs])):
+            if metrics is None:
+                unmeasured += 1
+                metrics = field_metrics.UNMEASURED
+            if rewrite_all or metrics["metricsHash"] != doc.get("metricsHash") or "lod" not in doc:
+                ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {**metrics, **lod.lod_fields(doc.get("coordinates"))}}))
+                changed.append(doc.get("id"))
+        if ops:
+            col.bulk_write(ops, ordered=False)
+            bump_data_version(*changed)
+        return len(ops), unmeasured
@@ -0,0 +1,54 @@
+"""Compare every material's stock with the stock ledger and optionally repair it.
+
+The ledger totals for all materials come from one aggregation. Without options the command
+only reports drift. --apply sets stock_quantity/currentStock to the ledger totals.
+--bootstrap does the opposite, once, when the ledger is introduced on existing data: it
+records each material's current stock minus its ledger total as an opening entry, so the
+ledger starts out matching the inventory.
+"""
+from django.core.management.base import BaseCommand, CommandError
+from pymongo import UpdateOne
+
+from api import stock
+from api.db import get_collection
+
+
+class Command(BaseCommand):
+    help = "Recompute material stock from the stock ledger and report (or fix) drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--apply", action="store_true", help="Set stock to the ledger totals.")
+        parser.add_argument("--bootstrap", action="store_true",
+                            help="Record current stock as opening ledger entries (first run on existing data).")
+
+    def handle(self, *args, **options):
+        if options["apply"] and options["bootstrap"]:
+            raise CommandError("Use either --apply or --bootstrap, not both.")
+        totals = stock.ledger_totals()
+        materials = get_collection("materials")
+        drift = []
+        for mat in materials.find({}, {"_id": 0, "id": 1, "name": 1, "stock_quantity": 1, "currentStock": 1}):
+            current = mat.get("stock_quantity") or 0
+            expected = totals.get(mat.get("id"), 0)
+            if current != expected or mat.get("currentStock", current) != current:
+                drift.append((mat, current, expected))
+
+        for mat, current, expected in drift:
+            self.stdout.write(f"{mat.get('id')} ({mat.get('name', '')}): stock {current}, ledger {expected}")
+        self.stdout.write(f"{len(drift)} material(s) out of step with the ledger.")
+        if not drift:
+            return
+
+        if options["apply"]:
+            materials.bulk_write([
+                UpdateOne({"id": mat["id"]}, {"$set": {"stock_quantity": expected, "currentStock": expected}})
+                for mat, _, expected in drift
+            ], ordered=False)
+            self.stdout.write(self.style.SUCCESS(f"Set stock from the ledger for {len(drift)} material(s)."))
+        elif options["bootstrap"]:
+            stock.apply_opening_entries([(mat["id"], current - expected) for mat, current, expected in drift])
+            materials.bulk_write([
+                UpdateOne({"id": mat["id"]}, {"$set": {"currentStock": current}})
+                for mat, current, _ in drift
+            ], ordered=False)
+            self.stdout.write(self.style.SUCCESS(f"Recorded opening entries for {len(drift)} material(s)."))
@@ -0,0 +1,25 @@
+"""Finish field deletions left unfinished (failed, or interrupted by a restart).
+
+Each job's steps are idempotent deletes, so re-running a job that partly completed is safe.
+Runs in the foreground; schedule it after deploys or run it by hand.
+"""
+from django.core.management.base import BaseCommand
+
+from api import field_deletion
+
+
+class Command(BaseCommand):
+    help = "Re-run every unfinished field deletion job to completion."
+
+    def handle(self, *args, **options):
+        jobs = field_deletion.unfinished_jobs()
+        if not jobs:
+            self.stdout.write("No unfinished field deletions.")
+            return
+        failed = 0
+        for job in jobs:
+            status = field_deletion.run(job["id"])
+            self.stdout.write(f"field {job['fieldId']} (job {job['id']}): {status}")
+            failed += status != "done"
+        style = self.style.SUCCESS if not failed else self.style.ERROR
+        self.stdout.write(style(f"{len(jobs) - failed} of {len(jobs)} deletion(s) completed."))
@@ -0,0 +1,31 @@
+"""Write per-material stock snapshots (balance at the end of a completed day).
+
+Run daily (e.g. from cron, shortly after midnight UTC). Point-in-time stock queries then
+replay at most the ledger entries since the last snapshot. Re-running for the same date
+overwrites that day's snapshots.
+"""
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api import stock
+
+
+class Command(BaseCommand):
+    help = "Snapshot every material's stock balance as of the end of a day (default: yesterday, UTC)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", help="YYYY-MM-DD; must be before today.")
+
+    def handle(self, *args, **options):
+        today = datetime.utcnow().date()
+        date = options["date"] or (today - timedelta(days=1)).isoformat()
+        try:
+            day = datetime.strptime(date, "%Y-%m-%d").date()
+        except ValueError:
+            raise CommandError("--date must be YYYY-MM-DD")
+        if day >= today:
+            # Entries dated today do not invalidate snapshots, so today cannot be snapshotted yet
+            raise CommandError("Only completed days (before today, UTC) can be snapshotted.")
+        written = stock.write_snapshots(date)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} stock snapshot(s) for {date}."))
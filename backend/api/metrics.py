@@ -0,0 +1,308 @@
+"""Per-view request metrics, aggregated across gunicorn workers and exposed in Prometheus text format.
+
+Each worker keeps its own counters in memory and periodically writes them to
+``METRICS_DIR/worker-<pid>-<random>.json``. ``/api/metrics`` merges every worker file, so a
+scrape sees the whole machine no matter which worker answers it. The random part keeps a
+restarted worker that reuses a PID from overwriting its predecessor's file: files of exited
+workers stay and keep counting, so the merged counters never go backwards. They are
+cleared with METRICS_DIR (the default under the temp dir goes with the container).
+"""
+import contextvars
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from django.utils.decorators import sync_and_async_middleware
+from pymongo import monitoring
+
+from .auth import get_token_from_request, verify_token
+
+logger = logging.getLogger("api.metrics")
+
+# Latency buckets (seconds) and response size buckets (bytes), Prometheus style
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# Per-request accumulator: {'mongo_ops', 'mongo_seconds', 'llm_calls', 'llm_seconds'}
+_request_stats = contextvars.ContextVar("request_stats", default=None)
+
+_lock = threading.Lock()
+_series = {}  # (view, method) -> series dict
+_last_flush = 0.0
+_worker = {"pid": None, "file": None}
+
+
+def _metrics_dir():
+    path = getattr(settings, "METRICS_DIR", "") or os.path.join(tempfile.gettempdir(), "slm-metrics")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _worker_file():
+    """This process's file name; decided per PID so workers forked from a preloaded app differ."""
+    pid = os.getpid()
+    if _worker["pid"] != pid:
+        _worker["pid"], _worker["file"] = pid, f"worker-{pid}-{uuid.uuid4().hex[:12]}.json"
+    return _worker["file"]
+
+
+def _new_series():
+    return {
+        "requests": {},  # status -> count
+        "latency_buckets": [0] * (len(LATENCY_BUCKETS) + 1),
+        "latency_sum": 0.0,
+        "latency_count": 0,
+        "size_buckets": [0] * (len(SIZE_BUCKETS) + 1),
+        "size_sum": 0,
+        "size_count": 0,
+        "mongo_ops": 0,
+        "mongo_seconds": 0.0,
+        "llm_calls": 0,
+        "llm_seconds": 0.0,
+    }
+
+
+def _bucket_index(bounds, value):
+    for i, bound in enumerate(bounds):
+        if value <= bound:
+            return i
+    return len(bounds)
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Counts Mongo round trips and their client-measured duration against the current request."""
+
+    def started(self, event):
+        stats = _request_stats.get()
+        if stats is not None:
+            stats["mongo_ops"] += 1
+
+    def succeeded(self, event):
+        stats = _request_stats.get()
+        if stats is not None:
+            stats["mongo_seconds"] += event.duration_micros / 1e6
+
+    def failed(self, event):
+        self.succeeded(event)
+
+
+mongo_listener = MongoCommandListener()
+
+
+@contextmanager
+def llm_timer():
+    """Wrap an outbound LLM call so its wall time is attributed to the current view."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats = _request_stats.get()
+        if stats is not None:
+            stats["llm_calls"] += 1
+            stats["llm_seconds"] += time.perf_counter() - start
+
+
+def _view_name(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unmatched"
+    func = getattr(match, "func", None)
+    return getattr(func, "__name__", None) or match.view_name or "unknown"
+
+
+def _response_size(response):
+    if getattr(response, "streaming", False):
+        return None
+    try:
+        return len(response.content)
+    except Exception:
+        return None
+
+
+def record(view, method, status, elapsed, size, stats):
+    """Add one finished request to this worker's series."""
+    global _last_flush
+    with _lock:
+        s = _series.get((view, method))
+        if s is None:
+            s = _series[(view, method)] = _new_series()
+        key = str(status)
+        s["requests"][key] = s["requests"].get(key, 0) + 1
+        s["latency_buckets"][_bucket_index(LATENCY_BUCKETS, elapsed)] += 1
+        s["latency_sum"] += elapsed
+        s["latency_count"] += 1
+        if size is not None:
+            s["size_buckets"][_bucket_index(SIZE_BUCKETS, size)] += 1
+            s["size_sum"] += size
+            s["size_count"] += 1
+        s["mongo_ops"] += stats["mongo_ops"]
+        s["mongo_seconds"] += stats["mongo_seconds"]
+        s["llm_calls"] += stats["llm_calls"]
+        s["llm_seconds"] += stats["llm_seconds"]
+        due = time.monotonic() - _last_flush >= getattr(settings, "METRICS_FLUSH_SECONDS", 5)
+    if due:
+        flush()
+
+
+def flush():
+    """Write this worker's series to its file (atomic replace). Never raises."""
+    global _last_flush
+    with _lock:
+        payload = [
+            {"view": view, "method": method, **series}
+            for (view, method), series in _series.items()
+        ]
+        _last_flush = time.monotonic()
+    try:
+        directory = _metrics_dir()
+        path = os.path.join(directory, _worker_file())
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as fh:
+            json.dump(payload, fh)
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning("metrics flush failed: %s", e)
+
+
+def _merge_all():
+    """Merge every worker file into one {(view, method): series} dict."""
+    merged = {}
+    directory = _metrics_dir()
+    for name in os.listdir(directory):
+        if not (name.startswith("worker-") and name.endswith(".json")):
+            continue
+        try:
+            with open(os.path.join(directory, name)) as fh:
+                rows = json.load(fh)
+        except (OSError, ValueError):
+            continue
+        for row in rows:
+            key = (row.pop("view"), row.pop("method"))
+            into = merged.setdefault(key, _new_series())
+            for status, count in row.get("requests", {}).items():
+                into["requests"][status] = into["requests"].get(status, 0) + count
+            for field in ("latency_buckets", "size_buckets"):
+                into[field] = [a + b for a, b in zip(into[field], row.get(field, []))]
+            for field in ("latency_sum", "latency_count", "size_sum", "size_count",
+                          "mongo_ops", "mongo_seconds", "llm_calls", "llm_seconds"):
+                into[field] += row.get(field, 0)
+    return merged
+
+
+def _labels(**kw):
+    return "{" + ",".join(f'{k}="{v}"' for k, v in kw.items()) + "}"
+
+
+def _histogram(lines, name, bounds, buckets, total, count, labels):
+    cumulative = 0
+    for bound, n in zip(bounds, buckets):
+        cumulative += n
+        lines.append(f"{name}_bucket{_labels(**labels, le=bound)} {cumulative}")
+    cumulative += buckets[-1]
+    lines.append(f"{name}_bucket{_labels(**labels, le='+Inf')} {cumulative}")
+    lines.append(f"{name}_sum{_labels(**labels)} {total}")
+    lines.append(f"{name}_count{_labels(**labels)} {count}")
+
+
+def render_prometheus(merged):
+    lines = [
+        "# HELP slm_http_requests_total Requests handled, by view, method and status.",
+        "# TYPE slm_http_requests_total counter",
+    ]
+    for (view, method), s in sorted(merged.items()):
+        for status, count in sorted(s["requests"].items()):
+            lines.append(f"slm_http_requests_total{_labels(view=view, method=method, status=status)} {count}")
+
+    lines += [
+        "# HELP slm_http_request_duration_seconds Request latency, by view and method.",
+        "# TYPE slm_http_request_duration_seconds histogram",
+    ]
+    for (view, method), s in sorted(merged.items()):
+        _histogram(lines, "slm_http_request_duration_seconds", LATENCY_BUCKETS, s["latency_buckets"],
+                   s["latency_sum"], s["latency_count"], {"view": view, "method": method})
+
+    lines += [
+        "# HELP slm_http_response_size_bytes Response body size (non-streaming responses).",
+        "# TYPE slm_http_response_size_bytes histogram",
+    ]
+    for (view, method), s in sorted(merged.items()):
+        _histogram(lines, "slm_http_response_size_bytes", SIZE_BUCKETS, s["size_buckets"],
+                   s["size_sum"], s["size_count"], {"view": view, "method": method})
+
+    counters = [
+        ("slm_mongo_commands_total", "mongo_ops", "Mongo commands issued while serving the view."),
+        ("slm_mongo_seconds_total", "mongo_seconds", "Mongo command round-trip time (client-measured)."),
+        ("slm_llm_calls_total", "llm_calls", "Outbound LLM calls made while serving the view."),
+        ("slm_llm_seconds_total", "llm_seconds", "Wall time spent waiting on LLM calls."),
+    ]
+    for name, field, help_text in counters:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+        for (view, method), s in sorted(merged.items()):
+            lines.append(f"{name}{_labels(view=view, method=method)} {s[field]}")
+    return "\n".join(lines) + "\n"
+
+
+def _start():
+    stats = {"mongo_ops": 0, "mongo_seconds": 0.0, "llm_calls": 0, "llm_seconds": 0.0}
+    return stats, _request_stats.set(stats), time.perf_counter()
+
+
+def _finish(request, response, elapsed, stats):
+    try:
+        record(_view_name(request), request.method, response.status_code, elapsed,
+               _response_size(response), stats)
+    except Exception as e:
+        logger.warning("metrics record failed: %s", e)
+
+
+@sync_and_async_middleware
+def metrics_middleware(get_response):
+    """Time every request and attribute Mongo/LLM work to the view that served it."""
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            stats, token, start = _start()
+            try:
+                response = await get_response(request)
+            finally:
+                _request_stats.reset(token)
+            _finish(request, response, time.perf_counter() - start, stats)
+            return response
+        return middleware
+
+    def middleware(request):
+        stats, token, start = _start()
+        try:
+            response = get_response(request)
+        finally:
+            _request_stats.reset(token)
+        _finish(request, response, time.perf_counter() - start, stats)
+        return response
+    return middleware
+
+
+def _scrape_allowed(request):
+    if getattr(settings, "METRICS_PUBLIC", False):
+        return True
+    expected = getattr(settings, "METRICS_TOKEN", "")
+    if expected:
+        return (request.META.get("HTTP_AUTHORIZATION") or "") == f"Bearer {expected}"
+    token = get_token_from_request(request)
+    return bool(token and verify_token(token))
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint. Requires METRICS_TOKEN as a Bearer token when set, else a
+    normal API login token; METRICS_PUBLIC turns the check off."""
+    if not _scrape_allowed(request):
+        return JsonResponse({"error": "Unauthorized"}, status=401)
+    flush()
+    body = render_prometheus(_merge_all())
+    return HttpResponse(body, content_type="text/plain; version=0.0.4; charset=utf-8")
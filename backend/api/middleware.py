@@ -1,26 +1,43 @@
 """Require valid auth token for all /api/ requests except login and health checks."""
+from asgiref.sync import iscoroutinefunction
+from django.utils.decorators import sync_and_async_middleware
+
 from .auth import get_token_from_request, verify_token
 
 
+def _unauthorized(request):
+    """None when the request may go through (setting request.auth_user if a token was checked), else a 401."""
+    path = request.path
+    # Public API paths (no auth); allow with or without trailing slash. /api/metrics does its
+    # own check (METRICS_TOKEN or a login token, see metrics_view)
+    if (path.startswith('/api/auth/login') or path.startswith('/api/health') or 
+        path.startswith('/api/ready') or path.startswith('/api/metrics') or path.startswith('/api/water/analysis') or
+        path.startswith('/api/ai/recommendations') or path.startswith('/api/ai/insights') or
+        path.startswith('/api/ai/chat') or path.startswith('/api/predict')):
+        return None
+
+    if not path.startswith('/api/'):
+        return None
+
+    token = get_token_from_request(request)
+    email = verify_token(token) if token else None
+    if not email:
+        from django.http import JsonResponse
+        return JsonResponse({'error': 'Unauthorized', 'detail': 'Invalid or missing token'}, status=401)
+    request.auth_user = email
+    return None
+
+
+@sync_and_async_middleware
 def auth_required_middleware(get_response):
     """Return 401 if request is to protected API and missing/invalid token."""
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            denied = _unauthorized(request)
+            return denied if denied is not None else await get_response(request)
+        return middleware
+
     def middleware(request):
-        path = request.path
-        # Public API paths (no auth); allow with or without trailing slash
-        if (path.startswith('/api/auth/login') or path.startswith('/api/health') or 
-            path.startswith('/api/ready') or path.startswith('/api/water/analysis') or
-            path.startswith('/api/ai/recommendations') or path.startswith('/api/ai/insights') or
-            path.startswith('/api/ai/chat') or path.startswith('/api/predict')):
-            return get_response(request)
-
-        if not path.startswith('/api/'):
-            return get_response(request)
-
-        token = get_token_from_request(request)
-        email = verify_token(token) if token else None
-        if not email:
-            from django.http import JsonResponse
-            return JsonResponse({'error': 'Unauthorized', 'detail': 'Invalid or missing token'}, status=401)
-        request.auth_user = email
-        return get_response(request)
+        denied = _unauthorized(request)
+        return denied if denied is not None else get_response(request)
     return middleware
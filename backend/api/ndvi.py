@@ -0,0 +1,296 @@
+"""Vegetation index (NDVI) per field from red and near-infrared band rasters.
+
+    python manage.py compute_ndvi --red B04.tif --nir B08.tif --date 2026-10-01
+    python manage.py compute_ndvi --red red.npy --nir nir.npy --bounds 74.2,31.3,74.5,31.6
+
+Bands are read from local files without loading whole scenes into memory: `.npy` arrays
+are memory-mapped, GeoTIFFs are read window by window through rasterio (optional; only
+needed for .tif). Rasters must be in geographic coordinates (EPSG:4326); a .npy band has
+no georeferencing, so its bounds are passed in.
+
+The scene is processed in square tiles. Only tiles that touch a field are read; each field
+outline is rasterized (pixel centres inside the polygon) over its part of the tile and its
+NDVI values are added to a fixed histogram, so a field's statistics need no per-pixel
+storage and are written as soon as its last tile is done. Percentiles are read from the
+histogram (resolution HIST_STEP); mean, min and max are exact.
+
+One document per field, date and scene in `field_ndvi`:
+
+    {fieldId, date, scene, mean, median, p10, p25, p75, p90, min, max, stdDev,
+     pixelCount, coverage, computedAt}
+
+`coverage` is the share of the field's pixels that had a valid value (not nodata/cloud).
+"""
+import logging
+import os
+from datetime import datetime
+
+import numpy as np
+from pymongo import UpdateOne
+
+from . import field_deletion, geometry
+from .db import get_collection
+from .predictions import bump_data_version
+
+try:
+    import rasterio
+    from rasterio.windows import Window
+except ImportError:  # only needed for GeoTIFF bands
+    rasterio = None
+
+logger = logging.getLogger("api.ndvi")
+
+COLLECTION = "field_ndvi"
+DEFAULT_TILE_SIZE = 1024
+HIST_BINS = 400
+HIST_STEP = 2.0 / HIST_BINS  # NDVI spans -1..1
+PERCENTILES = (10, 25, 50, 75, 90)
+PUBLIC_PROJECTION = {"_id": 0}
+
+
+class NpyBand:
+    """A 2-D .npy band, memory-mapped."""
+
+    def __init__(self, path):
+        self.data = np.load(path, mmap_mode="r")
+        if self.data.ndim != 2:
+            raise ValueError(f"{path}: expected a 2-D array, got shape {self.data.shape}")
+        self.shape = self.data.shape
+        self.bounds = None
+
+    def read(self, rows, cols):
+        return np.asarray(self.data[rows, cols], dtype=np.float32)
+
+    def close(self):
+        pass
+
+
+class GeoTiffBand:
+    """First band of a GeoTIFF, read one window at a time."""
+
+    def __init__(self, path):
+        if rasterio is None:
+            raise ValueError("Reading GeoTIFF bands needs rasterio (pip install rasterio); .npy bands work without it")
+        self.ds = rasterio.open(path)
+        if self.ds.crs is not None and not self.ds.crs.is_geographic:
+            self.ds.close()
+            raise ValueError(f"{path}: raster must be in geographic coordinates (EPSG:4326), got {self.ds.crs}")
+        self.shape = (self.ds.height, self.ds.width)
+        self.bounds = tuple(self.ds.bounds)  # left, bottom, right, top
+        self.nodata = self.ds.nodata
+
+    def read(self, rows, cols):
+        values = self.ds.read(1, window=Window.from_slices(rows, cols)).astype(np.float32)
+        if self.nodata is not None:
+            values[values == self.nodata] = np.nan
+        return values
+
+    def close(self):
+        self.ds.close()
+
+
+def open_band(path):
+    if os.path.splitext(path)[1].lower() == ".npy":
+        return NpyBand(path)
+    return GeoTiffBand(path)
+
+
+def compute(red, nir):
+    """NDVI = (nir - red) / (nir + red); NaN where there is no signal."""
+    total = nir + red
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = (nir - red) / total
+    out[~(total > 0)] = np.nan
+    return out
+
+
+def rasterize(px, rows, cols):
+    """Mask of pixels in rows x cols whose centre lies inside the polygon `px` (col, row coordinates).
+
+    Scanline fill: per pixel row, the polygon's edge crossings are sorted and paired into
+    inside spans, which are painted with a difference array and a cumulative sum.
+    """
+    ys = np.arange(rows.start, rows.stop) + 0.5
+    x1, y1 = px[:, 0], px[:, 1]
+    x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+    straddles = (y1[None, :] > ys[:, None]) != (y2[None, :] > ys[:, None])
+    dy = np.where(y2 == y1, 1.0, y2 - y1)
+    xs = np.where(straddles, x1 + (ys[:, None] - y1) * (x2 - x1) / dy, np.inf)
+    xs.sort(axis=1)
+    if xs.shape[1] % 2:
+        xs = np.hstack([xs, np.full((len(ys), 1), np.inf)])
+    starts, ends = xs[:, 0::2], xs[:, 1::2]
+    found = np.isfinite(starts) & np.isfinite(ends)
+    width = cols.stop - cols.start
+    # Pixel j is inside a span [a, b) when its centre j + 0.5 is
+    first = np.clip(np.ceil(starts - 0.5) - cols.start, 0, width).astype(int)
+    last = np.clip(np.ceil(ends - 0.5) - cols.start, 0, width).astype(int)
+    edges = np.zeros((len(ys), width + 1), dtype=np.int32)
+    row_idx = np.broadcast_to(np.arange(len(ys))[:, None], starts.shape)
+    np.add.at(edges, (row_idx[found], first[found]), 1)
+    np.add.at(edges, (row_idx[found], last[found]), -1)
+    return np.cumsum(edges[:, :width], axis=1) > 0
+
+
+class _Zone:
+    """One field's outline in pixel space and its running histogram."""
+
+    def __init__(self, field_id, px, height, width):
+        self.field_id = field_id
+        self.px = px
+        self.rows = slice(max(0, int(np.floor(px[:, 1].min()))), min(height, int(np.ceil(px[:, 1].max()))))
+        self.cols = slice(max(0, int(np.floor(px[:, 0].min()))), min(width, int(np.ceil(px[:, 0].max()))))
+        self.hist = None
+        self.total = 0
+        self.sum = 0.0
+        self.sum_sq = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    @property
+    def empty(self):
+        return self.rows.start >= self.rows.stop or self.cols.start >= self.cols.stop
+
+    def add(self, values, pixels):
+        self.total += pixels
+        values = values[np.isfinite(values)]
+        if not len(values):
+            return
+        if self.hist is None:
+            self.hist = np.zeros(HIST_BINS, dtype=np.int64)
+        bins = np.clip(((values + 1.0) / HIST_STEP).astype(int), 0, HIST_BINS - 1)
+        self.hist += np.bincount(bins, minlength=HIST_BINS)
+        self.sum += float(values.sum(dtype=np.float64))
+        self.sum_sq += float(np.square(values, dtype=np.float64).sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+    def stats(self):
+        """Summary statistics, or None if the field had no valid pixels."""
+        if self.hist is None:
+            return None
+        n = int(self.hist.sum())
+        cumulative = np.cumsum(self.hist)
+        out = {}
+        for p in PERCENTILES:
+            target = p / 100 * n
+            i = int(np.searchsorted(cumulative, target))
+            below = cumulative[i - 1] if i else 0
+            value = -1.0 + (i + (target - below) / self.hist[i]) * HIST_STEP
+            out["median" if p == 50 else f"p{p}"] = round(min(self.max, max(self.min, value)), 4)
+        mean = self.sum / n
+        out.update({
+            "mean": round(mean, 4),
+            "min": round(self.min, 4),
+            "max": round(self.max, 4),
+            "stdDev": round(max(0.0, self.sum_sq / n - mean * mean) ** 0.5, 4),
+            "pixelCount": n,
+            "coverage": round(n / self.total, 4) if self.total else 0.0,
+        })
+        return out
+
+
+def zonal_stats(red, nir, bounds, fields, tile_size=DEFAULT_TILE_SIZE):
+    """Yield (field id, stats or None) for every field that overlaps the scene.
+
+    `bounds` is (west, south, east, north) of the raster; `fields` yields docs with id and
+    coordinates. Fields are yielded as soon as the last tile they touch has been read.
+    """
+    if red.shape != nir.shape:
+        raise ValueError(f"red and nir bands differ in size: {red.shape} vs {nir.shape}")
+    height, width = red.shape
+    west, south, east, north = bounds
+    dx, dy = (east - west) / width, (north - south) / height
+
+    tiles_across = -(-width // tile_size)
+    by_tile = {}
+    last_tile = {}
+    for field in fields:
+        points = geometry.ring(field.get("coordinates"))
+        if len(set(points)) < 3:
+            continue
+        lnglat = np.asarray(points, dtype=float)
+        px = np.column_stack([(lnglat[:, 0] - west) / dx, (north - lnglat[:, 1]) / dy])
+        zone = _Zone(field["id"], px, height, width)
+        if zone.empty:
+            continue
+        tile_rows = range(zone.rows.start // tile_size, (zone.rows.stop - 1) // tile_size + 1)
+        tile_cols = range(zone.cols.start // tile_size, (zone.cols.stop - 1) // tile_size + 1)
+        for ti in tile_rows:
+            for tj in tile_cols:
+                by_tile.setdefault(ti * tiles_across + tj, []).append(zone)
+        last_tile[zone.field_id] = tile_rows[-1] * tiles_across + tile_cols[-1]
+
+    for t in sorted(by_tile):
+        ti, tj = divmod(t, tiles_across)
+        rows = slice(ti * tile_size, min(height, (ti + 1) * tile_size))
+        cols = slice(tj * tile_size, min(width, (tj + 1) * tile_size))
+        values = compute(red.read(rows, cols), nir.read(rows, cols))
+        for zone in by_tile.pop(t):
+            r = slice(max(rows.start, zone.rows.start), min(rows.stop, zone.rows.stop))
+            c = slice(max(cols.start, zone.cols.start), min(cols.stop, zone.cols.stop))
+            if r.start < r.stop and c.start < c.stop:
+                mask = rasterize(zone.px, r, c)
+                window = values[r.start - rows.start:r.stop - rows.start, c.start - cols.start:c.stop - cols.start]
+                zone.add(window[mask], int(mask.sum()))
+            if last_tile[zone.field_id] == t:
+                yield zone.field_id, zone.stats()
+
+
+def compute_scene(red_path, nir_path, date, bounds=None, scene=None, tile_size=DEFAULT_TILE_SIZE, batch_size=500):
+    """Compute and store NDVI statistics for every live field inside one scene. Returns a summary."""
+    red, nir = open_band(red_path), open_band(nir_path)
+    try:
+        if bounds is None:
+            bounds = red.bounds
+        if bounds is None:
+            raise ValueError("bounds (west,south,east,north) are required for .npy bands")
+        west, south, east, north = bounds
+        if not (west < east and south < north):
+            raise ValueError("bounds must be west,south,east,north with west < east and south < north")
+        scene = scene or os.path.splitext(os.path.basename(red_path))[0]
+        fields = get_collection("fields").find(
+            field_deletion.live(geometry.within_query(west, south, east, north)),
+            {"_id": 0, "id": 1, "coordinates": 1},
+        )
+        col = get_collection(COLLECTION)
+        now = datetime.utcnow().isoformat() + "Z"
+        written, no_data, batch = [], [], []
+
+        def flush():
+            if batch:
+                col.bulk_write([
+                    UpdateOne({"fieldId": doc["fieldId"], "date": date, "scene": scene}, {"$set": doc}, upsert=True)
+                    for doc in batch
+                ], ordered=False)
+                batch.clear()
+
+        for field_id, stats in zonal_stats(red, nir, bounds, fields, tile_size):
+            if stats is None:
+                no_data.append(field_id)
+                continue
+            batch.append({"fieldId": field_id, "date": date, "scene": scene, **stats, "computedAt": now})
+            written.append(field_id)
+            if len(batch) >= batch_size:
+                flush()
+        flush()
+    finally:
+        red.close()
+        nir.close()
+
+    # New imagery changes crop_health predictions for these fields
+    bump_data_version(*written)
+    logger.info("NDVI scene %s (%s): %d field(s) written, %d without valid pixels", scene, date, len(written), len(no_data))
+    return {"scene": scene, "date": date, "fields": len(written), "noData": no_data}
+
+
+def latest(field_id):
+    """Newest NDVI statistics for a field, or None."""
+    return get_collection(COLLECTION).find_one(
+        {"fieldId": field_id}, PUBLIC_PROJECTION, sort=[("date", -1), ("computedAt", -1)],
+    )
+
+
+def history(field_id, limit=30):
+    return list(get_collection(COLLECTION).find({"fieldId": field_id}, PUBLIC_PROJECTION)
+                .sort([("date", -1), ("computedAt", -1)]).limit(limit))
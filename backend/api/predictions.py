@@ -0,0 +1,66 @@
+"""Deterministic jitter and memoization for /api/predict.
+
+Predictions are seeded from field id + date instead of `random`, so the same inputs give
+the same answer all day and the result can be cached. The cache key carries the field's
+`dataVersion`, which every write to that field's activities, water or temperature records
+bumps — a bumped version simply misses the cache, in every worker.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+from .db import get_collection
+
+
+def stable_jitter(*parts):
+    """Return a float in [0, 1) that depends only on `parts` (e.g. field id, date, purpose)."""
+    digest = hashlib.blake2b("|".join(str(p) for p in parts).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") / 2 ** 64
+
+
+class LRUCache:
+    """Small thread-safe LRU cache (OrderedDict), bounded by entry count."""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+prediction_cache = LRUCache(getattr(settings, "PREDICTION_CACHE_SIZE", 1024))
+
+
+def prediction_key(field_id, field, pred_type, data, include_ai, today):
+    """Cache key: field, type, the field's data version, request inputs and the day."""
+    version = (field.get("dataVersion", 0), field.get("updatedAt")) if field else None
+    inputs = json.dumps(data, sort_keys=True, default=str)
+    return (field_id, pred_type, version, inputs, bool(include_ai), today)
+
+
+def bump_data_version(*field_ids):
+    """Invalidate cached predictions for these fields (call after writing their records)."""
+    ids = sorted({fid for fid in field_ids if fid})
+    if not ids:
+        return
+    get_collection("fields").update_many({"id": {"$in": ids}}, {"$inc": {"dataVersion": 1}})
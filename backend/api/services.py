@@ -1,6 +1,9 @@
 import logging
 from datetime import datetime
-from .db import get_collection, generate_id
+from pymongo.errors import BulkWriteError
+from .db import get_collection, generate_id, run_in_transaction
+from . import stock
+from .predictions import bump_data_version
 
 logger = logging.getLogger("api.services.activities")
 
@@ -12,6 +15,50 @@ def _to_num(val):
     except (TypeError, ValueError):
         return 0
 
+# Activity types that draw down material stock (and are costed from the material price)
+CONSUMING_TYPES = ('fertilizer_application', 'pesticide_spray', 'seed_sowing')
+
+
+def _build_activity_doc(data):
+    """Normalize an incoming activity into its stored shape (no stock side effects)."""
+    act_type = data.get('activity_type')
+    if not act_type: raise ValueError("activity_type is required")
+
+    return {
+        'id': data.get('id') or generate_id(),
+        'date': data.get('date', datetime.utcnow().strftime('%Y-%m-%d')),
+        'field_id': data.get('field_id') or data.get('fieldId'),
+        'activity_type': act_type,
+        'material_id': data.get('material_id'),
+        'quantity_used': _to_num(data.get('quantity_used')),
+        'cost': _to_num(data.get('cost')),
+        'income': _to_num(data.get('income')),
+        'notes': data.get('notes', ''),
+        'created_at': data.get('created_at', datetime.utcnow().isoformat() + 'Z')
+    }
+
+
+def _stock_delta(doc):
+    """(material id, stock change) an activity applies, or None if it does not touch stock."""
+    mat_id = doc.get('material_id')
+    qty = _to_num(doc.get('quantity_used'))
+    if not mat_id or qty <= 0:
+        return None
+    if doc.get('activity_type') == 'material_purchase':
+        return mat_id, qty
+    if doc.get('activity_type') in CONSUMING_TYPES:
+        return mat_id, -qty
+    return None
+
+
+def _apply_stock(delta, doc, session=None):
+    """Apply a stock delta (ledgered) and return the material's price in one round trip, or None."""
+    if not delta:
+        return None
+    return stock.apply_delta(delta[0], delta[1], doc.get('date'), 'activity', doc.get('id'), session,
+                             projection={'_id': 0, 'price_per_unit': 1})
+
+
 class ActivityService:
     @staticmethod
     def get_activities(filters=None):
@@ -22,129 +69,155 @@ class ActivityService:
     @staticmethod
     def create_activity(data):
         col = get_collection('activities')
-        mat_col = get_collection('materials')
-        
-        act_type = data.get('activity_type')
-        if not act_type: raise ValueError("activity_type is required")
-            
-        field_id = data.get('field_id') or data.get('fieldId')
-        qty = _to_num(data.get('quantity_used'))
-        cost = _to_num(data.get('cost'))
-        income = _to_num(data.get('income'))
-
-        doc = {
-            'id': data.get('id') or generate_id(),
-            'date': data.get('date', datetime.utcnow().strftime('%Y-%m-%d')),
-            'field_id': field_id,
-            'activity_type': act_type,
-            'material_id': data.get('material_id'),
-            'quantity_used': qty,
-            'cost': cost,
-            'income': income,
-            'notes': data.get('notes', ''),
-            'created_at': data.get('created_at', datetime.utcnow().isoformat() + 'Z')
-        }
-
-        mat_id = doc['material_id']
-
-        # Business Logic Rules
-        if act_type == 'material_purchase':
-            if mat_id and qty > 0:
-                mat_col.update_one({'id': mat_id}, {'$inc': {'stock_quantity': qty}})
-        
-        elif act_type in ('fertilizer_application', 'pesticide_spray', 'seed_sowing'):
-            if mat_id and qty > 0:
-                mat = mat_col.find_one({'id': mat_id})
-                if mat:
-                    mat_col.update_one({'id': mat_id}, {'$inc': {'stock_quantity': -qty}})
-                    price_per_unit = _to_num(mat.get('price_per_unit', 0))
-                    # Only update cost if not manually provided
-                    if not data.get('cost'):
-                        doc['cost'] = _to_num(qty * price_per_unit)
-
-        elif act_type == 'harvest':
-            pass
-            
-        elif act_type == 'irrigation':
-            # Water record usually doesn't have cost/income in simple mode
-            doc['cost'] = cost
-            doc['income'] = income
-
-        col.insert_one(doc)
+        base = _build_activity_doc(data)
+
+        def write(session):
+            doc = dict(base)
+            # Business Logic Rules: stock moves and the price is read in the same step
+            mat = _apply_stock(_stock_delta(doc), doc, session)
+            if mat is not None and doc['activity_type'] in CONSUMING_TYPES and not data.get('cost'):
+                doc['cost'] = _to_num(doc['quantity_used'] * _to_num(mat.get('price_per_unit', 0)))
+            col.insert_one(doc, session=session)
+            return doc
+
+        doc = run_in_transaction(write)
+        bump_data_version(doc['field_id'])
         if '_id' in doc:
             del doc['_id']
         return doc
 
+    @staticmethod
+    def bulk_import(rows, batch_size=1000):
+        """Import activities from an iterable of (row number, data or None, error or None).
+
+        Per batch: one `$in` lookup for material prices, one insert_many and stock.apply_deltas
+        (a single aggregated `$inc` per existing material). Stock and cost rules match
+        create_activity. Returns counts plus a per-row error list.
+        """
+        report = {'received': 0, 'inserted': 0, 'materialsUpdated': 0, 'errors': []}
+        batch = []
+        for n, data, error in rows:
+            report['received'] += 1
+            if error is None and not isinstance(data, dict):
+                error = 'row must be an object'
+            if error is None:
+                try:
+                    batch.append((n, data, _build_activity_doc(data)))
+                except ValueError as e:
+                    error = str(e)
+            if error is not None:
+                report['errors'].append({'row': n, 'error': error})
+            if len(batch) >= batch_size:
+                ActivityService._import_batch(batch, report)
+                batch = []
+        if batch:
+            ActivityService._import_batch(batch, report)
+        return report
+
+    @staticmethod
+    def _import_batch(batch, report):
+        col = get_collection('activities')
+        mat_col = get_collection('materials')
+
+        mat_ids = {doc['material_id'] for _, _, doc in batch
+                   if doc['material_id'] and doc['quantity_used'] > 0
+                   and doc['activity_type'] in CONSUMING_TYPES}
+        prices = {}
+        if mat_ids:
+            for mat in mat_col.find({'id': {'$in': list(mat_ids)}}, {'_id': 0, 'id': 1, 'price_per_unit': 1}):
+                prices[mat['id']] = _to_num(mat.get('price_per_unit', 0))
+
+        for _, data, doc in batch:
+            mat_id, qty = doc['material_id'], doc['quantity_used']
+            if doc['activity_type'] in CONSUMING_TYPES and mat_id in prices and qty > 0 and not data.get('cost'):
+                doc['cost'] = _to_num(qty * prices[mat_id])
+
+        docs = [doc for _, _, doc in batch]
+        failed = set()
+        try:
+            col.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            for err in e.details.get('writeErrors', []):
+                failed.add(err['index'])
+                report['errors'].append({'row': batch[err['index']][0], 'error': err.get('errmsg', 'write failed')})
+
+        # Stock only moves for activities that were actually stored
+        changes = []
+        for i, doc in enumerate(docs):
+            delta = _stock_delta(doc)
+            if i in failed or not delta:
+                continue
+            if doc['activity_type'] in CONSUMING_TYPES and delta[0] not in prices:
+                continue
+            changes.append((delta[0], delta[1], doc['date'], 'activity', doc['id']))
+
+        report['inserted'] += len(docs) - len(failed)
+        report['materialsUpdated'] += stock.apply_deltas(changes)
+        bump_data_version(*{doc['field_id'] for i, doc in enumerate(docs) if i not in failed})
+
     @staticmethod
     def update_activity(activity_id, data):
         col = get_collection('activities')
         mat_col = get_collection('materials')
-        
-        doc = col.find_one({'id': activity_id})
+
+        def write(session):
+            doc = col.find_one({'id': activity_id}, session=session)
+            if not doc:
+                return None, None
+            old_field_id = doc.get('field_id')
+            old_date = doc.get('date')
+            old_delta = _stock_delta(doc)
+
+            # Apply updates to doc (shallow merge from data)
+            excluded = ('id', '_id', 'created_at')
+            for k, v in data.items():
+                if k not in excluded:
+                    doc[k] = v
+
+            # Recalculate fields if needed
+            doc['quantity_used'] = _to_num(doc.get('quantity_used'))
+            doc['cost'] = _to_num(doc.get('cost'))
+            doc['income'] = _to_num(doc.get('income'))
+            new_delta = _stock_delta(doc)
+
+            # Revert old stock and apply new: one net change when material and date are unchanged
+            if old_delta and new_delta and old_delta[0] == new_delta[0] and old_date == doc.get('date'):
+                new_delta = (new_delta[0], new_delta[1] - old_delta[1])
+            elif old_delta:
+                stock.apply_delta(old_delta[0], -old_delta[1], old_date, 'activity', activity_id, session)
+            if new_delta and not new_delta[1]:
+                # Stock nets out to no change, but the price is still needed for the cost
+                mat = mat_col.find_one({'id': new_delta[0]}, {'_id': 0, 'price_per_unit': 1}, session=session)
+            else:
+                mat = _apply_stock(new_delta, doc, session)
+            if mat is not None and doc.get('activity_type') in CONSUMING_TYPES and not data.get('cost'):
+                # Auto-calc cost if not provided in update
+                doc['cost'] = _to_num(doc['quantity_used'] * _to_num(mat.get('price_per_unit', 0)))
+
+            col.replace_one({'_id': doc['_id']}, doc, session=session)
+            return doc, old_field_id
+
+        doc, old_field_id = run_in_transaction(write)
         if not doc:
             return None
-
-        # Revert old stock if applicable
-        old_type = doc.get('activity_type')
-        old_mat_id = doc.get('material_id')
-        old_qty = _to_num(doc.get('quantity_used') or 0)
-        
-        # If material changed or quantity changed, we need to revert old and apply new.
-        # Simplify: revert old, then apply new logic.
-        if old_mat_id and old_qty > 0:
-            if old_type == 'material_purchase':
-                mat_col.update_one({'id': old_mat_id}, {'$inc': {'stock_quantity': -old_qty}})
-            elif old_type in ('fertilizer_application', 'pesticide_spray', 'seed_sowing'):
-                mat_col.update_one({'id': old_mat_id}, {'$inc': {'stock_quantity': old_qty}})
-
-        # Apply updates to doc (shallow merge from data)
-        excluded = ('id', '_id', 'created_at')
-        for k, v in data.items():
-            if k not in excluded:
-                doc[k] = v
-        
-        # Recalculate fields if needed
-        act_type = doc.get('activity_type')
-        mat_id = doc.get('material_id')
-        qty = _to_num(doc.get('quantity_used'))
-        doc['quantity_used'] = qty
-        doc['cost'] = _to_num(doc.get('cost'))
-        doc['income'] = _to_num(doc.get('income'))
-
-        # Apply new stock logic
-        if mat_id and qty > 0:
-            if act_type == 'material_purchase':
-                mat_col.update_one({'id': mat_id}, {'$inc': {'stock_quantity': qty}})
-            elif act_type in ('fertilizer_application', 'pesticide_spray', 'seed_sowing'):
-                mat = mat_col.find_one({'id': mat_id})
-                if mat:
-                    mat_col.update_one({'id': mat_id}, {'$inc': {'stock_quantity': -qty}})
-                    if not data.get('cost'): # Auto-calc cost if not provided in update
-                        price_per_unit = _to_num(mat.get('price_per_unit', 0))
-                        doc['cost'] = _to_num(qty * price_per_unit)
-
-        col.replace_one({'id': activity_id}, doc)
+        bump_data_version(old_field_id, doc.get('field_id'))
         if '_id' in doc: del doc['_id']
         return doc
 
     @staticmethod
     def delete_activity(activity_id):
         col = get_collection('activities')
-        mat_col = get_collection('materials')
-        doc = col.find_one({'id': activity_id})
-        
-        if not doc:
-            return False
-
-        # Revert stock changes if applicable
-        act_type = doc.get('activity_type')
-        mat_id = doc.get('material_id')
-        qty = _to_num(doc.get('quantity_used'))
 
-        if act_type == 'material_purchase' and mat_id and qty > 0:
-            mat_col.update_one({'id': mat_id}, {'$inc': {'stock_quantity': -qty}})
-        elif act_type in ('fertilizer_application', 'pesticide_spray', 'seed_sowing') and mat_id and qty > 0:
-            mat_col.update_one({'id': mat_id}, {'$inc': {'stock_quantity': qty}})
+        def write(session):
+            doc = col.find_one_and_delete({'id': activity_id}, session=session)
+            # Revert stock changes if applicable
+            delta = _stock_delta(doc) if doc else None
+            if delta:
+                stock.apply_delta(delta[0], -delta[1], doc.get('date'), 'activity', activity_id, session)
+            return doc
 
-        col.delete_one({'id': activity_id})
+        doc = run_in_transaction(write)
+        if not doc:
+            return False
+        bump_data_version(doc.get('field_id'))
         return True
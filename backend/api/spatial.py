@@ -0,0 +1,252 @@
+"""In-process spatial index of field outlines, used to catch overlapping fields on write.
+
+`overlapping(coordinates)` returns the ids of live fields whose outline shares interior
+area with `coordinates` (fields that only touch along an edge or at a corner do not
+count). Candidates come from an STR-packed R-tree over field bounding boxes; each
+candidate then gets an exact polygon test.
+
+The index is built lazily from Mongo and tagged with the tile version token
+(api/tiles.py), which every field write replaces. A write in this process updates the
+index in place and adopts the new token only if the token it replaced is the one the
+index was built at; otherwise another worker wrote in between and the index is dropped,
+so the next check rebuilds it. Checks re-read the token (one Mongo round trip) at most
+every SPATIAL_VERSION_TTL seconds, so another worker's write can go unseen for that long;
+this process's own writes are seen at once. Writes are kept in a small side list and
+folded into the packed tree once it grows past REPACK_AFTER.
+
+The check and the write that follows it are not atomic: two workers saving overlapping
+outlines at the same moment can both pass the check. The overlap test guards against
+mistakes at the map, not against that race.
+"""
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+
+from . import field_deletion, tiles
+from .field_metrics import EARTH_RADIUS_M
+from .db import get_collection
+from .geometry import bbox, ring
+
+NODE_CAPACITY = 16
+REPACK_AFTER = 64
+# Distances (metres) below this count as touching, not overlapping
+TOLERANCE_M = 0.05
+
+
+class STRTree:
+    """Static R-tree over (id, (west, south, east, north)), leaves packed Sort-Tile-Recursive.
+
+    Levels are stored root first; the children of node i are nodes i*capacity .. (i+1)*capacity-1
+    of the level below, so the tree is a list of box arrays with no pointers.
+    """
+
+    def __init__(self, items, capacity=NODE_CAPACITY):
+        self.capacity = capacity
+        self.ids = []
+        self.levels = []
+        if not items:
+            return
+        boxes = np.array([b for _, b in items], dtype=float)
+        order = self._pack_order(boxes)
+        self.ids = [items[i][0] for i in order]
+        levels = [boxes[order]]
+        while len(levels[-1]) > 1:
+            below = levels[-1]
+            starts = np.arange(0, len(below), capacity)
+            levels.append(np.column_stack([
+                np.minimum.reduceat(below[:, 0], starts), np.minimum.reduceat(below[:, 1], starts),
+                np.maximum.reduceat(below[:, 2], starts), np.maximum.reduceat(below[:, 3], starts),
+            ]))
+        self.levels = levels[::-1]
+
+    def _pack_order(self, boxes):
+        """STR order: sort by x centre, cut into vertical slices, sort each slice by y centre."""
+        n = len(boxes)
+        cx = (boxes[:, 0] + boxes[:, 2]) / 2
+        cy = (boxes[:, 1] + boxes[:, 3]) / 2
+        slices = max(1, int(np.ceil(np.sqrt(np.ceil(n / self.capacity)))))
+        per_slice = int(np.ceil(n / slices / self.capacity)) * self.capacity
+        by_x = np.argsort(cx, kind="stable")
+        return np.concatenate([
+            chunk[np.argsort(cy[chunk], kind="stable")]
+            for chunk in (by_x[i:i + per_slice] for i in range(0, n, per_slice))
+        ])
+
+    def query(self, box):
+        """Ids whose bounding box intersects `box`."""
+        west, south, east, north = box
+        nodes = np.array([0])
+        for depth, boxes in enumerate(self.levels):
+            b = boxes[nodes]
+            nodes = nodes[(b[:, 0] <= east) & (b[:, 2] >= west) & (b[:, 1] <= north) & (b[:, 3] >= south)]
+            if not len(nodes):
+                return []
+            if depth == len(self.levels) - 1:
+                return [self.ids[i] for i in nodes]
+            size = len(self.levels[depth + 1])
+            nodes = (nodes[:, None] * self.capacity + np.arange(self.capacity)).ravel()
+            nodes = nodes[nodes < size]
+        return []
+
+
+def _local(a, b):
+    """Both outlines in metres on a local equirectangular projection."""
+    lat0 = np.radians((a[:, 1].mean() + b[:, 1].mean()) / 2)
+    scale = np.array([np.cos(lat0), 1.0]) * np.radians(1) * EARTH_RADIUS_M
+    origin = a[0]
+    return (a - origin) * scale, (b - origin) * scale
+
+
+def _cross(o, p, q):
+    return (p[..., 0] - o[..., 0]) * (q[..., 1] - o[..., 1]) - (p[..., 1] - o[..., 1]) * (q[..., 0] - o[..., 0])
+
+
+def _edges_cross(a, b, tol):
+    """True if any edge of `a` properly crosses an edge of `b` (not just touching)."""
+    a1, a2 = a[:, None, :], np.roll(a, -1, axis=0)[:, None, :]
+    b1, b2 = b[None, :, :], np.roll(b, -1, axis=0)[None, :, :]
+    len_a = np.hypot(*(a2 - a1).transpose(2, 0, 1))
+    len_b = np.hypot(*(b2 - b1).transpose(2, 0, 1))
+    # Signed distances of each segment's endpoints from the other segment's line
+    d1, d2 = _cross(a1, a2, b1) / np.maximum(len_a, 1e-12), _cross(a1, a2, b2) / np.maximum(len_a, 1e-12)
+    d3, d4 = _cross(b1, b2, a1) / np.maximum(len_b, 1e-12), _cross(b1, b2, a2) / np.maximum(len_b, 1e-12)
+    return bool(np.any(((d1 > tol) & (d2 < -tol) | (d1 < -tol) & (d2 > tol))
+                       & ((d3 > tol) & (d4 < -tol) | (d3 < -tol) & (d4 > tol))))
+
+
+def _strictly_inside(points, poly, tol):
+    """Mask of points inside `poly` and farther than `tol` from its boundary."""
+    p = points[:, None, :]
+    v1, v2 = poly[None, :, :], np.roll(poly, -1, axis=0)[None, :, :]
+    # Even-odd rule with a horizontal ray
+    straddles = (v1[..., 1] > p[..., 1]) != (v2[..., 1] > p[..., 1])
+    dy = np.where(v2[..., 1] == v1[..., 1], 1e-12, v2[..., 1] - v1[..., 1])
+    x_at = v1[..., 0] + (p[..., 1] - v1[..., 1]) * (v2[..., 0] - v1[..., 0]) / dy
+    inside = np.count_nonzero(straddles & (p[..., 0] < x_at), axis=1) % 2 == 1
+    # Distance to the nearest edge
+    seg = v2 - v1
+    seg_len2 = np.maximum((seg ** 2).sum(-1), 1e-24)
+    t = np.clip(((p - v1) * seg).sum(-1) / seg_len2, 0, 1)
+    nearest = v1 + t[..., None] * seg
+    dist = np.hypot(*(p - nearest).transpose(2, 0, 1)).min(axis=1)
+    return inside & (dist > tol)
+
+
+def _interior_point(poly):
+    """A point inside `poly`: middle of the first inside span of a horizontal line through it."""
+    ys = np.sort(np.unique(poly[:, 1]))
+    y = (ys[0] + ys[-1]) / 2
+    if len(ys) > 1 and np.any(np.isclose(poly[:, 1], y)):
+        y = (ys[0] + ys[1]) / 2
+    v1, v2 = poly, np.roll(poly, -1, axis=0)
+    straddles = (v1[:, 1] > y) != (v2[:, 1] > y)
+    xs = np.sort(v1[straddles, 0] + (y - v1[straddles, 1]) * (v2[straddles, 0] - v1[straddles, 0])
+                 / (v2[straddles, 1] - v1[straddles, 1]))
+    if len(xs) < 2:
+        return None
+    return np.array([[(xs[0] + xs[1]) / 2, y]])
+
+
+def polygons_overlap(a_points, b_points, tol=TOLERANCE_M):
+    """True if two (lng, lat) outlines share interior area."""
+    a, b = _local(np.asarray(a_points, dtype=float), np.asarray(b_points, dtype=float))
+    if _edges_cross(a, b, tol):
+        return True
+    if _strictly_inside(a, b, tol).any() or _strictly_inside(b, a, tol).any():
+        return True
+    # No crossings and no vertex inside: either disjoint, identical or one contains the other
+    for inner, outer in ((a, b), (b, a)):
+        point = _interior_point(inner)
+        if point is not None and _strictly_inside(point, outer, tol).any():
+            return True
+    return False
+
+
+class FieldIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.version = None
+        self.checked = float("-inf")  # time.monotonic() of the last token read
+        self.shapes = {}  # field id -> (points array, bbox)
+        self.tree = STRTree([])
+        self.recent = set()  # ids written since the tree was packed
+        self.removed = set()
+
+    def _rebuild(self, version):
+        shapes = {}
+        for doc in get_collection("fields").find(field_deletion.LIVE, {"_id": 0, "id": 1, "coordinates": 1}):
+            points = ring(doc.get("coordinates"))
+            if doc.get("id") and len(set(points)) >= 3:
+                shapes[doc["id"]] = (np.asarray(points, dtype=float), bbox(points))
+        self.shapes = shapes
+        self._repack()
+        self.version = version
+
+    def _repack(self):
+        self.tree = STRTree([(fid, box) for fid, (_, box) in self.shapes.items()])
+        self.recent, self.removed = set(), set()
+
+    def overlapping(self, coordinates, exclude=None):
+        points = ring(coordinates)
+        if len(set(points)) < 3:
+            return []
+        box = bbox(points)
+        current = self._current()
+        with self._lock:
+            if current != self.version:
+                self._rebuild(current)
+            candidates = set(self.tree.query(box)) - self.removed
+            for fid in self.recent:
+                w, s, e, n = self.shapes[fid][1]
+                if w <= box[2] and e >= box[0] and s <= box[3] and n >= box[1]:
+                    candidates.add(fid)
+            candidates.discard(exclude)
+            shapes = [(fid, self.shapes[fid][0]) for fid in sorted(candidates) if fid in self.shapes]
+        return [fid for fid, other in shapes if polygons_overlap(points, other)]
+
+    def _current(self):
+        """The token to check against: read from Mongo when unknown or older than the TTL."""
+        now = time.monotonic()
+        if self.version is None or now - self.checked >= getattr(settings, "SPATIAL_VERSION_TTL", 1.0):
+            self.checked = now
+            return tiles.version()
+        return self.version
+
+    def _adopt(self, previous, version):
+        """Move to `version` after a write that replaced `previous`; False (index dropped) if we missed one."""
+        if self.version is None:
+            return False
+        if previous != self.version:
+            self.version = None
+            return False
+        self.version = version
+        self.checked = time.monotonic()
+        return True
+
+    def record(self, previous, version, field_id, coordinates=None):
+        """Apply this process's own write (outline changed, or removed when coordinates is None).
+
+        `previous, version` are the tokens returned by tiles.invalidate() for that write.
+        """
+        with self._lock:
+            if not self._adopt(previous, version):
+                return
+            points = ring(coordinates) if coordinates is not None else []
+            self.removed.add(field_id)
+            self.recent.discard(field_id)
+            self.shapes.pop(field_id, None)
+            if len(set(points)) >= 3:
+                self.shapes[field_id] = (np.asarray(points, dtype=float), bbox(points))
+                self.recent.add(field_id)
+            if len(self.recent) + len(self.removed) > REPACK_AFTER:
+                self._repack()
+
+    def touch(self, previous, version):
+        """Adopt the token of this process's own write that left every outline unchanged."""
+        with self._lock:
+            self._adopt(previous, version)
+
+
+index = FieldIndex()
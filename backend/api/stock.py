@@ -0,0 +1,186 @@
+"""Material stock ledger and point-in-time balances.
+
+Every stock change (activities, material transactions, daily register usage, manual edits)
+goes through this module: it adds the change to `materials.stock_quantity` (keeping the legacy
+`currentStock` mirror equal to it) and appends an entry to `stock_ledger`:
+
+    {materialId, delta, date, source, sourceId, createdAt}
+
+`date` is the business date of the change, so the ledger answers "stock on date X".
+Deleting or editing a record appends a reversing entry; the ledger is never rewritten.
+
+`stock_snapshots` holds {materialId, date, balance} as of the end of a completed day
+(written by `python manage.py snapshot_stock`). Stock on X = newest snapshot at or before X
+plus the ledger deltas after it, over the (materialId, date) index. A backdated entry drops
+the snapshots it would change; they are rebuilt on the next snapshot run.
+`python manage.py reconcile_stock` recomputes every material's stock from the ledger.
+"""
+from datetime import datetime
+
+from pymongo import UpdateOne
+
+from .db import get_collection
+
+LEDGER_COLLECTION = "stock_ledger"
+SNAPSHOTS_COLLECTION = "stock_snapshots"
+# Date for opening balances recorded when the ledger is bootstrapped on existing data
+OPENING_DATE = "1970-01-01"
+
+
+def _today():
+    return datetime.utcnow().strftime("%Y-%m-%d")
+
+
+def entry_date(date):
+    """Business date for a ledger entry: the record's YYYY-MM-DD date, or today."""
+    date = str(date or "")[:10]
+    try:
+        datetime.strptime(date, "%Y-%m-%d")
+    except ValueError:
+        return _today()
+    return date
+
+
+def _inc(delta):
+    """Pipeline update adding `delta` to stock_quantity and copying it to currentStock, so the
+    legacy mirror is exact even on materials that never had it."""
+    return [
+        {"$set": {"stock_quantity": {"$add": [{"$ifNull": ["$stock_quantity", 0]}, delta]}}},
+        {"$set": {"currentStock": "$stock_quantity"}},
+    ]
+
+
+def _entry(material_id, delta, date, source, source_id):
+    return {
+        "materialId": material_id,
+        "delta": delta,
+        "date": entry_date(date),
+        "source": source,
+        "sourceId": source_id,
+        "createdAt": datetime.utcnow().isoformat() + "Z",
+    }
+
+
+def _invalidate_snapshots(entries, session=None):
+    """Drop snapshots a backdated entry changes. Snapshots only cover completed days, so
+    entries dated today or later never need this (and cost no extra round trip)."""
+    today = _today()
+    backdated = [e for e in entries if e["date"] < today]
+    if backdated:
+        get_collection(SNAPSHOTS_COLLECTION).delete_many({
+            "materialId": {"$in": sorted({e["materialId"] for e in backdated})},
+            "date": {"$gte": min(e["date"] for e in backdated)},
+        }, session=session)
+
+
+def apply_delta(material_id, delta, date, source, source_id, session=None, projection=None):
+    """Change one material's stock and record it. Returns the material (after the update,
+    limited to `projection`) or None if it does not exist, in which case nothing is recorded."""
+    if not material_id or not delta:
+        return None
+    mat = get_collection("materials").find_one_and_update(
+        {"id": material_id}, _inc(delta),
+        projection=projection or {"_id": 0, "id": 1}, session=session,
+    )
+    if mat is not None:
+        entry = _entry(material_id, delta, date, source, source_id)
+        get_collection(LEDGER_COLLECTION).insert_one(entry, session=session)
+        _invalidate_snapshots([entry], session)
+    return mat
+
+
+def apply_deltas(changes, session=None):
+    """Apply many changes at once: one `$in` lookup, one bulk_write with a single update per
+    material and one insert_many into the ledger. `changes` are (materialId, delta, date,
+    source, sourceId). As in apply_delta, changes to materials that do not exist are not
+    recorded. Returns the number of materials whose stock was updated."""
+    entries = [_entry(*change) for change in changes if change[0] and change[1]]
+    if not entries:
+        return 0
+    existing = {m["id"] for m in get_collection("materials").find(
+        {"id": {"$in": sorted({e["materialId"] for e in entries})}}, {"_id": 0, "id": 1}, session=session)}
+    entries = [e for e in entries if e["materialId"] in existing]
+    if not entries:
+        return 0
+    totals = {}
+    for e in entries:
+        totals[e["materialId"]] = totals.get(e["materialId"], 0) + e["delta"]
+    ops = [UpdateOne({"id": mat_id}, _inc(total)) for mat_id, total in totals.items() if total]
+    matched = 0
+    if ops:
+        matched = get_collection("materials").bulk_write(ops, ordered=False, session=session).matched_count
+    get_collection(LEDGER_COLLECTION).insert_many(entries, ordered=False, session=session)
+    _invalidate_snapshots(entries, session)
+    return matched
+
+
+def set_stock(material_id, before, after, source="adjustment", source_id=None, date=None):
+    """Record a manual stock correction (the material document was already updated)."""
+    delta = (after or 0) - (before or 0)
+    if material_id and delta:
+        entry = _entry(material_id, delta, date, source, source_id or material_id)
+        get_collection(LEDGER_COLLECTION).insert_one(entry)
+        _invalidate_snapshots([entry])
+
+
+def record_opening(material_id, amount):
+    """Opening balance of a newly created material (it has no snapshots to invalidate yet)."""
+    if material_id and amount:
+        get_collection(LEDGER_COLLECTION).insert_one(_entry(material_id, amount, OPENING_DATE, "opening", material_id))
+
+
+def apply_opening_entries(openings):
+    """Record (materialId, amount) opening balances without touching the materials themselves."""
+    entries = [_entry(mat_id, amount, OPENING_DATE, "opening", mat_id) for mat_id, amount in openings if amount]
+    if entries:
+        get_collection(LEDGER_COLLECTION).insert_many(entries, ordered=False)
+        _invalidate_snapshots(entries)
+    return len(entries)
+
+
+def forget_material(material_id):
+    """Remove a deleted material's ledger and snapshots."""
+    get_collection(LEDGER_COLLECTION).delete_many({"materialId": material_id})
+    get_collection(SNAPSHOTS_COLLECTION).delete_many({"materialId": material_id})
+
+
+def stock_on(material_id, date):
+    """Balance at the end of `date`: newest snapshot at or before it plus the ledger after it."""
+    snap = get_collection(SNAPSHOTS_COLLECTION).find_one(
+        {"materialId": material_id, "date": {"$lte": date}}, {"_id": 0}, sort=[("date", -1)],
+    )
+    match = {"materialId": material_id, "date": {"$lte": date}}
+    if snap:
+        match["date"]["$gt"] = snap["date"]
+    rows = list(get_collection(LEDGER_COLLECTION).aggregate([
+        {"$match": match},
+        {"$group": {"_id": None, "delta": {"$sum": "$delta"}, "entries": {"$sum": 1}}},
+    ]))
+    delta = rows[0]["delta"] if rows else 0
+    return {
+        "materialId": material_id,
+        "date": date,
+        "stock": (snap["balance"] if snap else 0) + delta,
+        "snapshotDate": snap["date"] if snap else None,
+        "replayedEntries": rows[0]["entries"] if rows else 0,
+    }
+
+
+def ledger_totals(match=None):
+    """{materialId: sum of deltas} for all materials in one aggregation."""
+    pipeline = [{"$group": {"_id": "$materialId", "total": {"$sum": "$delta"}}}]
+    if match:
+        pipeline.insert(0, {"$match": match})
+    return {row["_id"]: row["total"] for row in get_collection(LEDGER_COLLECTION).aggregate(pipeline)}
+
+
+def write_snapshots(date):
+    """Snapshot every material's balance as of the end of `date` (upserted, so re-runs are safe)."""
+    totals = ledger_totals({"date": {"$lte": date}})
+    ops = [
+        UpdateOne({"materialId": mat_id, "date": date}, {"$set": {"balance": total}}, upsert=True)
+        for mat_id, total in totals.items()
+    ]
+    if ops:
+        get_collection(SNAPSHOTS_COLLECTION).bulk_write(ops, ordered=False)
+    return len(ops)
@@ -0,0 +1,440 @@
+"""Deterministic synthetic farms for profiling, load tests and demos.
+
+    python manage.py generate_farm --fields 2500 --seasons 2     # about a million records
+    python manage.py generate_farm --fields 5 --seed 1           # a small demo farm
+
+The same seed and arguments always give the same ids and values: each field draws from its
+own `random.Random(f"{seed}:{index}")` and the regional weather from a NumPy generator on the
+seed, so field N is identical however many fields are generated and however they are batched.
+
+Per field (ids `<prefix>-f000123`; its records `<field id>-a7`, `-d3`, ...):
+
+    outline   4-7 vertex polygon inside the field's own grid cell near Lahore (fields never
+              overlap), stored with the metrics, LOD and GeoJSON the API adds
+    seasons   cultivated fields grow wheat in Rabi (Nov-Apr) and rice, cotton or maize in
+              Kharif (May-Oct): inputs bought (material_purchase), ploughing, sowing and
+              fertilizer (stock drawn down), spraying logged in the daily register,
+              irrigation every 7-14 days, harvest sold
+    weather   one reading per day: a seasonal curve, regional weather shared by every field
+              and a little local noise, with min and max
+    leases    thaka fields are let year by year, with the lease income
+    legacy    every fifth field keeps irrigation in water_records and money in
+              expenses/incomes, like data from before activities existed
+
+Documents go out through insert_many in batches. Stock moves through stock.apply_deltas and
+temperature through the configured storage plus rollups, so balances, the ledger and the
+7/14/30-day aggregates match what the API would have written.
+"""
+import logging
+import math
+import random
+from datetime import date as Date, datetime, timedelta
+
+import numpy as np
+
+from . import field_deletion, field_metrics, geometry, lod, stock, temperature, tiles
+from .db import get_collection
+
+logger = logging.getLogger("api.synthetic")
+
+DEFAULT_PREFIX = "syn"
+ORIGIN = (31.20, 73.90)  # lat, lng of the grid's south-west corner
+CELL_DEG = 0.003  # about 330 m x 285 m per field
+# Statuses repeat every 20 fields (60% cultivated, 15% thaka, 10% available, 10% uncultivated,
+# 5% not usable), so even a five-field farm has every kind of record
+STATUS_CYCLE = ("cultivated", "thaka", "cultivated", "available", "cultivated",
+                "cultivated", "uncultivated", "cultivated", "thaka", "cultivated",
+                "cultivated", "available", "cultivated", "cultivated", "not_usable",
+                "cultivated", "cultivated", "thaka", "uncultivated", "cultivated")
+LEGACY_EVERY = 5
+SEASON_DAYS = 182
+OPENING_STOCK = 1000
+
+PLACES = ("Kot Lakhpat", "Raiwind", "Manga Mandi", "Kahna", "Bhaini", "Shahdara", "Muridke",
+          "Chung", "Barki", "Jallo", "Sundar", "Pattoki", "Kasur Road", "Bedian")
+TENANTS = ("Ahmed Hassan", "Muhammad Aslam", "Ghulam Rasool", "Nadeem Akhtar", "Rana Tariq",
+           "Shahid Mehmood", "Imran Bashir", "Zafar Iqbal", "Khalid Javed", "Asif Nawaz")
+NOT_USABLE_REASONS = ("Water logging and soil salinity", "Under litigation", "Eroded by flood channel")
+
+# key -> (name, category, unit, price per unit in Rs)
+MATERIALS = {
+    "urea": ("Urea", "fertilizer", "bag", 4500),
+    "dap": ("DAP", "fertilizer", "bag", 12000),
+    "wheat_seed": ("Wheat seed", "seeds", "kg", 150),
+    "rice_seed": ("Basmati rice seed", "seeds", "kg", 400),
+    "cotton_seed": ("BT cotton seed", "seeds", "kg", 600),
+    "maize_seed": ("Hybrid maize seed", "seeds", "kg", 900),
+    "pesticide": ("Chlorpyrifos", "pesticide", "litre", 2200),
+}
+# crop -> (seed material, seed per acre, urea bags/acre, DAP bags/acre, pesticide litres/acre,
+#          days between irrigations, sale Rs/acre)
+CROPS = {
+    "wheat": ("wheat_seed", 50, 2, 1, 0.5, 14, 180_000),
+    "rice": ("rice_seed", 6, 2, 1, 1.0, 7, 220_000),
+    "cotton": ("cotton_seed", 8, 3, 1, 1.5, 12, 240_000),
+    "maize": ("maize_seed", 10, 3, 1, 0.5, 10, 200_000),
+}
+
+
+def material_id(prefix, key):
+    return f"{prefix}-m-{key}"
+
+
+def field_id(prefix, index):
+    return f"{prefix}-f{index:06d}"
+
+
+def outline(index, n_fields, rng):
+    """Polygon in the field's grid cell: 4-7 vertices at sorted angles around the cell centre."""
+    cols = max(1, math.ceil(math.sqrt(n_fields)))
+    row, col = divmod(index, cols)
+    lat0 = ORIGIN[0] + (row + 0.5) * CELL_DEG
+    lng0 = ORIGIN[1] + (col + 0.5) * CELL_DEG
+    size = rng.uniform(0.45, 0.95) * CELL_DEG / 2
+    vertices = rng.randint(4, 7)
+    start = rng.uniform(0, 2 * math.pi)
+    angles = sorted(start + (k + rng.uniform(-0.3, 0.3)) * 2 * math.pi / vertices for k in range(vertices))
+    return [{"lat": round(lat0 + size * rng.uniform(0.7, 1.0) * math.sin(a), 7),
+             "lng": round(lng0 + size * rng.uniform(0.7, 1.0) * math.cos(a), 7)} for a in angles]
+
+
+def _seasons(start, end):
+    """(crop choices, earliest sowing date, harvest date) for every season sown between start and end.
+
+    Fields sow up to 20 days after the earliest date.
+    """
+    out = []
+    for year in range(start.year - 1, end.year + 1):
+        for crops, sow, harvest in ((("rice", "cotton", "maize"), Date(year, 5, 10), Date(year, 10, 5)),
+                                    (("wheat",), Date(year, 11, 1), Date(year + 1, 4, 10))):
+            if start <= sow <= end:
+                out.append((crops, sow, harvest))
+    return out
+
+
+def _weather(seed, start, days):
+    """Regional daily mean temperature (°C): seasonal curve plus autocorrelated weather."""
+    rng = np.random.default_rng(seed)
+    doy = np.array([(start + timedelta(days=d)).timetuple().tm_yday for d in range(days)])
+    seasonal = 25 + 9.5 * np.sin(2 * np.pi * (doy - 105) / 365)
+    shocks = rng.normal(0, 1.5, days)
+    weather = np.empty(days)
+    level = 0.0
+    for d in range(days):
+        level = 0.7 * level + shocks[d]
+        weather[d] = level
+    return seasonal + weather, doy
+
+
+class _Writer:
+    """Buffers documents per collection and writes them with insert_many in batches."""
+
+    def __init__(self, batch_size):
+        self.batch_size = batch_size
+        self.docs = {}
+        self.stock_changes = []
+        self.readings = []
+        self.counts = {}
+
+    def add(self, collection, doc):
+        docs = self.docs.setdefault(collection, [])
+        docs.append(doc)
+        if len(docs) >= self.batch_size:
+            if collection != "fields":
+                # Fields first, so a run stopped half-way never leaves records without their field
+                self._flush_collection("fields")
+            self._flush_collection(collection)
+
+    def add_stock(self, material, delta, date, source, source_id):
+        self.stock_changes.append((material, delta, date, source, source_id))
+        if len(self.stock_changes) >= self.batch_size:
+            self._flush_stock()
+
+    def add_readings(self, docs, recent):
+        """One field's readings; `recent` (its last 30 days) feed the rollup."""
+        self.readings.append((docs, recent))
+        if sum(len(d) for d, _ in self.readings) >= self.batch_size:
+            self._flush_readings()
+
+    def _count(self, collection, n):
+        self.counts[collection] = self.counts.get(collection, 0) + n
+
+    def _flush_collection(self, collection):
+        docs = self.docs.get(collection)
+        if docs:
+            get_collection(collection).insert_many(docs, ordered=False)
+            self._count(collection, len(docs))
+            self.docs[collection] = []
+
+    def _flush_stock(self):
+        if self.stock_changes:
+            stock.apply_deltas(self.stock_changes)
+            self._count(stock.LEDGER_COLLECTION, len(self.stock_changes))
+            self.stock_changes = []
+
+    def _flush_readings(self):
+        if not self.readings:
+            return
+        if temperature.use_buckets():
+            buckets = []
+            for docs, _ in self.readings:
+                by_month = {}
+                for doc in docs:
+                    reading = {k: doc[k] for k in ("id", "date", "temperatureC", "minTempC", "maxTempC")}
+                    by_month.setdefault(temperature.month_of(doc["date"]), []).append(reading)
+                for month, readings in by_month.items():
+                    buckets.append({"fieldId": docs[0]["fieldId"], "month": month, "readings": readings,
+                                    "count": len(readings), "firstDate": readings[0]["date"],
+                                    "lastDate": readings[-1]["date"]})
+            get_collection(temperature.BUCKETS_COLLECTION).insert_many(buckets, ordered=False)
+        else:
+            get_collection(temperature.RECORDS_COLLECTION).insert_many(
+                [doc for docs, _ in self.readings for doc in docs], ordered=False)
+        temperature.update_rollups([doc for _, recent in self.readings for doc in recent], replace=True)
+        self._count(temperature.RECORDS_COLLECTION, sum(len(docs) for docs, _ in self.readings))
+        self.readings = []
+
+    def flush(self):
+        self._flush_collection("fields")
+        for collection in list(self.docs):
+            self._flush_collection(collection)
+        self._flush_stock()
+        self._flush_readings()
+
+
+class _Field:
+    """Records for one field, numbered per kind (`<field id>-a1`, `-a2`, ...)."""
+
+    def __init__(self, writer, fid, acres, rng, legacy):
+        self.writer, self.id, self.acres, self.rng, self.legacy = writer, fid, acres, rng, legacy
+        self.seq = {}
+
+    def next_id(self, kind):
+        self.seq[kind] = self.seq.get(kind, 0) + 1
+        return f"{self.id}-{kind}{self.seq[kind]}"
+
+    def activity(self, date, activity_type, material=None, quantity=0, cost=0, income=0, notes=""):
+        doc = {
+            "id": self.next_id("a"), "date": date.isoformat(), "field_id": self.id,
+            "activity_type": activity_type, "material_id": material, "quantity_used": quantity,
+            "cost": cost, "income": income, "notes": notes, "created_at": f"{date.isoformat()}T08:00:00Z",
+        }
+        self.writer.add("activities", doc)
+        if material and quantity > 0:
+            delta = quantity if activity_type == "material_purchase" else -quantity
+            self.writer.add_stock(material, delta, doc["date"], "activity", doc["id"])
+        return doc
+
+    def money(self, date, kind, amount, description):
+        """Labour, lease or sale: an activity, or an expense/income record on legacy fields."""
+        amount = int(round(amount, -2))
+        if not self.legacy:
+            self.activity(date, "income" if kind in ("crop", "thaka") else "labor",
+                          cost=0 if kind in ("crop", "thaka") else amount,
+                          income=amount if kind in ("crop", "thaka") else 0, notes=description)
+        elif kind in ("crop", "thaka"):
+            self.writer.add("incomes", {"id": self.next_id("i"), "fieldId": self.id, "type": kind,
+                                        "amount": amount, "description": description, "date": date.isoformat()})
+        else:
+            self.writer.add("expenses", {"id": self.next_id("e"), "fieldId": self.id, "category": kind,
+                                         "amount": amount, "description": description, "date": date.isoformat()})
+
+    def register(self, date, activity, materials=(), labor_cost=None, water_minutes=None, notes=None):
+        doc = {
+            "id": self.next_id("d"), "date": date.isoformat(), "fieldId": self.id, "activity": activity,
+            "materialsUsed": [{"materialId": m, "quantity": q} for m, q in materials],
+            "laborCost": labor_cost, "waterMinutes": water_minutes, "notes": notes,
+        }
+        self.writer.add("daily_register", doc)
+        for mat, qty in materials:
+            tx = {"id": self.next_id("t"), "materialId": mat, "type": "out", "quantity": qty, "date": doc["date"],
+                  "fieldId": self.id, "notes": f"Daily register: {activity}", "registerId": doc["id"]}
+            self.writer.add("material_transactions", tx)
+            self.writer.add_stock(mat, -qty, doc["date"], "daily_register", doc["id"])
+
+    def irrigate(self, date, minutes, notes):
+        if self.legacy:
+            self.writer.add("water_records", {"id": self.next_id("w"), "fieldId": self.id, "date": date.isoformat(),
+                                              "durationMinutes": minutes, "notes": notes})
+        else:
+            self.activity(date, "irrigation", quantity=minutes, notes=notes)
+
+
+def _season(f, prefix, crop, sow, harvest, start, end):
+    """One crop season on a cultivated field; events after `end` are not written yet."""
+    rng = f.rng
+    seed_key, seed_rate, urea_rate, dap_rate, spray_rate, interval, sale_rate = CROPS[crop]
+    acres = f.acres
+    # Whole units, so stock sums come out the same however the changes are batched
+    seed_qty = max(1, round(seed_rate * acres))
+    urea_qty = max(1, round(urea_rate * acres))
+    dap_qty = max(1, round(dap_rate * acres))
+    spray_qty = max(1, round(spray_rate * acres))
+
+    def on(day, write):
+        if day <= end:
+            write(day)
+
+    price = {key: MATERIALS[key][3] for key in MATERIALS}
+    purchases = ((seed_key, seed_qty), ("urea", urea_qty), ("dap", dap_qty), ("pesticide", spray_qty))
+    for key, qty in purchases:
+        on(max(start, sow - timedelta(days=7)), lambda d, key=key, qty=qty: f.activity(
+            d, "material_purchase", material_id(prefix, key), qty, cost=int(qty * price[key]),
+            notes=f"{MATERIALS[key][0]} for {crop}"))
+    on(sow - timedelta(days=4), lambda d: f.register(d, "ploughing", labor_cost=int(round(1500 * acres, -2)),
+                                                       notes="Seedbed preparation"))
+    on(sow, lambda d: f.activity(d, "seed_sowing", material_id(prefix, seed_key), seed_qty,
+                                 cost=int(seed_qty * price[seed_key]), notes=f"{crop.title()} sowing"))
+    on(sow, lambda d: f.activity(d, "fertilizer_application", material_id(prefix, "dap"), dap_qty,
+                                 cost=dap_qty * price["dap"], notes="Basal DAP"))
+    for split, day in enumerate((25, 55)):
+        qty = urea_qty // 2 + (urea_qty % 2 if split else 0)
+        if qty:
+            on(sow + timedelta(days=day + rng.randint(-3, 3)), lambda d, qty=qty: f.activity(
+                d, "fertilizer_application", material_id(prefix, "urea"), qty,
+                cost=qty * price["urea"], notes="Urea top dressing"))
+    on(sow + timedelta(days=70 + rng.randint(-5, 5)), lambda d: f.register(
+        d, "spraying", [(material_id(prefix, "pesticide"), spray_qty)], labor_cost=int(round(400 * acres, -2)),
+        notes="Pest control spray"))
+    on(sow + timedelta(days=40), lambda d: f.money(d, "labor", 2500 * acres, f"Field labour, {crop}"))
+
+    day = sow + timedelta(days=rng.randint(1, 4))
+    while day < harvest - timedelta(days=10):
+        minutes = int(round(acres * rng.uniform(120, 200), -1))
+        on(day, lambda d, minutes=minutes: f.irrigate(d, minutes, f"{crop.title()} irrigation"))
+        day += timedelta(days=interval + rng.randint(-2, 2))
+
+    on(harvest, lambda d: f.register(d, "harvesting", labor_cost=int(round(3000 * acres, -2)),
+                                     notes=f"{crop.title()} harvest"))
+    on(harvest + timedelta(days=rng.randint(3, 15)), lambda d: f.money(
+        d, "crop", sale_rate * acres * rng.uniform(0.75, 1.15), f"{crop.title()} sale"))
+
+
+def _lease(f, start, end):
+    """Year-long thaka leases covering the period, the current one active."""
+    tenant = f.rng.choice(TENANTS)
+    rent = int(round(f.acres * f.rng.uniform(55_000, 75_000), -3))
+    lease_start = Date(start.year, 1, 1)
+    while lease_start <= end:
+        lease_end = Date(lease_start.year, 12, 31)
+        f.writer.add("thaka_records", {
+            "id": f.next_id("l"), "fieldId": f.id, "tenantName": tenant,
+            "tenantContact": f"+92-3{f.rng.randint(0, 49):02d}-{f.rng.randint(1_000_000, 9_999_999)}",
+            "startDate": lease_start.isoformat(), "endDate": lease_end.isoformat(),
+            "amount": rent, "status": "active" if lease_end >= end else "expired",
+        })
+        f.money(max(lease_start, start), "thaka", rent, f"Thaka {lease_start.year} from {tenant}")
+        lease_start = Date(lease_start.year + 1, 1, 1)
+
+
+def _readings(fid, index, seed, dates, regional, doy):
+    rng = np.random.default_rng([seed, index])
+    mean = np.round(regional + rng.normal(0, 0.7, len(regional)), 1)
+    spread = 11 + 2.5 * np.sin(2 * np.pi * (doy - 120) / 365) + rng.normal(0, 1.0, len(regional))
+    low, high = np.round(mean - spread / 2, 1), np.round(mean + spread / 2, 1)
+    return [{"id": rid, "fieldId": fid, "date": date, "temperatureC": t, "minTempC": lo, "maxTempC": hi, "notes": None}
+            for rid, date, t, lo, hi in zip(temperature.reading_ids(fid, dates), dates,
+                                            mean.tolist(), low.tolist(), high.tolist())]
+
+
+def clear(prefix=DEFAULT_PREFIX):
+    """Remove everything an earlier run with this prefix wrote. Returns documents deleted."""
+    pattern = {"$regex": f"^{prefix}-"}
+    deleted = 0
+    for collection, key in list(field_deletion.STEPS.values()) + [
+        ("fields", "id"), ("material_transactions", "fieldId"), ("materials", "id"),
+        (stock.LEDGER_COLLECTION, "materialId"), (stock.SNAPSHOTS_COLLECTION, "materialId"),
+        (temperature.RECORDS_COLLECTION, "fieldId"), (temperature.BUCKETS_COLLECTION, "fieldId"),
+        (temperature.ROLLUPS_COLLECTION, "fieldId"),
+    ]:
+        if collection:
+            deleted += get_collection(collection).delete_many({key: pattern}).deleted_count
+    tiles.invalidate()
+    return deleted
+
+
+def generate(n_fields, seed=0, seasons=2, end=None, prefix=DEFAULT_PREFIX, batch_size=5000, progress=None):
+    """Write a synthetic farm. Returns {"counts": {collection: documents}, "ids": {...}}.
+
+    `ids` holds one of each kind of record (field, material, activity, water record, ...),
+    as used to address routes in benchmarks and load tests. `progress(done, total)` is
+    called after every batch of fields.
+    """
+    end = end or datetime.utcnow().date()
+    start = end - timedelta(days=seasons * SEASON_DAYS)
+    days = (end - start).days + 1
+    regional, doy = _weather(seed, start, days)
+    dates = [(start + timedelta(days=d)).isoformat() for d in range(days)]
+    season_list = _seasons(start, end)
+    writer = _Writer(batch_size)
+
+    materials = [{
+        "id": material_id(prefix, key), "name": name, "category": category, "unit": unit,
+        "stock_quantity": OPENING_STOCK, "currentStock": OPENING_STOCK, "price_per_unit": price,
+        "created_at": f"{start.isoformat()}T00:00:00Z",
+    } for key, (name, category, unit, price) in MATERIALS.items()]
+    get_collection("materials").insert_many(materials, ordered=False)
+    stock.apply_opening_entries([(m["id"], OPENING_STOCK) for m in materials])
+    writer._count("materials", len(materials))
+
+    chunk = max(1, min(500, batch_size))
+    for first in range(0, n_fields, chunk):
+        indexes = range(first, min(n_fields, first + chunk))
+        rngs = {i: random.Random(f"{seed}:{i}") for i in indexes}
+        outlines = {i: outline(i, n_fields, rngs[i]) for i in indexes}
+        metrics = field_metrics.measure_many([outlines[i] for i in indexes])
+        for i, measured in zip(indexes, metrics):
+            rng, coordinates = rngs[i], outlines[i]
+            fid = field_id(prefix, i)
+            status = STATUS_CYCLE[i % len(STATUS_CYCLE)]
+            place = rng.choice(PLACES)
+            stamp = f"{start.isoformat()}T09:00:00Z"
+            doc = {
+                "id": fid, "name": f"{place} Block {i + 1}", "coordinates": coordinates,
+                "status": status, "notUsableReason": rng.choice(NOT_USABLE_REASONS) if status == "not_usable" else None,
+                "address": f"Near {place}", "locationName": "Lahore, Punjab",
+                "createdAt": stamp, "updatedAt": stamp, "overlapsWith": [],
+                **measured, **lod.lod_fields(coordinates), **geometry.geometry_fields(coordinates),
+            }
+            writer.add("fields", doc)
+
+            f = _Field(writer, fid, measured["area"], rng, legacy=i % LEGACY_EVERY == LEGACY_EVERY - 1)
+            if status == "cultivated":
+                for crops, sow, harvest in season_list:
+                    jitter = timedelta(days=rng.randint(0, 20))
+                    _season(f, prefix, rng.choice(crops), sow + jitter, harvest + jitter, start, end)
+            elif status == "thaka":
+                _lease(f, start, end)
+            elif status in ("available", "uncultivated"):
+                for d in range(0, days, 60):
+                    if rng.random() < 0.5:
+                        f.register(start + timedelta(days=d + rng.randint(0, 30)), "weeding",
+                                   labor_cost=int(round(500 * f.acres, -2)), notes="Weed clearing")
+            if status != "not_usable":
+                docs = _readings(fid, i, seed, dates, regional, doy)
+                writer.add_readings(docs, docs[-max(temperature.WINDOWS):])
+        if progress:
+            progress(indexes[-1] + 1, n_fields)
+    writer.flush()
+    tiles.invalidate()
+    logger.info("Synthetic farm %s: %d fields, %d documents", prefix, n_fields, sum(writer.counts.values()))
+    return {"counts": writer.counts, "ids": sample_ids(prefix)}
+
+
+def sample_ids(prefix=DEFAULT_PREFIX):
+    """One record id of each kind from a generated farm, for addressing routes."""
+    def first(collection, query, key="id"):
+        doc = get_collection(collection).find_one({**query, key: {"$regex": f"^{prefix}-"}}, {"_id": 0, key: 1},
+                                                  sort=[(key, 1)])
+        return doc[key] if doc else None
+
+    field = first("water_records", {}, "fieldId") or first("fields", {})
+    return {
+        "field": field,
+        "material": material_id(prefix, "urea"),
+        "activity": first("activities", {"activity_type": "fertilizer_application"}),
+        "thaka": first("thaka_records", {}),
+        "water": first("water_records", {"fieldId": field}),
+        "transaction": first("material_transactions", {}),
+        "daily": first("daily_register", {}),
+    }
@@ -0,0 +1,401 @@
+"""Temperature reading storage and read adapter.
+
+Two layouts are supported, selected by settings.TEMPERATURE_STORAGE:
+
+- "documents" (default): one document per reading in `temperature_records`, unique on
+  (fieldId, date); `python manage.py dedupe_temperature_records` cleans up older data.
+  Buckets hold at most one reading per date too; writes go through upsert_readings.
+- "buckets": one document per field per month in `temperature_buckets`, holding that
+  month's readings in an array. Far fewer documents and index entries, and a "last N
+  readings" lookup touches one or two buckets per field.
+
+Views never query either collection directly; they go through the functions below.
+Existing data is moved with `python manage.py migrate_temperature_buckets`.
+
+Every write also updates the field's document in `temperature_rollups`, so readers get the
+7/14/30-day mean, min, max and reading count from one small document instead of scanning
+readings. Windows end at the field's latest reading date (`lastDate`):
+
+    {fieldId, lastDate, last7d: {count, mean, min, max}, last14d: {...}, last30d: {...}}
+
+The document keeps day bins (sum, count, min, max) for the last 30 days and is updated with
+a single pipeline update per field. min/max use a reading's minTempC/maxTempC when present.
+`python manage.py rebuild_temperature_rollups` recomputes them from the readings.
+"""
+import hashlib
+import uuid
+from datetime import date as date_cls, datetime
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from django.conf import settings
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from .db import get_async_collection, get_collection
+
+RECORDS_COLLECTION = "temperature_records"
+BUCKETS_COLLECTION = "temperature_buckets"
+ROLLUPS_COLLECTION = "temperature_rollups"
+
+WINDOWS = (7, 14, 30)
+ROLLUP_PROJECTION = {"_id": 0, "days": 0, "lastDay": 0}
+DUPLICATE_KEY = 11000
+
+# Reading keys; optional ones are omitted inside buckets when empty and restored as None on read.
+READING_KEYS = ("id", "date", "temperatureC", "minTempC", "maxTempC", "notes")
+OPTIONAL_KEYS = ("minTempC", "maxTempC", "notes")
+
+
+def use_buckets():
+    return getattr(settings, "TEMPERATURE_STORAGE", "documents") == "buckets"
+
+
+def month_of(date):
+    return (date or "")[:7] or "unknown"
+
+
+def _compact(doc):
+    """Reading as stored inside a bucket (no fieldId, no empty optional keys)."""
+    return {k: doc.get(k) for k in READING_KEYS if k not in OPTIONAL_KEYS or doc.get(k) is not None}
+
+
+def _expand(field_id, reading):
+    """Bucket reading back to the public temperature record shape."""
+    out = {"id": reading.get("id"), "fieldId": field_id, "date": reading.get("date", ""),
+           "temperatureC": reading.get("temperatureC", 0)}
+    for k in OPTIONAL_KEYS:
+        out[k] = reading.get(k)
+    return out
+
+
+def _flatten(buckets):
+    rows = []
+    for b in buckets:
+        rows.extend(_expand(b.get("fieldId"), r) for r in b.get("readings", []))
+    return rows
+
+
+def merge_into_buckets(docs, key="id", session=None):
+    """Upsert readings into their (fieldId, month) buckets, replacing any reading with the same `key`.
+
+    One pipeline update per bucket, so re-running with the same readings is a no-op.
+    Returns the number of bucket writes issued.
+    """
+    grouped = {}
+    for doc in docs:
+        grouped.setdefault((doc.get("fieldId", ""), month_of(doc.get("date"))), {})[doc.get(key)] = _compact(doc)
+    ops = []
+    for (field_id, month), by_key in grouped.items():
+        readings = list(by_key.values())
+        keys = list(by_key.keys())
+        ops.append(UpdateOne(
+            {"fieldId": field_id, "month": month},
+            [
+                {"$set": {"readings": {"$concatArrays": [
+                    {"$filter": {
+                        "input": {"$ifNull": ["$readings", []]},
+                        "cond": {"$not": [{"$in": [f"$$this.{key}", {"$literal": keys}]}]},
+                    }},
+                    {"$literal": readings},
+                ]}}},
+                {"$set": {
+                    "count": {"$size": "$readings"},
+                    "firstDate": {"$min": "$readings.date"},
+                    "lastDate": {"$max": "$readings.date"},
+                }},
+            ],
+            upsert=True,
+        ))
+    if ops:
+        get_collection(BUCKETS_COLLECTION).bulk_write(ops, ordered=False, session=session)
+    return len(ops)
+
+
+def _day_number(date):
+    try:
+        return date_cls.fromisoformat((date or "")[:10]).toordinal()
+    except ValueError:
+        return None
+
+
+def _day_bins(docs):
+    """{fieldId: {day number: bin}} for readings with a valid date."""
+    out = {}
+    for doc in docs:
+        day = _day_number(doc.get("date"))
+        temp = doc.get("temperatureC")
+        if day is None or not isinstance(temp, (int, float)) or isinstance(temp, bool):
+            continue
+        low = doc.get("minTempC") if doc.get("minTempC") is not None else temp
+        high = doc.get("maxTempC") if doc.get("maxTempC") is not None else temp
+        bins = out.setdefault(doc.get("fieldId", ""), {})
+        b = bins.get(day)
+        if b is None:
+            bins[day] = {"day": day, "date": doc["date"][:10], "sum": temp, "count": 1, "min": low, "max": high}
+        else:
+            b.update(sum=b["sum"] + temp, count=b["count"] + 1, min=min(b["min"], low), max=max(b["max"], high))
+    return out
+
+
+def _window(days):
+    """Expression: {count, mean, min, max} over the day bins at most `days` old (relative to lastDay)."""
+    recent = {"$filter": {"input": "$days", "cond": {"$gt": ["$$this.day", {"$subtract": ["$lastDay", days]}]}}}
+    return {"$let": {"vars": {"d": recent}, "in": {
+        "count": {"$sum": "$$d.count"},
+        "mean": {"$cond": [
+            {"$gt": [{"$sum": "$$d.count"}, 0]},
+            {"$round": [{"$divide": [{"$sum": "$$d.sum"}, {"$sum": "$$d.count"}]}, 2]},
+            None,
+        ]},
+        "min": {"$min": "$$d.min"},
+        "max": {"$max": "$$d.max"},
+    }}}
+
+
+def update_rollups(docs, replace=False, session=None):
+    """Fold readings into their fields' rollup documents, one pipeline update per field.
+
+    With replace=True a day's bins are replaced by these readings (idempotent upserts keyed on
+    date); otherwise the new bins are appended next to any existing ones for the same day
+    (single inserts). Windows aggregate over every bin, so either way they stay exact.
+    """
+    return write_rollup_bins(_day_bins(docs), replace, session)
+
+
+def write_rollup_bins(bins_by_field, replace=False, session=None, reset=False):
+    """Apply {fieldId: {day number: bin}} to the rollup documents. Returns the number of writes.
+
+    reset=True discards the documents' existing bins first (used by the rebuild command).
+    """
+    ops = []
+    for field_id, bins in bins_by_field.items():
+        new = list(bins.values())
+        if reset:
+            kept = []
+        elif replace:
+            kept = {"$filter": {
+                "input": {"$ifNull": ["$days", []]},
+                "cond": {"$not": [{"$in": ["$$this.day", {"$literal": [b["day"] for b in new]}]}]},
+            }}
+        else:
+            kept = {"$ifNull": ["$days", []]}
+        ops.append(UpdateOne(
+            {"fieldId": field_id},
+            [
+                {"$set": {"days": {"$concatArrays": [kept, {"$literal": new}]}}},
+                {"$set": {"lastDay": {"$max": "$days.day"}, "lastDate": {"$max": "$days.date"}}},
+                {"$set": {"days": {"$filter": {
+                    "input": "$days", "cond": {"$gt": ["$$this.day", {"$subtract": ["$lastDay", max(WINDOWS)]}]},
+                }}}},
+                {"$set": {f"last{w}d": _window(w) for w in WINDOWS}},
+            ],
+            upsert=True,
+        ))
+    if ops:
+        get_collection(ROLLUPS_COLLECTION).bulk_write(ops, ordered=False, session=session)
+    return len(ops)
+
+
+def rollup_for(field_id):
+    """The field's rolling aggregates, or None if it has no dated readings."""
+    if not field_id:
+        return None
+    return get_collection(ROLLUPS_COLLECTION).find_one({"fieldId": field_id}, ROLLUP_PROJECTION)
+
+
+def rollups_for(field_ids=None):
+    """{fieldId: rolling aggregates} for the given fields (all fields when None), in one query."""
+    query = {} if field_ids is None else {"fieldId": {"$in": list(field_ids)}}
+    return {doc["fieldId"]: doc for doc in get_collection(ROLLUPS_COLLECTION).find(query, ROLLUP_PROJECTION)}
+
+
+async def arollup_for(field_id):
+    """rollup_for on the async driver."""
+    if not field_id:
+        return None
+    return await (await get_async_collection(ROLLUPS_COLLECTION)).find_one({"fieldId": field_id}, ROLLUP_PROJECTION)
+
+
+async def arollups_for(field_ids=None):
+    """rollups_for on the async driver."""
+    query = {} if field_ids is None else {"fieldId": {"$in": list(field_ids)}}
+    docs = await (await get_async_collection(ROLLUPS_COLLECTION)).find(query, ROLLUP_PROJECTION).to_list()
+    return {doc["fieldId"]: doc for doc in docs}
+
+
+def window_mean(rollup, days):
+    """Mean temperature over the rollup's `days`-day window, or None."""
+    return ((rollup or {}).get(f"last{days}d") or {}).get("mean")
+
+
+def daily_bins(field_ids=None):
+    """Yield (fieldId, bin) per field and day straight from the readings, grouped in the database."""
+    match = {} if field_ids is None else {"fieldId": {"$in": list(field_ids)}}
+    if use_buckets():
+        pipeline = [{"$match": match}, {"$unwind": "$readings"},
+                    {"$replaceWith": {"$mergeObjects": ["$readings", {"fieldId": "$fieldId"}]}}]
+        col = get_collection(BUCKETS_COLLECTION)
+    else:
+        pipeline = [{"$match": match}]
+        col = get_collection(RECORDS_COLLECTION)
+    pipeline.append({"$group": {
+        "_id": {"fieldId": "$fieldId", "date": {"$substrCP": ["$date", 0, 10]}},
+        "sum": {"$sum": "$temperatureC"},
+        "count": {"$sum": 1},
+        "min": {"$min": {"$ifNull": ["$minTempC", "$temperatureC"]}},
+        "max": {"$max": {"$ifNull": ["$maxTempC", "$temperatureC"]}},
+    }})
+    pipeline.append({"$sort": {"_id.fieldId": 1}})
+    for row in col.aggregate(pipeline, allowDiskUse=True):
+        day = _day_number(row["_id"]["date"])
+        if day is not None:
+            yield row["_id"]["fieldId"], {"day": day, "date": row["_id"]["date"],
+                                          **{k: row[k] for k in ("sum", "count", "min", "max")}}
+
+
+def list_readings(field_id=None):
+    """All readings (optionally for one field) in the public record shape."""
+    query = {"fieldId": field_id} if field_id else {}
+    if use_buckets():
+        return _flatten(get_collection(BUCKETS_COLLECTION).find(query, {"_id": 0}))
+    return list(get_collection(RECORDS_COLLECTION).find(query, {"_id": 0}))
+
+
+async def alist_readings(field_id=None):
+    """list_readings on the async driver."""
+    query = {"fieldId": field_id} if field_id else {}
+    if use_buckets():
+        return _flatten(await (await get_async_collection(BUCKETS_COLLECTION)).find(query, {"_id": 0}).to_list())
+    return await (await get_async_collection(RECORDS_COLLECTION)).find(query, {"_id": 0}).to_list()
+
+
+def iter_export(after=None, batch_size=1000):
+    """Yield (cursor, reading) for every reading in a stable order, resuming after `after`.
+
+    Cursors are "<_id>" for documents and "<bucket _id>:<index>" for buckets; both are opaque
+    to callers. Raises ValueError for a malformed cursor.
+    """
+    oid_part, _, index_part = (after or "").partition(":")
+    try:
+        start = ObjectId(oid_part) if oid_part else None
+        skip = int(index_part) + 1 if index_part else 0
+    except (InvalidId, ValueError):
+        raise ValueError("invalid export cursor")
+    if use_buckets():
+        query = {"_id": {"$gte": start}} if start else {}
+        cursor = get_collection(BUCKETS_COLLECTION).find(query).sort("_id", 1).batch_size(max(1, batch_size // 30))
+        for bucket in cursor:
+            readings = bucket.get("readings", [])
+            first = skip if bucket["_id"] == start else 0
+            for i in range(first, len(readings)):
+                yield f"{bucket['_id']}:{i}", _expand(bucket.get("fieldId"), readings[i])
+        return
+    query = {"_id": {"$gt": start}} if start else {}
+    for doc in get_collection(RECORDS_COLLECTION).find(query).sort("_id", 1).batch_size(batch_size):
+        yield str(doc.pop("_id")), doc
+
+
+def delete_for_field(field_id):
+    """Delete a field's readings and rollup; returns the number of reading documents removed."""
+    name = BUCKETS_COLLECTION if use_buckets() else RECORDS_COLLECTION
+    deleted = get_collection(name).delete_many({"fieldId": field_id}).deleted_count
+    get_collection(ROLLUPS_COLLECTION).delete_many({"fieldId": field_id})
+    return deleted
+
+
+def reading_id(field_id, date):
+    """Stable id for a (field, date) reading so retried bulk imports never mint new ids."""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"temperature:{field_id}:{date}"))
+
+
+def reading_ids(field_id, dates):
+    """reading_id for many dates of one field (the uuid5 hashing, with the shared prefix hashed once)."""
+    prefix = hashlib.sha1(uuid.NAMESPACE_URL.bytes + f"temperature:{field_id}:".encode())
+    out = []
+    for date in dates:
+        h = prefix.copy()
+        h.update(date.encode())
+        b = bytearray(h.digest()[:16])
+        b[6] = (b[6] & 0x0F) | 0x50
+        b[8] = (b[8] & 0x3F) | 0x80
+        x = b.hex()
+        out.append(f"{x[:8]}-{x[8:12]}-{x[12:16]}-{x[16:20]}-{x[20:]}")
+    return out
+
+
+def _num_or_none(value, name):
+    if value is None or value == "":
+        return None
+    if isinstance(value, bool):
+        raise ValueError(f"{name} must be a number")
+    try:
+        f = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a number")
+    return int(f) if f == int(f) else f
+
+
+def validate_reading(row):
+    """Normalize one incoming reading; raises ValueError with a readable message."""
+    if not isinstance(row, dict):
+        raise ValueError("row must be an object")
+    field_id = str(row.get("fieldId") or "").strip()
+    if not field_id:
+        raise ValueError("fieldId is required")
+    date = str(row.get("date") or "").strip()[:10]
+    try:
+        datetime.strptime(date, "%Y-%m-%d")
+    except ValueError:
+        raise ValueError("date must be YYYY-MM-DD")
+    temp = _num_or_none(row.get("temperatureC"), "temperatureC")
+    if temp is None:
+        raise ValueError("temperatureC is required")
+    notes = row.get("notes")
+    return {
+        "id": row.get("id") or reading_id(field_id, date),
+        "fieldId": field_id,
+        "date": date,
+        "temperatureC": temp,
+        "minTempC": _num_or_none(row.get("minTempC"), "minTempC"),
+        "maxTempC": _num_or_none(row.get("maxTempC"), "maxTempC"),
+        "notes": str(notes) if notes is not None else None,
+    }
+
+
+def upsert_readings(rows):
+    """Idempotently write readings keyed on (fieldId, date); last row wins per key.
+
+    Both layouts keep one reading per field and date: a new one replaces the stored reading,
+    id included. Returns {'written', 'inserted', 'updated'} (the split is unknown for
+    buckets: None).
+    """
+    by_key = {}
+    for row in rows:
+        by_key[(row["fieldId"], row["date"])] = row
+    docs = list(by_key.values())
+    if not docs:
+        return {"written": 0, "inserted": 0, "updated": 0}
+    if use_buckets():
+        merge_into_buckets(docs, key="date")
+        update_rollups(docs, replace=True)
+        return {"written": len(docs), "inserted": None, "updated": None}
+    ops = [
+        UpdateOne(
+            {"fieldId": d["fieldId"], "date": d["date"]},
+            {"$set": d},
+            upsert=True,
+        )
+        for d in docs
+    ]
+    try:
+        result = get_collection(RECORDS_COLLECTION).bulk_write(ops, ordered=False).bulk_api_result
+    except BulkWriteError as e:
+        # A concurrent upsert inserted the same (fieldId, date) first; its reading stands
+        result = e.details
+        if result["writeConcernErrors"] or any(err["code"] != DUPLICATE_KEY for err in result["writeErrors"]):
+            raise
+        lost = {err["index"] for err in result["writeErrors"]}
+        docs = [d for n, d in enumerate(docs) if n not in lost]
+    update_rollups(docs, replace=True)
+    return {"written": len(docs), "inserted": result["nUpserted"], "updated": result["nMatched"]}
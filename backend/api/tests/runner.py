@@ -0,0 +1,36 @@
+"""Test runner that gives MongoTestCase suites a server instead of letting them skip quietly.
+
+With MONGO_TEST_URI set, tests use that server. Otherwise, if mongod is on PATH, a temporary
+one is started for the run. Failing both, a notice on stderr says the Mongo-backed suites
+(query budgets, concurrency, benchmark, ...) are being skipped and why.
+"""
+import os
+import sys
+from contextlib import ExitStack
+from unittest import mock
+
+from django.test.runner import DiscoverRunner
+
+from api.benchmarking import temporary_mongod
+
+SKIP_NOTICE = (
+    "MONGO_TEST_URI is not set and mongod could not be started ({reason}): "
+    "Mongo-backed test classes will be SKIPPED. Set MONGO_TEST_URI=mongodb://... "
+    "or put mongod on PATH to run them.\n"
+)
+
+
+class MongoTestRunner(DiscoverRunner):
+    def run_tests(self, test_labels, **kwargs):
+        with ExitStack() as stack:
+            if not os.environ.get("MONGO_TEST_URI", "").strip():
+                try:
+                    uri = stack.enter_context(temporary_mongod())
+                except RuntimeError as exc:
+                    sys.stderr.write(SKIP_NOTICE.format(reason=exc))
+                else:
+                    stack.enter_context(mock.patch.dict(os.environ, {"MONGO_TEST_URI": uri}))
+                    if self.verbosity:
+                        sys.stderr.write(f"Mongo-backed tests use a temporary mongod at {uri}\n")
+            return super().run_tests(test_labels, **kwargs)
+
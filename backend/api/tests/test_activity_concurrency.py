@@ -0,0 +1,65 @@
+"""Material stock must stay exact when many activity writes race each other."""
+from concurrent.futures import ThreadPoolExecutor
+
+from api import db as api_db, stock
+from api.services import ActivityService
+from api.tests.utils import MongoTestCase
+
+WRITERS = 50
+START_STOCK = 1000
+
+
+class ActivityConcurrencyTests(MongoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.clear_data()
+        api_db.get_collection("materials").insert_one(
+            {"id": "urea", "name": "Urea", "stock_quantity": START_STOCK, "price_per_unit": 10}
+        )
+
+    def _stock(self):
+        return api_db.get_collection("materials").find_one({"id": "urea"})["stock_quantity"]
+
+    def _parallel(self, fn, args):
+        with ThreadPoolExecutor(max_workers=WRITERS) as pool:
+            return list(pool.map(fn, args))
+
+    def _create(self, i):
+        return ActivityService.create_activity({
+            "id": f"act_{i}", "activity_type": "fertilizer_application", "field_id": "f1",
+            "material_id": "urea", "quantity_used": 2,
+        })
+
+    def test_parallel_creates_updates_and_deletes_keep_stock_exact(self):
+        docs = self._parallel(self._create, range(WRITERS))
+        self.assertEqual(self._stock(), START_STOCK - 2 * WRITERS)
+        self.assertTrue(all(d["cost"] == 20 for d in docs))
+
+        self._parallel(lambda i: ActivityService.update_activity(f"act_{i}", {"quantity_used": 3}), range(WRITERS))
+        self.assertEqual(self._stock(), START_STOCK - 3 * WRITERS)
+
+        self._parallel(lambda i: ActivityService.delete_activity(f"act_{i}"), range(WRITERS))
+        self.assertEqual(self._stock(), START_STOCK)
+
+    def test_racing_updates_of_one_activity_keep_stock_exact(self):
+        if not api_db.supports_transactions():
+            self.skipTest("needs a replica set: racing read-modify-write of one activity requires transactions")
+        self._create(0)
+        self._parallel(lambda q: ActivityService.update_activity("act_0", {"quantity_used": q}), range(1, WRITERS + 1))
+        final_qty = api_db.get_collection("activities").find_one({"id": "act_0"})["quantity_used"]
+        self.assertEqual(self._stock(), START_STOCK - final_qty)
+
+    def test_racing_deletes_revert_stock_once(self):
+        self._create(0)
+        results = self._parallel(lambda _: ActivityService.delete_activity("act_0"), range(WRITERS))
+        self.assertEqual(results.count(True), 1)
+        self.assertEqual(self._stock(), START_STOCK)
+
+    def test_import_skips_stock_of_unknown_materials(self):
+        rows = [(n, {"activity_type": "material_purchase", "material_id": mat, "quantity_used": 5, "date": "2024-06-01"}, None)
+                for n, mat in enumerate(("urea", "ghost", "urea"), start=1)]
+        report = ActivityService.bulk_import(rows)
+        self.assertEqual((report["inserted"], report["materialsUpdated"]), (3, 1))
+        self.assertEqual(self._stock(), START_STOCK + 10)
+        ledger = api_db.get_collection(stock.LEDGER_COLLECTION)
+        self.assertEqual(sorted(ledger.distinct("materialId")), ["urea"])
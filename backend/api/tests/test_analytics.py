@@ -0,0 +1,66 @@
+"""Daily analytics snapshots are served as stored and recomputed only for changed fields."""
+import json
+from datetime import datetime
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+
+from api import analytics
+from api.tests.utils import MongoTestCase, command_counter, seed_farm
+
+AI_REPLY = json.dumps({"analysis": "Water the northern fields first.", "notes": [f"note {i}" for i in range(10)]})
+
+
+@mock.patch("api.llm.chat", return_value=(AI_REPLY, "stub", None))
+class AnalyticsSnapshotTests(MongoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.clear_data()
+        self.ids = seed_farm(4)
+        self.field = self.ids["field"]
+
+    def _get(self, path):
+        with command_counter.capture() as commands:
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return response.json(), list(commands)
+
+    def test_precomputed_snapshot_is_served_without_recomputing(self, ai_chat):
+        call_command("precompute_analytics", stdout=StringIO())
+        ai_chat.reset_mock()
+        for path in ("/api/water/analysis", "/api/field-recommendations", "/api/ai/recommendations"):
+            with self.subTest(path=path):
+                _, commands = self._get(path)
+                self.assertEqual(commands, [("find", "fields"), ("find", analytics.COLLECTION)])
+        data, _ = self._get("/api/water/analysis")
+        self.assertEqual(data["analysis"], "Water the northern fields first.")
+        self.assertEqual(data["perField"][0]["aiNote"], "note 0")
+        ai_chat.assert_not_called()
+
+    def test_only_changed_field_is_recomputed(self, ai_chat):
+        before, _ = self._get("/api/field-recommendations")
+        self.assertIn((self.field, "activity"), {(r["fieldId"], r["reason"]) for r in before})
+
+        today = datetime.utcnow().strftime("%Y-%m-%d")
+        self.client.post("/api/daily-register", data=json.dumps({"fieldId": self.field, "date": today, "activity": "weeding"}),
+                         content_type="application/json")
+        with mock.patch.object(analytics, "COMPUTE", {**analytics.COMPUTE}) as compute:
+            compute["field_recommendations"] = mock.Mock(wraps=analytics.field_recommendations)
+            after, _ = self._get("/api/field-recommendations")
+        recomputed = compute["field_recommendations"].call_args.args[0]
+        self.assertEqual([f["id"] for f in recomputed], [self.field])
+        self.assertNotIn((self.field, "activity"), {(r["fieldId"], r["reason"]) for r in after})
+        self.assertEqual([r for r in after if r["fieldId"] != self.field], [r for r in before if r["fieldId"] != self.field])
+
+    def test_changed_field_gets_a_new_summary(self, ai_chat):
+        self._get("/api/water/analysis")
+        data, commands = self._get("/api/water/analysis")
+        self.assertEqual(commands, [("find", "fields"), ("find", analytics.COLLECTION)])
+        self.client.post("/api/water", data=json.dumps({"fieldId": self.field, "date": "2024-06-01", "durationMinutes": 40}),
+                         content_type="application/json")
+        ai_chat.return_value = (AI_REPLY.replace("northern", "southern"), "stub", None)
+        data, _ = self._get("/api/water/analysis")
+        self.assertEqual(data["analysis"], "Water the southern fields first.")
+        self.assertEqual(data["perField"][0]["aiNote"], "note 0")
+        self.assertEqual(ai_chat.call_count, 2)
@@ -0,0 +1,108 @@
+"""ASGI mode: async views answer exactly like the sync ones; middleware and LLM client work async."""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+
+from api import async_views, llm, metrics, views
+from api.middleware import auth_required_middleware
+from api.tests.utils import MongoTestCase, seed_farm
+
+AI_REPLY = (json.dumps({"analysis": "Water the northern fields first.", "notes": ["note 0"], "summary": "Fine."}), "stub", None)
+
+
+class _StubRouter(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    models = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        type(self).models.append(body["model"])
+        status, data = (503, {}) if len(self.models) == 1 else (200, {"choices": [{"message": {"content": " Hello. "}}]})
+        raw = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def log_message(self, *args):
+        pass
+
+
+class AsyncPlumbingTests(SimpleTestCase):
+    def test_llm_call_falls_back_to_next_model(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _StubRouter)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        _StubRouter.models = []
+        with mock.patch.object(llm, "HF_CHAT_URL", f"http://127.0.0.1:{server.server_port}/v1/chat"), \
+                mock.patch.object(llm, "hf_config", return_value=("t0k", ["first", "second"])):
+            text, model, error = async_to_sync(llm.achat)("system", "user")
+        self.assertEqual((text, model, error), ("Hello.", "second", None))
+        self.assertEqual(_StubRouter.models, ["first", "second"])
+
+    def test_async_middleware_chain(self):
+        async def view(request):
+            return HttpResponse("ok")
+
+        handler = metrics.metrics_middleware(auth_required_middleware(view))
+        factory = RequestFactory()
+        with mock.patch.object(metrics, "record") as record:
+            denied = async_to_sync(handler)(factory.get("/api/dashboard"))
+            public = async_to_sync(handler)(factory.get("/api/water/analysis"))
+        self.assertEqual((denied.status_code, public.status_code), (401, 200))
+        self.assertEqual([c.args[2] for c in record.call_args_list], [401, 200])
+
+
+@mock.patch("api.llm.achat", new_callable=mock.AsyncMock, return_value=AI_REPLY)
+@mock.patch("api.llm.chat", return_value=AI_REPLY)
+class AsyncViewParityTests(MongoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.clear_data()
+        self.ids = seed_farm(4)
+        self.factory = RequestFactory()
+
+    def _both(self, name, method, path, body=None):
+        def request():
+            if method == "GET":
+                req = self.factory.get(path)
+            else:
+                req = self.factory.post(path, data=json.dumps(body or {}), content_type="application/json")
+            req.auth_user = "admin@example.com"
+            return req
+
+        sync = getattr(views, name)(request())
+        views.prediction_cache.clear()
+        async_ = async_to_sync(getattr(async_views, name))(request())
+        views.prediction_cache.clear()
+        self.assertEqual(async_.status_code, sync.status_code)
+        return json.loads(sync.content), json.loads(async_.content)
+
+    def test_responses_match_sync_views(self, call_ai_chat, acall_ai_chat):
+        cases = [
+            ("dashboard", "GET", "/api/dashboard", None),
+            ("water_analysis", "GET", "/api/water/analysis", None),
+            ("ai_chat", "POST", "/api/ai/chat", {"message": "Which field needs water?"}),
+            ("predict", "POST", "/api/predict", {"type": "crop_health", "fieldId": self.ids["field"], "includeAiSummary": True}),
+            ("predict", "POST", "/api/predict", {"type": "yield_prediction", "fieldId": self.ids["field"]}),
+        ]
+        for name, method, path, body in cases:
+            with self.subTest(name=name, body=body):
+                sync, async_ = self._both(name, method, path, body)
+                self.assertEqual(async_, sync)
+
+    def test_insights_match_sync_view(self, call_ai_chat, acall_ai_chat):
+        with mock.patch.object(llm, "hf_config", return_value=("t0k", ["m"])):
+            sync, async_ = self._both("ai_insights", "POST", "/api/ai/insights")
+        for payload in (sync, async_):
+            for rec in payload["recommendations"]:
+                rec.pop("id"), rec.pop("createdAt")
+        self.assertEqual(async_, sync)
+        self.assertEqual(acall_ai_chat.await_args.kwargs, {"temperature": 0.3})
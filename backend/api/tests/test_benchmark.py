@@ -0,0 +1,29 @@
+"""The benchmark command runs against a throwaway database and reports every selected route."""
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+
+from api import db as api_db
+from api.tests.utils import MongoTestCase
+
+
+class BenchmarkCommandTests(MongoTestCase):
+    def test_report_covers_routes_and_leaves_no_database(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench.json")
+            call_command("benchmark", mongo_uri=os.environ["MONGO_TEST_URI"], fields="3", repeat=2,
+                         route=["water", "predict"], output=path, stderr=StringIO())
+            with open(path, encoding="utf-8") as fh:
+                report = json.load(fh)
+        routes = report["sizes"]["3"]["routes"]
+        self.assertEqual(routes["GET water/analysis"]["calls"], 2)
+        self.assertEqual(routes["DELETE water/<str:pk>"]["calls"], 1)
+        self.assertIn("POST predict", routes)
+        for entry in routes.values():
+            self.assertLess(entry["status"], 500)
+            self.assertGreater(entry["queries"], 0)
+            self.assertIn("peakKb", entry)
+        self.assertNotIn(f"slm_bench_{os.getpid()}", api_db.get_db().client.list_database_names())
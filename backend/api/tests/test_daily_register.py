@@ -0,0 +1,37 @@
+"""Register entries written before registerId links are undone by content, one transaction per line."""
+from io import StringIO
+
+from django.core.management import call_command
+
+from api import db as api_db
+from api.tests.utils import MongoTestCase
+
+
+class LegacyRegisterTests(MongoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.clear_data()
+        api_db.get_collection("materials").insert_one({"id": "urea", "name": "Urea", "stock_quantity": 100})
+        # Two identical lines, quantities as the client sent them; three unlinked transactions
+        api_db.get_collection("daily_register").insert_one({
+            "id": "reg1", "date": "2024-06-01", "fieldId": "f1", "activity": "fertilizer",
+            "materialsUsed": [{"materialId": "urea", "quantity": "2"}, {"materialId": "urea", "quantity": "2.0"}],
+        })
+        api_db.get_collection("material_transactions").insert_many([
+            {"id": f"tx{n}", "materialId": "urea", "type": "out", "quantity": 2, "date": "2024-06-01",
+             "fieldId": "f1", "notes": "Daily register: fertilizer"}
+            for n in range(3)
+        ])
+
+    def _transactions(self):
+        return sorted(t["id"] for t in api_db.get_collection("material_transactions").find({}, {"id": 1}))
+
+    def test_delete_removes_one_transaction_per_line(self):
+        self.assertEqual(self.client.delete("/api/daily-register/reg1").status_code, 204)
+        self.assertEqual(self._transactions(), ["tx2"])
+        self.assertEqual(api_db.get_collection("materials").find_one({"id": "urea"})["stock_quantity"], 104)
+
+    def test_backfill_links_one_transaction_per_line(self):
+        call_command("backfill_register_links", stdout=StringIO())
+        linked = api_db.get_collection("material_transactions").find({"registerId": "reg1"}, {"id": 1})
+        self.assertEqual(sorted(t["id"] for t in linked), ["tx0", "tx1"])
@@ -0,0 +1,68 @@
+"""Deleting a field hides it at once and clears its records in a background job."""
+from unittest import mock
+
+from api import db as api_db, field_deletion
+from api.tests.utils import MongoTestCase, seed_farm
+
+
+class FieldDeletionTests(MongoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.clear_data()
+        self.ids = seed_farm(3)
+        self.field = self.ids["field"]
+
+    def _remaining(self):
+        db = api_db.get_db()
+        counts = {name: db[col].count_documents({key: self.field}) for name, (col, key) in field_deletion.STEPS.items() if col}
+        counts["temperature"] = db["temperature_records"].count_documents({"fieldId": self.field})
+        counts["fields"] = db["fields"].count_documents({"id": self.field})
+        return counts
+
+    def test_delete_hides_field_then_cascades(self):
+        activities = api_db.get_collection("activities")
+        others = activities.count_documents({"field_id": {"$ne": self.field}})
+        res = self.client.delete(f"/api/fields/{self.field}")
+        self.assertEqual(res.status_code, 202)
+        self.assertEqual(self.client.get(f"/api/fields/{self.field}").status_code, 404)
+        self.assertNotIn(self.field, [f["id"] for f in self.client.get("/api/fields").json()])
+
+        field_deletion.wait()
+        job = self.client.get(f"/api/fields/{self.field}/deletion").json()
+        self.assertEqual(job["status"], "done")
+        self.assertEqual(set(job["steps"]), set(field_deletion.STEPS))
+        self.assertGreater(job["steps"]["activities"]["deleted"], 0)
+        self.assertTrue(all(v == 0 for v in self._remaining().values()))
+        # other fields are untouched
+        self.assertEqual(activities.count_documents({}), others)
+
+    def test_retry_resumes_failed_job(self):
+        with mock.patch("api.temperature.delete_for_field", side_effect=RuntimeError("boom")):
+            self.client.delete(f"/api/fields/{self.field}")
+            field_deletion.wait()
+        job = field_deletion.get_job(self.field)
+        self.assertEqual(job["status"], "failed")
+        self.assertEqual(job["steps"]["temperature"]["status"], "pending")
+        self.assertEqual(self.client.get(f"/api/fields/{self.field}").status_code, 404)
+
+        res = self.client.delete(f"/api/fields/{self.field}")
+        self.assertEqual(res.status_code, 202)
+        self.assertEqual(res.json()["id"], job["id"])
+        field_deletion.wait()
+        self.assertEqual(field_deletion.get_job(self.field)["status"], "done")
+        self.assertTrue(all(v == 0 for v in self._remaining().values()))
+        self.assertEqual(self.client.delete(f"/api/fields/{self.field}").status_code, 404)
+
+    def test_register_usage_is_reverted(self):
+        materials = api_db.get_collection("materials")
+        mat = self.ids["material"]
+        before = materials.find_one({"id": mat})["stock_quantity"]
+        self.client.post("/api/daily-register", data={"date": "2024-06-01", "entries": [
+            {"fieldId": self.field, "activity": "fertilizer", "materialsUsed": [{"materialId": mat, "quantity": 3}]},
+        ]}, content_type="application/json")
+        self.assertEqual(materials.find_one({"id": mat})["stock_quantity"], before - 3)
+
+        self.client.delete(f"/api/fields/{self.field}")
+        field_deletion.wait()
+        self.assertEqual(materials.find_one({"id": mat})["stock_quantity"], before)
+        self.assertEqual(api_db.get_collection("material_transactions").count_documents({"registerId": {"$exists": True}}), 0)
@@ -0,0 +1,96 @@
+"""Soil water-balance irrigation schedule (no database needed: rollups and history are passed in),
+and the history query behind it."""
+from datetime import date, timedelta
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from api import irrigation
+from api.db import get_collection
+from api.tests.utils import MongoTestCase
+
+TODAY = date(2026, 6, 15)
+WARM = {"last7d": {"count": 7, "mean": 32.0, "min": 25.0, "max": 39.0}}
+
+
+def _field(field_id, status="cultivated", acres=1):
+    return {"id": field_id, "status": status, "area": acres, "centroid": {"lat": 31.5, "lng": 74.3}}
+
+
+def _history(*events):
+    events = [((TODAY - timedelta(days=ago)).isoformat(), minutes) for ago, minutes in events]
+    return {"events": events, "last": {"date": max(events)[0], "minutes": max(events)[1]} if events else None}
+
+
+class ReferenceEvapotranspirationTests(SimpleTestCase):
+    def test_hargreaves_in_summer_range_for_punjab(self):
+        ra = irrigation.extraterrestrial_radiation(31.5, 172)
+        self.assertAlmostEqual(float(ra), 41.6, delta=0.5)  # FAO-56 Annex 2, 30-32°N in June
+        et0 = float(irrigation.hargreaves(ra, 32.0, 25.0, 39.0))
+        self.assertTrue(5 < et0 < 9, et0)
+
+
+class ScheduleTests(SimpleTestCase):
+    def _plan(self, fields, history, rollups=None):
+        rollups = rollups if rollups is not None else {f["id"]: WARM for f in fields}
+        return irrigation.schedule(fields, TODAY, rollups=rollups, history=history)
+
+    def test_recent_irrigation_pushes_next_date_out(self):
+        plans = self._plan(
+            [_field("dry"), _field("wet"), _field("never")],
+            {"dry": _history((20, 60)), "wet": _history((20, 60), (1, 400)), "never": _history()},
+        )
+        self.assertEqual(plans["dry"]["status"], "overdue")
+        self.assertEqual(plans["dry"]["suggestedNextDate"], TODAY.isoformat())
+        self.assertEqual(plans["wet"]["status"], "ok")
+        self.assertGreater(plans["wet"]["daysUntilNext"], irrigation.DUE_SOON_DAYS)
+        self.assertLess(plans["wet"]["depletionMm"], plans["dry"]["depletionMm"])
+        self.assertEqual(plans["never"]["status"], "no_water")
+        self.assertIsNone(plans["never"]["lastWaterDate"])
+
+    def test_larger_fields_need_longer_irrigation(self):
+        history = {"small": _history((20, 60)), "large": _history((20, 240))}
+        plans = self._plan([_field("small", acres=1), _field("large", acres=4)], history)
+        self.assertEqual(plans["small"]["depletionMm"], plans["large"]["depletionMm"])
+        self.assertAlmostEqual(plans["large"]["suggestedMinutes"] / plans["small"]["suggestedMinutes"], 4, delta=0.05)
+
+    def test_bare_soil_uses_less_water_and_defaults_without_temperature(self):
+        history = {"crop": _history((3, 120)), "bare": _history((3, 120))}
+        plans = self._plan([_field("crop"), _field("bare", status="available")], history, rollups={})
+        self.assertLess(plans["bare"]["etcMmPerDay"], plans["crop"]["etcMmPerDay"])
+        self.assertGreaterEqual(plans["bare"]["daysUntilNext"], plans["crop"]["daysUntilNext"])
+
+    def test_many_fields_match_one_at_a_time(self):
+        rng = np.random.default_rng(3)
+        fields, history = [], {}
+        for i in range(300):
+            fields.append(_field(f"f{i}", status=("cultivated", "available")[i % 2], acres=float(rng.uniform(0.5, 10))))
+            history[f"f{i}"] = _history(*[(int(d), int(m)) for d, m in zip(rng.integers(0, 40, 3), rng.integers(20, 600, 3))])
+        together = self._plan(fields, history)
+        for f in fields[:25]:
+            self.assertEqual(together[f["id"]], self._plan([f], history)[f["id"]])
+
+
+class IrrigationHistoryTests(MongoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.clear_data()
+
+    def test_window_events_and_last_of_all_time(self):
+        get_collection("activities").insert_many([
+            {"field_id": "a", "activity_type": "irrigation", "date": "2026-01-10", "quantity_used": 30},
+            {"field_id": "a", "activity_type": "irrigation", "date": "2026-06-01", "quantity_used": 45},
+            {"field_id": "a", "activity_type": "irrigation", "date": "2026-06-10", "quantity_used": 50},
+            {"field_id": "a", "activity_type": "weeding", "date": "2026-06-12", "quantity_used": 9},
+            {"field_id": "b", "activity_type": "irrigation", "date": "2025-12-01", "quantity_used": 20},
+        ])
+        get_collection("water_records").insert_many([
+            {"fieldId": "c", "date": "2026-06-05", "durationMinutes": 40},
+            {"fieldId": "a", "date": "2026-06-11", "durationMinutes": 99},
+        ])
+        history = irrigation.irrigation_history(["a", "b", "c", "d"], "2026-05-16")
+        self.assertEqual(history["a"], {"last": {"date": "2026-06-10", "minutes": 50},
+                                        "events": [("2026-06-01", 45), ("2026-06-10", 50)]})
+        self.assertEqual(history["b"], {"last": {"date": "2025-12-01", "minutes": 20}, "events": []})
+        self.assertEqual(history["c"], {"last": {"date": "2026-06-05", "minutes": 40}, "events": [("2026-06-05", 40)]})
+        self.assertEqual(history["d"], {"last": None, "events": []})
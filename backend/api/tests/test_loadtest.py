@@ -0,0 +1,86 @@
+"""loadtest.py against a stub HTTP server: login once, mix replayed, errors counted, writes cleaned up."""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+import loadtest
+
+
+class _StubApi(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    logins = 0
+    created = set()
+    lock = threading.Lock()
+
+    def _send(self, status, data=None):
+        raw = json.dumps(data).encode() if data is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def do_GET(self):
+        if self.headers.get("Authorization") != "Bearer t0k":
+            return self._send(401, {"error": "Unauthorized"})
+        if self.path == "/api/fields":
+            return self._send(200, [{"id": "f1", "status": "cultivated"}, {"id": "f2", "status": "not_usable"}])
+        self._send(200, {"ok": True})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if self.path == "/api/auth/login":
+            type(self).logins += 1
+            return self._send(200, {"token": "t0k", "email": body["email"]})
+        if self.path == "/api/ai/chat":
+            return self._send(503, {"error": "AI not available"})
+        with self.lock:
+            activity_id = f"a{len(self.created)}"
+            self.created.add(activity_id)
+        self._send(201, {"id": activity_id, **body})
+
+    def do_DELETE(self):
+        with self.lock:
+            self.created.discard(self.path.rsplit("/", 1)[1])
+        self._send(204)
+
+    def log_message(self, *args):
+        pass
+
+
+class LoadTestTests(SimpleTestCase):
+    def setUp(self):
+        _StubApi.logins = 0
+        _StubApi.created = set()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _StubApi)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def test_levels_report_throughput_latency_and_errors(self):
+        with mock.patch("sys.stdout", StringIO()):
+            report = loadtest.main(["--url", self.url, "--email", "a@b.c", "--password", "x", "--clients", "1,3",
+                                    "--duration", "0.3", "--mix", "dashboard=3,activity_write=2,ai=1"])
+        self.assertEqual(_StubApi.logins, 1)
+        self.assertEqual([level["clients"] for level in report["levels"]], [1, 3])
+        for level in report["levels"]:
+            ops = level["operations"]
+            self.assertEqual(set(ops), {"dashboard", "activity_write", "ai"})
+            self.assertEqual(ops["ai"]["errorRate"], 1.0)
+            self.assertEqual(ops["dashboard"]["errors"], 0)
+            self.assertEqual(level["errors"], ops["ai"]["requests"])
+            self.assertGreater(level["throughputRps"], 0)
+            self.assertLessEqual(level["p50Ms"], level["p99Ms"])
+        self.assertEqual(_StubApi.created, set())
+
+    def test_mix_parsing(self):
+        self.assertEqual(loadtest.parse_mix("dashboard=70, ai=5,fields=0"), [("dashboard", 70.0), ("ai", 5.0)])
+        for bad in ("nope=1", "ai=x", "ai=-1", "ai=0"):
+            with self.subTest(mix=bad), self.assertRaises(ValueError):
+                loadtest.parse_mix(bad)
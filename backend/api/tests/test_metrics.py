@@ -0,0 +1,51 @@
+"""/api/metrics scrapes are authenticated unless explicitly made public; counters never go backwards."""
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from api import metrics
+from api.auth import create_token, get_admin_credentials
+
+
+class MetricsScrapeAuthTests(SimpleTestCase):
+    def setUp(self):
+        settings = override_settings(METRICS_DIR=tempfile.mkdtemp(prefix="slm-metrics-test-"))
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def _status(self, token=None):
+        headers = {"HTTP_AUTHORIZATION": f"Bearer {token}"} if token else {}
+        return self.client.get("/api/metrics", **headers).status_code
+
+    @override_settings(METRICS_TOKEN="", METRICS_PUBLIC=False)
+    def test_login_token_required_by_default(self):
+        self.assertEqual(self._status(), 401)
+        self.assertEqual(self._status("not-a-token"), 401)
+        self.assertEqual(self._status(create_token(get_admin_credentials()[0])), 200)
+
+    @override_settings(METRICS_TOKEN="scrape-secret", METRICS_PUBLIC=False)
+    def test_metrics_token(self):
+        self.assertEqual(self._status(create_token(get_admin_credentials()[0])), 401)
+        self.assertEqual(self._status("scrape-secret"), 200)
+
+    @override_settings(METRICS_TOKEN="", METRICS_PUBLIC=True)
+    def test_public_when_turned_off(self):
+        self.assertEqual(self._status(), 200)
+
+
+class WorkerFileTests(SimpleTestCase):
+    def test_restarted_worker_with_same_pid_keeps_old_counts(self):
+        stats = {"mongo_ops": 0, "mongo_seconds": 0.0, "llm_calls": 0, "llm_seconds": 0.0}
+        with override_settings(METRICS_DIR=tempfile.mkdtemp(prefix="slm-metrics-test-")), \
+                mock.patch.object(metrics, "_series", {}), mock.patch.object(metrics, "_worker", {"pid": None, "file": None}):
+            for _ in range(3):
+                metrics.record("dashboard", "GET", 200, 0.01, 10, stats)
+            metrics.flush()
+            # Same PID, fresh process state
+            metrics._series.clear()
+            metrics._worker.update(pid=None, file=None)
+            metrics.record("dashboard", "GET", 200, 0.01, 10, stats)
+            metrics.flush()
+            merged = metrics._merge_all()
+        self.assertEqual(merged[("dashboard", "GET")]["requests"], {"200": 4})
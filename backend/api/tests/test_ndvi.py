@@ -0,0 +1,62 @@
+"""NDVI zonal statistics from memory-mapped bands (no database needed)."""
+import os
+import tempfile
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from api import ndvi
+
+BOUNDS = (74.0, 31.0, 74.1, 31.1)
+SIZE = 500
+
+
+def _field(field_id, west, south, size):
+    return {"id": field_id, "coordinates": [
+        {"lng": west, "lat": south}, {"lng": west + size, "lat": south},
+        {"lng": west + size, "lat": south + size}, {"lng": west, "lat": south + size},
+    ]}
+
+
+class ZonalStatsTests(SimpleTestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        cols = np.arange(SIZE, dtype=np.float32)
+        red = np.full((SIZE, SIZE), 0.1, dtype=np.float32)
+        nir = np.broadcast_to(0.2 + 0.5 * cols / SIZE, (SIZE, SIZE)).astype(np.float32)
+        red[:50, :50] = np.nan  # cloud over the north-west corner
+        self.values = ndvi.compute(red, nir)
+        for name, band in (("red", red), ("nir", nir)):
+            np.save(os.path.join(self.dir.name, f"{name}.npy"), band)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def _stats(self, fields, tile_size=128):
+        red = ndvi.open_band(os.path.join(self.dir.name, "red.npy"))
+        nir = ndvi.open_band(os.path.join(self.dir.name, "nir.npy"))
+        return dict(ndvi.zonal_stats(red, nir, BOUNDS, fields, tile_size))
+
+    def test_matches_pixels_inside_outline_across_tiles(self):
+        # 0.02 degrees = 100 pixels, starting at pixel (row 200, col 150): spans several tiles
+        stats = self._stats([_field("a", 74.03, 31.06, 0.02)])["a"]
+        expected = self.values[200:300, 150:250]
+        self.assertEqual(stats["pixelCount"], expected.size)
+        self.assertAlmostEqual(stats["mean"], float(expected.mean()), places=4)
+        self.assertAlmostEqual(stats["median"], float(np.median(expected)), delta=ndvi.HIST_STEP)
+        self.assertAlmostEqual(stats["p90"], float(np.percentile(expected, 90)), delta=ndvi.HIST_STEP)
+        self.assertEqual(stats["coverage"], 1.0)
+
+    def test_tile_size_does_not_change_results(self):
+        fields = [_field("a", 74.03, 31.06, 0.02), _field("b", 74.011, 31.011, 0.05)]
+        self.assertEqual(self._stats(fields, 64), self._stats(fields, 1024))
+
+    def test_clouded_and_outside_fields(self):
+        stats = self._stats([
+            _field("cloud", 74.001, 31.091, 0.005),  # entirely under the cloud mask
+            _field("partial", 74.0, 31.08, 0.02),
+            _field("outside", 75.0, 31.0, 0.01),
+        ])
+        self.assertIsNone(stats["cloud"])
+        self.assertLess(stats["partial"]["coverage"], 1.0)
+        self.assertNotIn("outside", stats)
@@ -0,0 +1,53 @@
+"""/api/predict memoizes answers, but not ones where the wanted AI summary was unavailable, and
+not past a recompute of the field's metrics; the field dataVersion counter behind it stays internal."""
+import json
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+
+from api.db import get_collection
+from api.predictions import prediction_cache
+from api.tests.utils import MongoTestCase, seed_farm
+
+
+class PredictionCacheTests(MongoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.clear_data()
+        prediction_cache.clear()
+        self.field = seed_farm(2)["field"]
+
+    def _predict(self, pred_type, include_ai=True):
+        body = {"type": pred_type, "fieldId": self.field, "includeAiSummary": include_ai}
+        response = self.client.post("/api/predict", data=json.dumps(body), content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_fallback_summary_is_not_cached(self):
+        with mock.patch("api.llm.chat", return_value=(None, "", "down")):
+            self.assertEqual(self._predict("prediction_ai_summary")["model"], "built-in")
+            self.assertNotIn("aiSummary", self._predict("crop_health"))
+        with mock.patch("api.llm.chat", return_value=("Irrigate on Friday.", "stub", None)) as ai_chat:
+            self.assertEqual(self._predict("prediction_ai_summary")["aiSummary"], "Irrigate on Friday.")
+            self.assertEqual(self._predict("crop_health")["aiSummary"], "Irrigate on Friday.")
+            self._predict("crop_health")
+        self.assertEqual(ai_chat.call_count, 2)
+
+    def test_data_version_is_not_returned(self):
+        self.client.post("/api/water", data=json.dumps({"fieldId": self.field, "date": "2024-06-01", "durationMinutes": 30}),
+                         content_type="application/json")
+        fields = [
+            *self.client.get("/api/fields").json(),
+            *self.client.get("/api/fields?zoom=12").json(),
+            *self.client.get("/api/dashboard").json()["fields"],
+            self.client.get(f"/api/fields/{self.field}").json(),
+        ]
+        self.assertTrue(fields)
+        self.assertFalse([f for f in fields if "dataVersion" in f])
+
+    def test_recomputed_area_invalidates_cached_predictions(self):
+        get_collection("fields").update_one({"id": self.field}, {"$set": {"area": 999}, "$unset": {"metricsHash": ""}})
+        self.assertIn("area=999 ac", self._predict("yield_prediction", include_ai=False)["factorsUsed"])
+        call_command("recompute_field_metrics", stdout=StringIO())
+        self.assertNotIn("area=999 ac", self._predict("yield_prediction", include_ai=False)["factorsUsed"])
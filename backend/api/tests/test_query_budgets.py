@@ -0,0 +1,125 @@
+"""Query-count budgets for every API route.
+
+Each route is called against a seeded farm of 10 and of 500 fields. The number of Mongo
+commands it issues must be identical at both sizes (no N+1 loops) and within its budget.
+New routes in api/urls.py must be given a budget here.
+"""
+import json
+import os
+from unittest import mock
+
+from django.test import override_settings
+
+from api import field_deletion, urls as api_urls
+from api.benchmarking import command_counter, route_requests, seed_farm
+from api.tests.utils import MongoTestCase
+
+SIZES = (10, 500)
+
+# (route pattern in api/urls.py, method) -> max Mongo commands per request.
+# Transactional writes count their commitTransaction, so standalone servers come in lower.
+# Seeded records are backdated, so stock writes include the snapshot invalidation.
+BUDGETS = {
+    ("auth/login", "POST"): 0,
+    ("dashboard", "GET"): 7,
+    ("fields", "GET"): 1,
+    ("fields", "POST"): 4,  # includes (re)building the overlap index (api/spatial.py)
+    ("fields/within", "GET"): 1,
+    ("fields/near", "GET"): 1,
+    ("fields/<str:pk>", "GET"): 1,
+    ("fields/<str:pk>", "PUT"): 4,
+    ("fields/<str:pk>", "DELETE"): 3,  # tombstone + job + tile version; the cascade runs on its own thread
+    ("fields/<str:pk>/deletion", "GET"): 1,
+    ("fields/<str:pk>/ndvi", "GET"): 1,
+    ("ndvi", "GET"): 1,
+    ("tiles/fields/<int:z>/<int:x>/<int:y>", "GET"): 2,  # a cache hit is 1
+    ("activities", "GET"): 1,
+    ("activities", "POST"): 5,
+    ("activities/import", "POST"): 7,
+    ("activities/<str:pk>", "GET"): 1,
+    ("activities/<str:pk>", "PUT"): 7,
+    ("activities/<str:pk>", "DELETE"): 6,
+    ("thaka", "GET"): 1,
+    ("thaka", "POST"): 1,
+    ("thaka/<str:pk>", "GET"): 1,
+    ("thaka/<str:pk>", "PUT"): 1,
+    ("thaka/<str:pk>", "DELETE"): 1,
+    ("temperature", "GET"): 1,
+    ("temperature", "POST"): 3,  # reading + rollup (api/temperature.py) + data version
+    ("water", "GET"): 1,
+    ("water", "POST"): 2,
+    ("water/analysis", "GET"): 9,  # first view of the day; 2 once snapshotted (api/analytics.py)
+    ("water/<str:pk>", "GET"): 1,
+    ("water/<str:pk>", "PUT"): 2,
+    ("water/<str:pk>", "DELETE"): 2,
+    ("ai/recommendations", "GET"): 5,  # 2 once snapshotted
+    ("ai/insights", "POST"): 7,
+    ("ai/chat", "POST"): 7,
+    ("predict", "POST"): 6,  # crop_health reads the field's latest NDVI
+    ("materials", "GET"): 1,
+    ("materials", "POST"): 2,
+    ("materials/<str:pk>", "GET"): 1,
+    ("materials/<str:pk>", "PUT"): 1,
+    ("materials/<str:pk>", "DELETE"): 4,
+    ("materials/<str:pk>/stock", "GET"): 3,
+    ("material-transactions", "GET"): 1,
+    ("material-transactions", "POST"): 4,
+    ("material-transactions/<str:pk>", "GET"): 1,
+    ("material-transactions/<str:pk>", "PUT"): 4,
+    ("material-transactions/<str:pk>", "DELETE"): 4,
+    ("export", "GET"): 19,
+    ("export/<str:collection>", "GET"): 2,
+    ("daily-register", "GET"): 1,
+    ("daily-register", "POST"): 7,
+    ("daily-register/<str:pk>", "GET"): 1,
+    ("daily-register/<str:pk>", "PUT"): 2,
+    ("daily-register/<str:pk>", "DELETE"): 3,
+    ("field-recommendations", "GET"): 5,  # 2 once snapshotted
+}
+
+
+# Re-read the overlap index token on every check, so counts do not depend on request timing
+@override_settings(SPATIAL_VERSION_TTL=0)
+class QueryBudgetTests(MongoTestCase):
+    def _call(self, method, path, body):
+        kwargs = {}
+        if isinstance(body, str):
+            kwargs = {"data": body, "content_type": "text/csv"}
+        elif body is not None:
+            kwargs = {"data": json.dumps(body), "content_type": "application/json"}
+        with command_counter.capture() as commands:
+            response = getattr(self.client, method.lower())(path, **kwargs)
+            if response.streaming:
+                b"".join(response.streaming_content)
+        self.assertLess(response.status_code, 500, f"{method} {path}: {response.content[:200]}")
+        return list(commands)
+
+    def _measure(self, n_fields):
+        self.clear_data()
+        ids = seed_farm(n_fields)
+        counts = {}
+        for route, method, path, body in route_requests(ids):
+            counts[(route, method)] = self._call(method, path, body)
+        field_deletion.wait()  # background cascade must not leak into the next run
+        return counts
+
+    @mock.patch("dotenv.load_dotenv")
+    @mock.patch("api.llm.chat", return_value=("{}", "stub", None))
+    @mock.patch.dict(os.environ, {"HF_TOKEN": "", "HUGGINGFACE_TOKEN": ""})
+    def test_query_counts_are_constant_and_within_budget(self, *_mocks):
+        by_size = {n: self._measure(n) for n in SIZES}
+        small, large = by_size[SIZES[0]], by_size[SIZES[-1]]
+        for key, budget in BUDGETS.items():
+            with self.subTest(route=key):
+                self.assertIn(key, small, "budgeted route was not exercised")
+                self.assertEqual(
+                    len(small[key]), len(large[key]),
+                    f"{key} query count grows with data: {small[key]} vs {large[key]}",
+                )
+                self.assertLessEqual(len(large[key]), budget, f"{key} over budget: {large[key]}")
+
+    def test_every_route_has_a_budget(self):
+        budgeted = {route for route, _ in BUDGETS}
+        for pattern in api_urls.urlpatterns:
+            with self.subTest(route=str(pattern.pattern)):
+                self.assertIn(str(pattern.pattern), budgeted)
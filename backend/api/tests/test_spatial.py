@@ -0,0 +1,82 @@
+"""Overlap detection: R-tree candidates and the exact polygon test (no database needed)."""
+import random
+
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from api.spatial import FieldIndex, STRTree, polygons_overlap
+
+
+def square(lng, lat, size=0.001):
+    return [(lng, lat), (lng + size, lat), (lng + size, lat + size), (lng, lat + size)]
+
+
+class STRTreeTests(SimpleTestCase):
+    def test_query_matches_brute_force(self):
+        rng = random.Random(7)
+        items = []
+        for i in range(2000):
+            w, s = 74 + rng.random(), 31 + rng.random()
+            items.append((f"f{i}", (w, s, w + 0.004, s + 0.004)))
+        tree = STRTree(items)
+        for _ in range(100):
+            w, s = 74 + rng.random(), 31 + rng.random()
+            box = (w, s, w + 0.01, s + 0.01)
+            expected = sorted(i for i, (bw, bs, be, bn) in items
+                              if bw <= box[2] and be >= box[0] and bs <= box[3] and bn >= box[1])
+            self.assertEqual(sorted(tree.query(box)), expected)
+
+    def test_empty_tree(self):
+        self.assertEqual(STRTree([]).query((0, 0, 1, 1)), [])
+
+
+class PolygonOverlapTests(SimpleTestCase):
+    def test_touching_fields_do_not_overlap(self):
+        self.assertFalse(polygons_overlap(square(74, 31), square(74.001, 31)))
+        self.assertFalse(polygons_overlap(square(74, 31), square(74.001, 31.001)))
+        self.assertFalse(polygons_overlap(square(74, 31), square(74.01, 31)))
+
+    def test_overlapping_fields(self):
+        self.assertTrue(polygons_overlap(square(74, 31), square(74.0005, 31.0005)))
+        self.assertTrue(polygons_overlap(square(74, 31), square(74, 31)))
+        self.assertTrue(polygons_overlap(square(74, 31), square(74.0002, 31.0002, 0.0001)))
+
+    def test_concave_outline(self):
+        ell = [(74, 31), (74.002, 31), (74.002, 31.0005), (74.0005, 31.0005), (74.0005, 31.002), (74, 31.002)]
+        self.assertFalse(polygons_overlap(ell, square(74.001, 31.001, 0.0005)))
+        self.assertTrue(polygons_overlap(ell, square(74.0003, 31.001, 0.0005)))
+
+
+class FieldIndexVersionTests(SimpleTestCase):
+    def _index(self):
+        index = FieldIndex()
+        index.version = "v1"
+        return index
+
+    def test_own_write_adopts_new_token(self):
+        index = self._index()
+        index.record("v1", "v2", "f1", square(74, 31))
+        self.assertEqual(index.version, "v2")
+        self.assertIn("f1", index.shapes)
+        index.touch("v2", "v3")
+        self.assertEqual(index.version, "v3")
+
+    def test_missed_write_drops_index(self):
+        index = self._index()
+        index.record("other", "v2", "f1", square(74, 31))
+        self.assertIsNone(index.version)
+        index = self._index()
+        index.touch("other", "v2")
+        self.assertIsNone(index.version)
+
+    @override_settings(SPATIAL_VERSION_TTL=60)
+    def test_token_is_read_once_per_ttl(self):
+        index = self._index()
+        with mock.patch("api.spatial.tiles.version", return_value="v1") as version:
+            index.overlapping(square(74, 31))
+            index.overlapping(square(74, 31))
+            self.assertEqual(version.call_count, 1)
+            index.record("v1", "v2", "f1", square(74, 31))
+            self.assertEqual(index.overlapping(square(74.0005, 31.0005)), ["f1"])
+            self.assertEqual(version.call_count, 1)
@@ -0,0 +1,65 @@
+"""Synthetic farms are deterministic, consistent with the API's own bookkeeping, and replaceable."""
+import random
+from datetime import date
+
+from django.test import SimpleTestCase
+
+from api import field_metrics, stock, synthetic, temperature
+from api.db import get_collection
+from api.tests.utils import MongoTestCase
+
+END = date(2026, 6, 15)
+COLLECTIONS = ("fields", "activities", "water_records", "daily_register", "material_transactions",
+               "thaka_records", "expenses", "incomes", "temperature_records", "materials")
+
+
+class OutlineTests(SimpleTestCase):
+    def test_outlines_are_repeatable_and_stay_in_their_own_cell(self):
+        n = 50
+        outlines = [synthetic.outline(i, n, random.Random(f"7:{i}")) for i in range(n)]
+        self.assertEqual(outlines[12], synthetic.outline(12, n, random.Random("7:12")))
+        boxes = [m["bbox"] for m in field_metrics.measure_many(outlines)]
+        for i, (west, south, east, north) in enumerate(boxes):
+            for other in boxes[i + 1:]:
+                self.assertTrue(east < other[0] or other[2] < west or north < other[1] or other[3] < south)
+            self.assertGreater(field_metrics.measure(outlines[i])["area"], 1)
+
+
+class ReadingIdTests(SimpleTestCase):
+    def test_batched_ids_match_reading_id(self):
+        dates = [f"2026-{m:02d}-{d:02d}" for m in range(1, 13) for d in (1, 15, 28)] + ["", "2026-06-15T06:00:00Z"]
+        for field_id in ("field_1", "f", "ñandú"):
+            self.assertEqual(temperature.reading_ids(field_id, dates),
+                             [temperature.reading_id(field_id, d) for d in dates])
+
+
+class GenerateTests(MongoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.clear_data()
+
+    def _dump(self):
+        return {name: sorted(map(repr, get_collection(name).find({}, {"_id": 0}).sort("id", 1)))
+                for name in COLLECTIONS}
+
+    def test_same_seed_gives_the_same_farm_whatever_the_batch_size(self):
+        first = synthetic.generate(12, seed=5, end=END)
+        before = self._dump()
+        synthetic.clear()
+        second = synthetic.generate(12, seed=5, end=END, batch_size=37)
+        self.assertEqual(first, second)
+        self.assertEqual(self._dump(), before)
+        self.assertEqual(first["counts"]["fields"], 12)
+        self.assertTrue(all(first["ids"].values()), first["ids"])
+
+    def test_stock_matches_the_ledger_and_replace_removes_only_the_prefix(self):
+        get_collection("fields").insert_one({"id": "real-field", "name": "Real"})
+        synthetic.generate(8, seed=2, end=END)
+        totals = stock.ledger_totals()
+        for material in get_collection("materials").find({}, {"_id": 0}):
+            self.assertEqual(material["stock_quantity"], totals[material["id"]])
+            self.assertGreaterEqual(material["stock_quantity"], 0)
+
+        self.assertGreater(synthetic.clear(), 0)
+        self.assertEqual([f["id"] for f in get_collection("fields").find({}, {"_id": 0})], ["real-field"])
+        self.assertEqual(get_collection("activities").count_documents({}), 0)
@@ -0,0 +1,67 @@
+"""Rolling temperature aggregates stay in step with the readings."""
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import override_settings
+
+from api import temperature
+from api.db import get_collection
+from api.tests.utils import MongoTestCase
+
+
+class TemperatureRollupTests(MongoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.clear_data()
+
+    def _post(self, rows):
+        body = "\n".join(json.dumps(r) for r in rows)
+        return self.client.post("/api/temperature", data=body, content_type="application/x-ndjson")
+
+    def test_windows_follow_latest_reading(self):
+        rows = [{"fieldId": "f1", "date": f"2024-06-{d:02d}", "temperatureC": d, "maxTempC": d + 5} for d in range(1, 31)]
+        self._post(rows)
+        rollup = temperature.rollup_for("f1")
+        self.assertEqual(rollup["lastDate"], "2024-06-30")
+        self.assertEqual(rollup["last7d"], {"count": 7, "mean": 27.0, "min": 24, "max": 35})
+        self.assertEqual(rollup["last30d"]["count"], 30)
+
+        # A reading 10 days later pushes the older days out of the 7-day window
+        self.client.post("/api/temperature", data=json.dumps({"fieldId": "f1", "date": "2024-07-10", "temperatureC": 40}),
+                         content_type="application/json")
+        rollup = temperature.rollup_for("f1")
+        self.assertEqual(rollup["last7d"], {"count": 1, "mean": 40.0, "min": 40, "max": 40})
+        self.assertEqual(rollup["last14d"]["count"], 5)
+
+    def test_reimport_is_idempotent_and_matches_rebuild(self):
+        rows = [{"fieldId": f"f{i}", "date": f"2024-06-{d:02d}", "temperatureC": 20 + i + d % 3}
+                for i in range(3) for d in range(1, 20)]
+        self._post(rows)
+        first = temperature.rollups_for()
+        self._post(rows)
+        self.assertEqual(temperature.rollups_for(), first)
+
+        call_command("rebuild_temperature_rollups", stdout=StringIO())
+        self.assertEqual(temperature.rollups_for(), first)
+
+    def test_second_reading_for_a_day_replaces_it_in_both_layouts(self):
+        for storage in ("documents", "buckets"):
+            with self.subTest(storage=storage), override_settings(TEMPERATURE_STORAGE=storage):
+                self.clear_data()
+                first, again = (self.client.post("/api/temperature", content_type="application/json",
+                                                 data=json.dumps({"fieldId": "f1", "date": "2024-06-01", "temperatureC": t}))
+                                for t in (20, 30))
+                self.assertEqual((first.status_code, again.status_code), (201, 200 if storage == "documents" else 201))
+                self.assertEqual([r["temperatureC"] for r in temperature.list_readings("f1")], [30])
+                self.assertEqual(temperature.rollup_for("f1")["last7d"], {"count": 1, "mean": 30.0, "min": 30, "max": 30})
+
+    def test_dedupe_keeps_latest_reading_and_makes_key_unique(self):
+        col = get_collection(temperature.RECORDS_COLLECTION)
+        col.drop_index("fieldId_1_date_1")
+        col.insert_many([{"id": f"r{n}", "fieldId": "f1", "date": "2024-06-01", "temperatureC": n} for n in range(3)]
+                        + [{"id": "other", "fieldId": "f1", "date": "2024-06-02", "temperatureC": 5}])
+        call_command("dedupe_temperature_records", stdout=StringIO())
+        self.assertEqual(sorted(r["id"] for r in temperature.list_readings("f1")), ["other", "r2"])
+        self.assertTrue(col.index_information()["fieldId_1_date_1"]["unique"])
+        self.assertEqual(temperature.rollup_for("f1")["last7d"], {"count": 2, "mean": 3.5, "min": 2, "max": 5})
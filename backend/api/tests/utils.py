@@ -0,0 +1,58 @@
+"""Shared helpers for backend tests that need a real MongoDB.
+
+Set MONGO_TEST_URI (e.g. mongodb://localhost:27017) to run them against that server; otherwise
+`manage.py test` starts a temporary mongod from PATH (api/tests/runner.py), and only without
+one are they skipped, with a notice on stderr.
+Each test class works in its own throwaway database, dropped on teardown.
+"""
+import os
+import unittest
+
+from django.test import SimpleTestCase, override_settings
+
+from api import db as api_db
+from api.auth import create_token, get_admin_credentials
+from api.benchmarking import command_counter, seed_farm  # noqa: F401 (re-exported for tests)
+
+
+class MongoTestCase(SimpleTestCase):
+    """SimpleTestCase bound to a throwaway Mongo database on MONGO_TEST_URI."""
+
+    databases = set()
+
+    @classmethod
+    def setUpClass(cls):
+        uri = os.environ.get("MONGO_TEST_URI", "").strip()
+        if not uri:
+            raise unittest.SkipTest("needs MongoDB: set MONGO_TEST_URI or put mongod on PATH")
+        cls._settings = override_settings(
+            MONGO_URI=uri,
+            MONGO_DB=f"slm_test_{cls.__name__.lower()}_{os.getpid()}",
+            MONGO_SERVER_SELECTION_TIMEOUT_MS=3000,
+        )
+        cls._settings.enable()
+        api_db.reset_clients()
+        super().setUpClass()
+        api_db.get_collection("fields")  # bootstrap db + indexes before any counting
+
+    @classmethod
+    def tearDownClass(cls):
+        try:
+            db = api_db.get_db()
+            db.client.drop_database(db.name)
+        finally:
+            api_db.reset_clients()
+            cls._settings.disable()
+            super().tearDownClass()
+
+    def setUp(self):
+        super().setUp()
+        token = create_token(get_admin_credentials()[0])
+        self.client.defaults["HTTP_AUTHORIZATION"] = f"Bearer {token}"
+
+    @staticmethod
+    def clear_data():
+        db = api_db.get_db()
+        for name in db.list_collection_names():
+            if not name.startswith("system."):
+                db[name].delete_many({})
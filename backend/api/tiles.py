@@ -0,0 +1,222 @@
+"""Field outlines as map tiles: GET /api/tiles/fields/<z>/<x>/<y>.
+
+Each tile is a small JSON document in the layout of a Mapbox vector tile layer: the fields
+intersecting the tile, their outlines (the lod level for z, see api/lod.py) clipped to the
+tile plus a small buffer and quantized to integer coordinates in a 4096 x 4096 grid:
+
+    {"z", "x", "y", "extent": 4096,
+     "features": [{"id", "properties": {name, status, area}, "geometry": {"type": "Polygon", ...}}]}
+
+Tiles are cached on disk under TILE_CACHE_DIR/<version>/z/x/y.json with least-recently-used
+eviction once the cache exceeds TILE_CACHE_MAX_MB. `version` is a token in Mongo
+(`tile_versions`, _id "fields") that every field write replaces, so one write invalidates
+every worker's tiles at once; directories of old versions are removed lazily.
+"""
+import json
+import logging
+import math
+import os
+import shutil
+import tempfile
+import threading
+
+import numpy as np
+from django.conf import settings
+from pymongo import ReturnDocument
+
+from . import field_deletion, geometry, lod
+from .db import get_collection, generate_id
+
+logger = logging.getLogger("api.tiles")
+
+VERSIONS_COLLECTION = "tile_versions"
+EXTENT = 4096
+BUFFER = 64
+MAX_ZOOM = 22
+
+_lock = threading.Lock()
+_state = {"version": None, "bytes": None}
+
+
+def _cache_root():
+    path = getattr(settings, "TILE_CACHE_DIR", "") or os.path.join(tempfile.gettempdir(), "slm-tiles")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _max_bytes():
+    return int(getattr(settings, "TILE_CACHE_MAX_MB", 256)) * 1024 * 1024
+
+
+def version():
+    doc = get_collection(VERSIONS_COLLECTION).find_one({"_id": "fields"})
+    return doc["version"] if doc else "initial"
+
+
+def invalidate():
+    """Mark every cached field tile stale (call after any field write).
+
+    Returns (previous version, new version); a previous version other than the one a worker
+    last saw means another worker wrote fields in between.
+    """
+    token = generate_id()
+    before = get_collection(VERSIONS_COLLECTION).find_one_and_update(
+        {"_id": "fields"}, {"$set": {"version": token}}, upsert=True, return_document=ReturnDocument.BEFORE,
+    )
+    return (before["version"] if before else "initial"), token
+
+
+def valid_tile(z, x, y):
+    return 0 <= z <= MAX_ZOOM and 0 <= x < 2 ** z and 0 <= y < 2 ** z
+
+
+def tile_bounds(z, x, y):
+    """(west, south, east, north) of a Web Mercator XYZ tile."""
+    n = 2 ** z
+
+    def lat(row):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return x / n * 360 - 180, lat(y + 1), (x + 1) / n * 360 - 180, lat(y)
+
+
+def _to_tile(points, z, x, y):
+    """(lng, lat) points -> float tile coordinates (0..EXTENT inside the tile)."""
+    lng, lat = np.radians(np.asarray(points, dtype=float)).T
+    n = 2 ** z
+    px = (np.degrees(lng) + 180) / 360 * n - x
+    py = (1 - np.log(np.tan(lat) + 1 / np.cos(lat)) / np.pi) / 2 * n - y
+    return np.column_stack([px, py]) * EXTENT
+
+
+def _clip_edge(pts, axis, bound, keep_below):
+    """One Sutherland–Hodgman pass against the line `axis == bound`, vectorized over edges."""
+    nxt = np.roll(pts, -1, axis=0)
+    if keep_below:
+        cur_in, nxt_in = pts[:, axis] <= bound, nxt[:, axis] <= bound
+    else:
+        cur_in, nxt_in = pts[:, axis] >= bound, nxt[:, axis] >= bound
+    delta = nxt[:, axis] - pts[:, axis]
+    t = np.divide(bound - pts[:, axis], delta, out=np.zeros(len(pts)), where=delta != 0)
+    crossing = pts + t[:, None] * (nxt - pts)
+    # Per edge emit [crossing point if it crosses the line, next vertex if it is inside]
+    out = np.stack([crossing, nxt], axis=1)
+    keep = np.stack([cur_in != nxt_in, nxt_in], axis=1)
+    return out[keep]
+
+
+def clip(pts, low=-BUFFER, high=EXTENT + BUFFER):
+    for axis in (0, 1):
+        for bound, keep_below in ((high, True), (low, False)):
+            if len(pts) == 0:
+                return pts
+            pts = _clip_edge(pts, axis, bound, keep_below)
+    return pts
+
+
+def _quantize(pts):
+    """Round to the integer grid and drop vertices that collapse onto their predecessor."""
+    q = np.rint(pts).astype(np.int64)
+    if len(q) > 1:
+        q = q[np.any(q != np.roll(q, 1, axis=0), axis=1)]
+    return q
+
+
+def build_tile(z, x, y):
+    west, south, east, north = tile_bounds(z, x, y)
+    fields = get_collection("fields").find(
+        field_deletion.live(geometry.within_query(west, south, east, north)),
+        {"_id": 0, "id": 1, "name": 1, "status": 1, "area": 1, "coordinates": 1, "lod": 1},
+    )
+    features = []
+    for field in lod.apply(list(fields), z):
+        points = geometry.ring(field.get("coordinates"))
+        if len(points) < 3:
+            continue
+        ring = _quantize(clip(_to_tile(points, z, x, y)))
+        if len(np.unique(ring, axis=0)) < 3:
+            continue
+        coords = ring.tolist()
+        features.append({
+            "id": field.get("id"),
+            "properties": {"name": field.get("name"), "status": field.get("status"), "area": field.get("area")},
+            "geometry": {"type": "Polygon", "coordinates": [coords + [coords[0]]]},
+        })
+    return {"z": z, "x": x, "y": y, "extent": EXTENT, "features": features}
+
+
+def _dir_size(root):
+    total = 0
+    for dirpath, _, files in os.walk(root):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, name))
+            except OSError:
+                pass
+    return total
+
+
+def _drop_old_versions(root, current):
+    for name in os.listdir(root):
+        if name != current:
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+
+def _evict(root, limit):
+    """Delete least recently used tiles (oldest mtime; hits touch it) until under 80% of limit."""
+    files = []
+    for dirpath, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(dirpath, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, path))
+    total = sum(f[1] for f in files)
+    files.sort()
+    for _, size, path in files:
+        if total <= limit * 0.8:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+    return total
+
+
+def get_tile(z, x, y, current=None):
+    """(version, tile JSON bytes), from the disk cache or freshly built."""
+    current = current or version()
+    root = _cache_root()
+    with _lock:
+        if _state["version"] != current:
+            _drop_old_versions(root, current)
+            _state["version"], _state["bytes"] = current, None
+    path = os.path.join(root, current, str(z), str(x), f"{y}.json")
+    try:
+        with open(path, "rb") as fh:
+            payload = fh.read()
+        os.utime(path)
+        return current, payload
+    except FileNotFoundError:
+        pass
+
+    payload = json.dumps(build_tile(z, x, y), separators=(",", ":")).encode()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as fh:
+            fh.write(payload)
+        os.replace(tmp, path)
+        with _lock:
+            if _state["bytes"] is None:
+                _state["bytes"] = _dir_size(root)
+            else:
+                _state["bytes"] += len(payload)
+            if _state["bytes"] > _max_bytes():
+                _state["bytes"] = _evict(root, _max_bytes())
+    except OSError as e:
+        logger.warning("tile cache write failed for %s/%s/%s: %s", z, x, y, e)
+    return current, payload
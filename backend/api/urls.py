@@ -1,17 +1,32 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 from .auth import login_view
 from . import activities_view
+from . import export
+
+# The I/O-bound views have async versions for ASGI deployments (config/asgi.py)
+if settings.ASYNC_VIEWS:
+    from . import async_views as io_views
+else:
+    io_views = views
 
 urlpatterns = [
     # All API endpoints are defined without trailing slash to avoid Next.js
     # 308 redirects and 404s (canonical form: /api/...).
     path("auth/login", login_view),
-    path("dashboard", views.dashboard),
+    path("dashboard", io_views.dashboard),
     path("fields", views.fields_list),
+    path("fields/within", views.fields_within),
+    path("fields/near", views.fields_near),
     path("fields/<str:pk>", views.fields_detail),
+    path("fields/<str:pk>/deletion", views.field_deletion_status),
+    path("fields/<str:pk>/ndvi", views.field_ndvi),
+    path("ndvi", views.ndvi_latest),
+    path("tiles/fields/<int:z>/<int:x>/<int:y>", views.field_tile),
     # Unified Activities
     path("activities", activities_view.activities_list),
+    path("activities/import", activities_view.activities_import),
     path("activities/<str:pk>", activities_view.activities_detail),
 
     path("thaka", views.thaka_list),
@@ -20,19 +35,26 @@ urlpatterns = [
 
     # Water records (logging irrigation) + analysis
     path("water", views.water_list),
-    path("water/analysis", views.water_analysis),
+    path("water/analysis", io_views.water_analysis),
     path("water/<str:pk>", views.water_detail),
 
     path("ai/recommendations", views.ai_recommendations),
-    path("ai/insights", views.ai_insights),
-    path("ai/chat", views.ai_chat),
-    path("predict", views.predict),
+    path("ai/insights", io_views.ai_insights),
+    path("ai/chat", io_views.ai_chat),
+    path("predict", io_views.predict),
 
     # Materials
     path("materials", views.materials_list),
     path("materials/<str:pk>", views.materials_detail),
+    path("materials/<str:pk>/stock", views.material_stock),
     path("material-transactions", views.material_transactions_list),
     path("material-transactions/<str:pk>", views.material_transactions_detail),
+    path("daily-register", views.daily_register_list),
+    path("daily-register/<str:pk>", views.daily_register_detail),
+
+    # Streaming data export (CSV/NDJSON, optionally zipped)
+    path("export", export.export_archive),
+    path("export/<str:collection>", export.export_collection),
 
     # Keeping this for ML/Suggestions if used
     path("field-recommendations", views.field_recommendations),
@@ -5,15 +5,23 @@ import os
 import re
 from datetime import datetime
 
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.utils.decorators import method_decorator
 
+from . import analytics, field_deletion, field_metrics, geometry, irrigation, llm, lod, ndvi, spatial, stock, temperature, tiles
 from .db import get_collection, generate_id
+from .metrics import llm_timer
+from .predictions import bump_data_version, prediction_cache, prediction_key, stable_jitter
 
 logger = logging.getLogger("api.views")
 
+# Field documents as returned to clients: `geometry` only backs the geo index, `lod`
+# is only read when a zoom is requested (see _fields_at_zoom) and `dataVersion` is an
+# internal change counter (api/predictions.py)
+FIELD_PROJECTION = {'_id': 0, 'geometry': 0, 'lod': 0, 'dataVersion': 0}
+
 
 def _json_response(data, status=200):
     return JsonResponse(data, status=status, safe=False)
@@ -46,15 +54,67 @@ def _parse_body(request):
         return {}
 
 
+NDJSON_CONTENT_TYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+
+
+def _parse_rows(request):
+    """Bulk bodies: a JSON array, {"rows": [...]}, or NDJSON (one object per line).
+
+    Returns a list of (row number, row or None, error or None), or None when the body is a
+    single JSON object (not a bulk request).
+    """
+    if request.content_type in NDJSON_CONTENT_TYPES:
+        rows = []
+        for n, line in enumerate(request.body.decode('utf-8', errors='replace').splitlines(), 1):
+            if not line.strip():
+                continue
+            try:
+                rows.append((n, json.loads(line), None))
+            except json.JSONDecodeError as e:
+                rows.append((n, None, f'invalid JSON: {e.msg}'))
+        return rows
+    body = _parse_body(request)
+    if isinstance(body, dict) and isinstance(body.get('rows'), list):
+        body = body['rows']
+    if isinstance(body, list):
+        return [(n, row, None) for n, row in enumerate(body, 1)]
+    return None
+
+
+def _recent_by_field(col, match, key, limit):
+    """Return {field id: newest `limit` docs by date} for every field in one aggregation."""
+    pipeline = [
+        {'$match': match},
+        {'$group': {
+            '_id': f'${key}',
+            'docs': {'$topN': {'n': limit, 'sortBy': {'date': -1}, 'output': '$$ROOT'}},
+        }},
+        {'$project': {'docs._id': 0}},
+    ]
+    return {row['_id']: row['docs'] for row in col.aggregate(pipeline)}
+
+
 # --- Fields (GeoFence) ---
 
+def _zoom_projection(zoom):
+    return FIELD_PROJECTION if zoom is None else {'_id': 0, 'geometry': 0, 'dataVersion': 0}
+
+
+def _fields_at_zoom(zoom, query=None):
+    """Live fields; with a zoom, outlines are the simplified level for it (api/lod.py)."""
+    return lod.apply(list(get_collection('fields').find(field_deletion.live(query), _zoom_projection(zoom))), zoom)
+
+
 @csrf_exempt
 @require_http_methods(["GET", "POST"])
 def fields_list(request):
     col = get_collection('fields')
     if request.method == 'GET':
-        items = list(col.find({}, {'_id': 0}))
-        return _json_response(items)
+        try:
+            zoom = lod.parse_zoom(request.GET.get('zoom'))
+        except ValueError as e:
+            return _api_error("Invalid zoom", status=400, detail=e)
+        return _json_response(_fields_at_zoom(zoom))
 
     body = _parse_body(request)
     doc = {
@@ -73,43 +133,165 @@ def fields_list(request):
     now = datetime.utcnow().isoformat() + 'Z'
     doc['createdAt'] = doc['createdAt'] or now
     doc['updatedAt'] = doc['updatedAt'] or now
-    col.insert_one(doc)
-    del doc['_id']
+    overlaps = spatial.index.overlapping(doc['coordinates'])
+    if overlaps and not body.get('allowOverlap'):
+        return _json_response({'error': 'Field overlaps existing fields', 'overlapsWith': overlaps}, 409)
+    doc['overlapsWith'] = overlaps
+    # Measured area replaces the client's whenever the outline is a polygon
+    doc.update(field_metrics.metrics_fields(doc['coordinates']))
+    shapes = lod.lod_fields(doc['coordinates'])
+
+    def insert(geo):
+        col.insert_one({**doc, **shapes, **geo})
+        doc['geometryApprox'] = geo['geometryApprox']
+
+    geometry.write_with_fallback(insert, doc['coordinates'])
+    spatial.index.record(*tiles.invalidate(), doc['id'], doc['coordinates'])
     return _json_response(doc, 201)
 
 
+@csrf_exempt
+@require_http_methods(["GET"])
+def fields_within(request):
+    """Fields intersecting the map viewport: ?bbox=west,south,east,north (&zoom= to simplify)."""
+    try:
+        box = geometry.parse_bbox(request.GET.get('bbox'))
+        zoom = lod.parse_zoom(request.GET.get('zoom'))
+    except ValueError as e:
+        return _api_error("Invalid bbox or zoom", status=400, detail=e)
+    return _json_response(_fields_at_zoom(zoom, geometry.within_query(*box)))
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def fields_near(request):
+    """Fields within ?radius= metres (default 1000) of ?lat=&lng=, nearest first, with `distance`."""
+    try:
+        lat, lng = float(request.GET['lat']), float(request.GET['lng'])
+        radius = float(request.GET.get('radius') or 1000)
+    except (KeyError, ValueError) as e:
+        return _api_error("lat and lng are required numbers", status=400, detail=e)
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180) or not 0 < radius <= geometry.MAX_NEAR_RADIUS_M:
+        return _api_error(f"lat/lng out of range or radius not in (0, {geometry.MAX_NEAR_RADIUS_M}]", status=400)
+    items = list(get_collection('fields').aggregate([
+        geometry.near_stage(lat, lng, radius, field_deletion.LIVE),
+        {'$project': FIELD_PROJECTION},
+    ]))
+    return _json_response(items)
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def field_tile(request, z, x, y):
+    """Field outlines clipped and quantized to one XYZ map tile (see api/tiles.py)."""
+    if not tiles.valid_tile(z, x, y):
+        return _api_error("Tile out of range", status=404)
+    current = tiles.version()
+    etag = f'"{current}"'
+    if request.headers.get('If-None-Match') == etag:
+        response = HttpResponse(status=304)
+    else:
+        _, payload = tiles.get_tile(z, x, y, current)
+        response = HttpResponse(payload, content_type='application/json')
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
 @csrf_exempt
 @require_http_methods(["GET", "PUT", "DELETE"])
 def fields_detail(request, pk):
     col = get_collection('fields')
     if request.method == 'GET':
-        doc = col.find_one({'id': pk}, {'_id': 0})
+        doc = col.find_one(field_deletion.live({'id': pk}), FIELD_PROJECTION)
         if not doc:
             return _json_response({'error': 'Not found'}, 404)
         return _json_response(doc)
 
     if request.method == 'PUT':
         body = _parse_body(request)
+        allow_overlap = body.pop('allowOverlap', False)
+        for key in ('deleted', 'geometry', 'geometryApprox', 'lod', 'overlapsWith', *field_metrics.UNMEASURED):
+            body.pop(key, None)
         from datetime import datetime
         body['updatedAt'] = datetime.utcnow().isoformat() + 'Z'
-        result = col.find_one_and_update(
-            {'id': pk},
-            {'$set': body},
-            return_document=True
-        )
+
+        def update(changes):
+            return col.find_one_and_update(
+                field_deletion.live({'id': pk}),
+                changes,
+                projection=FIELD_PROJECTION,
+                return_document=True
+            )
+
+        if 'coordinates' in body:
+            overlaps = spatial.index.overlapping(body['coordinates'], exclude=pk)
+            if overlaps and not allow_overlap:
+                return _json_response({'error': 'Field overlaps existing fields', 'overlapsWith': overlaps}, 409)
+            body['overlapsWith'] = overlaps
+            body.update(field_metrics.metrics_fields(body['coordinates']))
+            shapes = lod.lod_fields(body['coordinates'])
+            result = geometry.write_with_fallback(
+                lambda geo: update({'$set': {**body, **shapes, **geo}}), body['coordinates'])
+        elif 'area' in body:
+            # A client area only sticks on fields without a measured outline
+            area = body.pop('area')
+            result = update([
+                {'$set': {k: {'$literal': v} for k, v in body.items()}},
+                {'$set': {'area': {'$cond': [{'$ifNull': ['$metricsHash', False]}, '$area', {'$literal': area}]}}},
+            ])
+        else:
+            result = update({'$set': body})
         if not result:
             return _json_response({'error': 'Not found'}, 404)
-        del result['_id']
+        if 'coordinates' in body:
+            spatial.index.record(*tiles.invalidate(), pk, body['coordinates'])
+        else:
+            spatial.index.touch(*tiles.invalidate())
         return _json_response(result)
 
     if request.method == 'DELETE':
-        col.delete_one({'id': pk})
-        get_collection('expenses').delete_many({'fieldId': pk})
-        get_collection('incomes').delete_many({'fieldId': pk})
-        get_collection('thaka_records').delete_many({'fieldId': pk})
-        get_collection('water_records').delete_many({'fieldId': pk})
-        get_collection('temperature_records').delete_many({'fieldId': pk})
-        return _json_response({}, 204)
+        # Hidden at once; its records are removed by a background job (see api/field_deletion.py)
+        job = field_deletion.start(pk)
+        if not job:
+            return _json_response({'error': 'Not found'}, 404)
+        spatial.index.record(*tiles.invalidate(), pk)
+        return _json_response(job, 202)
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def field_deletion_status(request, pk):
+    """Progress of a field's background deletion."""
+    job = field_deletion.get_job(pk)
+    if not job:
+        return _json_response({'error': 'Not found'}, 404)
+    return _json_response(job)
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def field_ndvi(request, pk):
+    """NDVI statistics for one field, newest first (?limit=, default 30)."""
+    try:
+        limit = min(365, max(1, int(request.GET.get('limit', 30))))
+    except ValueError:
+        return _json_response({'error': 'limit must be an integer'}, 400)
+    try:
+        return _json_response(ndvi.history(pk, limit))
+    except Exception as e:
+        return _api_error("Failed to load NDVI", status=500, detail=e)
+
+
+@csrf_exempt
+@require_http_methods(["GET"])
+def ndvi_latest(request):
+    """Newest NDVI statistics per field: {fieldId: stats}."""
+    try:
+        latest = _recent_by_field(get_collection(ndvi.COLLECTION), {}, 'fieldId', 1)
+        return _json_response({fid: docs[0] for fid, docs in latest.items() if fid and docs})
+    except Exception as e:
+        return _api_error("Failed to load NDVI", status=500, detail=e)
 
 
 # --- Expenses ---
@@ -133,6 +315,7 @@ def expenses_list(request):
     }
     col.insert_one(doc)
     del doc['_id']
+    bump_data_version(doc['fieldId'])
     return _json_response(doc, 201)
 
 
@@ -155,16 +338,18 @@ def expenses_detail(request, pk):
                 return _json_response({'error': 'Not found'}, 404)
             del doc['_id']
             return _json_response(doc)
-        result = col.find_one_and_update(
-            {'id': pk}, {'$set': update}, return_document=True
-        )
-        if not result:
+        # Read the pre-update doc so both the old and new field are invalidated
+        before = col.find_one_and_update({'id': pk}, {'$set': update}, {'_id': 0})
+        if not before:
             return _json_response({'error': 'Not found'}, 404)
-        del result['_id']
+        result = {**before, **update}
+        bump_data_version(before.get('fieldId'), result.get('fieldId'))
         return _json_response(result)
     if request.method == 'DELETE':
-        if col.delete_one({'id': pk}).deleted_count == 0:
+        doc = col.find_one_and_delete({'id': pk}, {'_id': 0, 'fieldId': 1})
+        if doc is None:
             return _json_response({'error': 'Not found'}, 404)
+        bump_data_version(doc.get('fieldId'))
         return _json_response({}, 204)
 
 
@@ -189,6 +374,7 @@ def incomes_list(request):
     }
     col.insert_one(doc)
     del doc['_id']
+    bump_data_version(doc['fieldId'])
     return _json_response(doc, 201)
 
 
@@ -211,16 +397,18 @@ def incomes_detail(request, pk):
                 return _json_response({'error': 'Not found'}, 404)
             del doc['_id']
             return _json_response(doc)
-        result = col.find_one_and_update(
-            {'id': pk}, {'$set': update}, return_document=True
-        )
-        if not result:
+        # Read the pre-update doc so both the old and new field are invalidated
+        before = col.find_one_and_update({'id': pk}, {'$set': update}, {'_id': 0})
+        if not before:
             return _json_response({'error': 'Not found'}, 404)
-        del result['_id']
+        result = {**before, **update}
+        bump_data_version(before.get('fieldId'), result.get('fieldId'))
         return _json_response(result)
     if request.method == 'DELETE':
-        if col.delete_one({'id': pk}).deleted_count == 0:
+        doc = col.find_one_and_delete({'id': pk}, {'_id': 0, 'fieldId': 1})
+        if doc is None:
             return _json_response({'error': 'Not found'}, 404)
+        bump_data_version(doc.get('fieldId'))
         return _json_response({}, 204)
 
 
@@ -284,155 +472,47 @@ def thaka_detail(request, pk):
 
 # --- Water Records ---
 
+def _water_analysis_payload(per_field, warnings, recomputed, summary):
+    # Notes written for an older version of a field no longer apply
+    notes = summary.get('notes') or {}
+    for p in per_field:
+        if p['fieldId'] not in recomputed:
+            p['aiNote'] = notes.get(p['fieldId'])
+        if not p.get('aiNote'):
+            p['aiNote'] = f"Next irrigation suggested on {p['suggestedNextDate']} for about {p['suggestedMinutes']} minutes."
+    analysis_text = summary.get('analysis')
+    if not analysis_text:
+        analysis_text = (
+            f"Based on your water records: {len(warnings)} field(s) need attention. "
+            + ("Schedule irrigation for fields with no recent water. " if any(w.get('type') == 'overdue' or w.get('type') == 'no_water' for w in warnings) else "")
+            + "Use the suggested next dates and durations below as a guide; adjust for soil type and weather."
+        )
+    return {
+        'warnings': warnings,
+        'analysis': analysis_text,
+        'perField': per_field,
+        'model': summary.get('model') or 'built-in',
+    }
+
+
 @csrf_exempt
 @require_http_methods(["GET"])
 def water_analysis(request):
     """Return water warnings, AI analysis, and per-field next-water suggestions (date + duration)."""
     try:
-        import random
-        from datetime import datetime, timedelta
-
-        fields_col = get_collection('fields')
-        temp_col = get_collection('temperature_records')
-        act_col = get_collection('activities')
-        
-        fields = list(fields_col.find({}, {'_id': 0}))
-        today_s = datetime.utcnow().strftime('%Y-%m-%d')
-
-        warnings = []
-        per_field = []
-
-        for f in fields:
-            fid = f.get('id', '')
-            fname = f.get('name', 'Field')
-            if f.get('status') == 'not_usable':
-                continue
-                
-            # Unified: look at both activities (irrigation) and legacy water_records
-            field_water = list(act_col.find(
-                {'field_id': fid, 'activity_type': 'irrigation'}, 
-                {'_id': 0}
-            ).sort('date', -1).limit(10))
-            
-            # Fallback for legacy data
-            if not field_water:
-                water_col = get_collection('water_records')
-                legacy = list(water_col.find({'fieldId': fid}, {'_id': 0}).sort('date', -1).limit(10))
-                # Map legacy to activity shape for the logic below
-                field_water = [{
-                    'id': l.get('id'),
-                    'date': l.get('date'),
-                    'quantity_used': l.get('durationMinutes', 0),
-                    'notes': l.get('notes')
-                } for l in legacy]
-            field_temp = list(temp_col.find({'fieldId': fid}, {'_id': 0}).sort('date', -1).limit(7))
-            last_water = field_water[0] if field_water else None
-            last_date_s = last_water.get('date', '')[:10] if last_water else ''
-            last_mins = 30
-            if last_water:
-                 last_mins = last_water.get('quantity_used') or last_water.get('durationMinutes') or 30
-                 last_mins = _to_num(last_mins) if last_mins else 30
-
-            # Rule-based warning
-            warning = None
-            if not last_date_s:
-                warning = 'no_water_yet'
-                warnings.append({'fieldId': fid, 'fieldName': fname, 'type': 'no_water', 'message': 'No irrigation recorded yet. Consider logging water or schedule first irrigation.', 'priority': 'medium'})
-            else:
-                try:
-                    last_d = datetime.strptime(last_date_s, '%Y-%m-%d')
-                    today_d = datetime.strptime(today_s, '%Y-%m-%d')
-                    days_since = (today_d - last_d).days
-                    if days_since >= 5:
-                        warning = 'overdue'
-                        warnings.append({'fieldId': fid, 'fieldName': fname, 'type': 'overdue', 'message': f'No irrigation since {last_date_s} ({days_since} days). Schedule watering soon.', 'priority': 'high'})
-                    elif days_since >= 3:
-                        warning = 'due_soon'
-                        warnings.append({'fieldId': fid, 'fieldName': fname, 'type': 'due_soon', 'message': f'Last watered {last_date_s}. Consider irrigation in the next 1–2 days.', 'priority': 'medium'})
-                except Exception:
-                    pass
-
-            # Suggested next date and minutes (same logic as water_forecast)
-            base_mins = max(25, min(90, last_mins + round(random.random() * 20 - 5)))
-            days_ahead = 7
-            if last_date_s:
-                try:
-                    last_d = datetime.strptime(last_date_s, '%Y-%m-%d')
-                    days_ahead = max(4, min(10, 5 + (35 - (datetime.utcnow() - last_d.replace(tzinfo=None)).days) // 5))
-                except Exception:
-                    pass
-            if field_temp:
-                avg_t = sum(t.get('temperatureC', 0) for t in field_temp[:7]) / min(7, len(field_temp))
-                if avg_t > 32:
-                    base_mins = min(90, base_mins + 10)
-                    days_ahead = max(4, days_ahead - 1)
-                elif avg_t < 20:
-                    days_ahead = min(10, days_ahead + 1)
-            next_d = (datetime.utcnow() + timedelta(days=days_ahead)).strftime('%Y-%m-%d')
-            suggested_mins = round(base_mins + random.random() * 10)
-
-            per_field.append({
-                'fieldId': fid,
-                'fieldName': fname,
-                'lastWaterDate': last_date_s or None,
-                'lastDurationMinutes': last_mins,
-                'suggestedNextDate': next_d,
-                'suggestedMinutes': suggested_mins,
-                'warning': warning,
-                'aiNote': None,
-            })
-
-        # AI analysis (overall paragraph + per-field note)
-        analysis_text = None
-        model_used = 'built-in'
-        context_parts = [f"Today: {today_s}. Fields: {len(per_field)}."]
-        for p in per_field:
-            ctx = f"{p['fieldName']}: last water {p['lastWaterDate'] or 'never'}"
-            if p['lastDurationMinutes']:
-                ctx += f" ({p['lastDurationMinutes']} min)"
-            ctx += f"; suggested next: {p['suggestedNextDate']}, {p['suggestedMinutes']} min. Warning: {p['warning'] or 'none'}."
-            context_parts.append(ctx)
-        water_context = "\n".join(context_parts)
-
-        system = """You are an irrigation advisor for Pakistan/South Asia. Respond with ONLY valid JSON, no markdown or extra text.
-    Use this exact structure: {"analysis": "2-4 sentence overall analysis of irrigation status and any risks (over/under watering). Mention which fields need attention and when to water next.", "notes": ["one sentence per field in the same order as given: when to water next and brief reason"]}
-    The "notes" array must have exactly one entry per field, in the same order as in the user message."""
-        user = f"Water data:\n{water_context}"
-
-        ai_content, model_used_raw, _ = _call_ai_chat(system, user)
-        model_used = model_used_raw
-        if ai_content:
-            try:
-                # Strip possible markdown code block
-                raw = ai_content.strip()
-                if raw.startswith("```"):
-                    raw = raw.split("\n", 1)[-1] if "\n" in raw else raw[3:]
-                if raw.endswith("```"):
-                    raw = raw.rsplit("```", 1)[0].strip()
-                data = json.loads(raw)
-                analysis_text = (data.get("analysis") or "").strip()
-                notes_list = data.get("notes") or []
-                for i, note in enumerate(notes_list):
-                    if i < len(per_field) and isinstance(note, str):
-                        per_field[i]["aiNote"] = note.strip()
-            except (json.JSONDecodeError, KeyError):
-                analysis_text = ai_content[:800] if ai_content else None
-        if not analysis_text:
-            analysis_text = (
-                f"Based on your water records: {len(warnings)} field(s) need attention. "
-                + ("Schedule irrigation for fields with no recent water. " if any(w.get('type') == 'overdue' or w.get('type') == 'no_water' for w in warnings) else "")
-                + "Use the suggested next dates and durations below as a guide; adjust for soil type and weather."
-            )
-        for i, p in enumerate(per_field):
-            if not p.get("aiNote"):
-                p["aiNote"] = f"Next irrigation suggested on {p['suggestedNextDate']} for about {p['suggestedMinutes']} minutes."
-
-        return _json_response({
-            'warnings': warnings,
-            'analysis': analysis_text,
-            'perField': per_field,
-            'model': model_used,
-        })
+        fields = list(get_collection('fields').find(field_deletion.LIVE, analytics.FIELD_PROJECTION))
+        today = datetime.utcnow().date()
+        # Today's snapshot, recomputing only fields whose data changed (api/analytics.py)
+        values, recomputed, summary = analytics.load('water', fields, today)
+        rows = [values[f.get('id', '')] for f in fields if values.get(f.get('id', ''))]
+        per_field = [row['entry'] for row in rows]
+        warnings = [row['warning'] for row in rows if row['warning']]
+
+        if summary is None:
+            summary = analytics.summarize_water(per_field, today)
+            analytics.save_summary('water', today, fields, summary)
+            recomputed = set()
+        return _json_response(_water_analysis_payload(per_field, warnings, recomputed, summary))
     except Exception as e:
         logger.exception("water_analysis: critical failure")
         return _api_error("Failed to generate water analysis", detail=e)
@@ -455,6 +535,7 @@ def water_list(request):
         'notes': body.get('notes'),
     }
     col.insert_one(doc)
+    bump_data_version(doc['fieldId'])
     del doc['_id']
     return _json_response(doc, 201)
 
@@ -478,16 +559,18 @@ def water_detail(request, pk):
                 return _json_response({'error': 'Not found'}, 404)
             del doc['_id']
             return _json_response(doc)
-        result = col.find_one_and_update(
-            {'id': pk}, {'$set': update}, return_document=True
-        )
-        if not result:
+        # Read the pre-update doc so both the old and new field are invalidated
+        before = col.find_one_and_update({'id': pk}, {'$set': update}, {'_id': 0})
+        if not before:
             return _json_response({'error': 'Not found'}, 404)
-        del result['_id']
+        result = {**before, **update}
+        bump_data_version(before.get('fieldId'), result.get('fieldId'))
         return _json_response(result)
     if request.method == 'DELETE':
-        if col.delete_one({'id': pk}).deleted_count == 0:
+        doc = col.find_one_and_delete({'id': pk}, {'_id': 0, 'fieldId': 1})
+        if doc is None:
             return _json_response({'error': 'Not found'}, 404)
+        bump_data_version(doc.get('fieldId'))
         return _json_response({}, 204)
 
 
@@ -496,14 +579,16 @@ def water_detail(request, pk):
 @csrf_exempt
 @require_http_methods(["GET", "POST"])
 def temperature_list(request):
-    col = get_collection('temperature_records')
+    """GET all readings. POST one reading, or many (JSON array / NDJSON) as idempotent upserts."""
     if request.method == 'GET':
-        items = list(col.find({}, {'_id': 0}))
-        return _json_response(items)
+        return _json_response(temperature.list_readings())
+
+    rows = _parse_rows(request)
+    if rows is not None:
+        return _temperature_bulk(rows)
 
     body = _parse_body(request)
     doc = {
-        'id': body.get('id') or generate_id(),
         'fieldId': body.get('fieldId', ''),
         'date': body.get('date', ''),
         'temperatureC': body.get('temperatureC', 0),
@@ -511,9 +596,32 @@ def temperature_list(request):
         'maxTempC': body.get('maxTempC'),
         'notes': body.get('notes'),
     }
-    col.insert_one(doc)
-    del doc['_id']
-    return _json_response(doc, 201)
+    doc['id'] = body.get('id') or temperature.reading_id(doc['fieldId'], doc['date'])
+    # Same (fieldId, date) upsert as bulk imports: a reading for a stored day replaces it
+    result = temperature.upsert_readings([doc])
+    bump_data_version(doc['fieldId'])
+    return _json_response(doc, 200 if result['updated'] else 201)
+
+
+def _temperature_bulk(rows):
+    """Validate every row, upsert the valid ones keyed on (fieldId, date), report per-row errors."""
+    valid, errors = [], []
+    for n, row, error in rows:
+        if error is None:
+            try:
+                valid.append(temperature.validate_reading(row))
+                continue
+            except ValueError as e:
+                error = str(e)
+        errors.append({'row': n, 'error': error})
+    if not valid:
+        return _json_response({'received': len(rows), 'written': 0, 'errors': errors}, 400)
+    try:
+        result = temperature.upsert_readings(valid)
+    except Exception as e:
+        return _api_error('Failed to write temperature readings', 500, e)
+    bump_data_version(*{r['fieldId'] for r in valid})
+    return _json_response({'received': len(rows), **result, 'errors': errors})
 
 
 # --- AI Recommendations (computed) ---
@@ -521,47 +629,11 @@ def temperature_list(request):
 @csrf_exempt
 @require_http_methods(["GET"])
 def ai_recommendations(request):
-    fields_col = get_collection('fields')
-    expenses_col = get_collection('expenses')
-    incomes_col = get_collection('incomes')
-    fields = list(fields_col.find({}, {'_id': 0}))
-    expenses = list(expenses_col.find({}, {'_id': 0}))
-    incomes = list(incomes_col.find({}, {'_id': 0}))
-
-    recs = []
-    from datetime import datetime
-    now = datetime.utcnow().isoformat() + 'Z'
-
-    for f in fields:
-        fid = f.get('id', '')
-        if f.get('status') in ('available', 'uncultivated'):
-            has_income = any(i.get('fieldId') == fid for i in incomes)
-            if not has_income:
-                recs.append({
-                    'id': generate_id(),
-                    'type': 'suggestion',
-                    'title': 'Unused Land',
-                    'message': f'Field "{f.get("name")}" is unused. Consider leasing it on Thaka or cultivating.',
-                    'fieldId': fid,
-                    'priority': 'medium',
-                    'createdAt': now,
-                })
-
-    for f in fields:
-        fid = f.get('id', '')
-        field_exp = sum(e.get('amount', 0) for e in expenses if e.get('fieldId') == fid)
-        field_inc = sum(i.get('amount', 0) for i in incomes if i.get('fieldId') == fid)
-        if field_exp > 0 and field_inc < field_exp and field_exp > 1000:
-            recs.append({
-                'id': generate_id(),
-                'type': 'warning',
-                'title': 'Loss-Making Field',
-                'message': f'Field "{f.get("name")}" has high expense (Rs {field_exp}) but low income (Rs {field_inc}).',
-                'fieldId': fid,
-                'priority': 'high',
-                'createdAt': now,
-            })
-
+    fields = list(get_collection('fields').find(field_deletion.LIVE, analytics.FIELD_PROJECTION))
+    values, _, _ = analytics.load('ai_recommendations', fields, datetime.utcnow().date())
+    recs = [r for f in fields for r in values[f.get('id', '')]]
+    # Unused land first, then loss-making fields
+    recs.sort(key=lambda r: r['type'] != 'suggestion')
     return _json_response(recs[:20])
 
 
@@ -581,7 +653,7 @@ def _call_gemini_api(api_key, full_prompt):
     req = urllib.request.Request(url, data=json.dumps(payload).encode("utf-8"), method="POST")
     req.add_header("Content-Type", "application/json")
     try:
-        with urllib.request.urlopen(req, timeout=60) as resp:
+        with llm_timer(), urllib.request.urlopen(req, timeout=60) as resp:
             out = json.loads(resp.read().decode())
     except urllib.error.HTTPError as e:
         body = e.read().decode() if e.fp else ""
@@ -597,15 +669,25 @@ def _call_gemini_api(api_key, full_prompt):
     return text.strip()
 
 
-def _generate_built_in_insights():
-    """Generate summary and recommendations from your data — no API key needed."""
-    fields = list(get_collection('fields').find({}, {'_id': 0}))
-    expenses = list(get_collection('expenses').find({}, {'_id': 0}))
-    incomes = list(get_collection('incomes').find({}, {'_id': 0}))
-    water = list(get_collection('water_records').find({}, {'_id': 0}))
-    temp = list(get_collection('temperature_records').find({}, {'_id': 0}))
-    thaka = list(get_collection('thaka_records').find({}, {'_id': 0}))
-    daily = list(get_collection('daily_register').find({}, {'_id': 0}))
+def _farm_data():
+    """Live fields, their records and temperature rollups: everything the AI views summarize."""
+    fields = list(get_collection('fields').find(field_deletion.LIVE, {'_id': 0}))
+    return {
+        'fields': fields,
+        'expenses': list(get_collection('expenses').find({}, {'_id': 0})),
+        'incomes': list(get_collection('incomes').find({}, {'_id': 0})),
+        'water': list(get_collection('water_records').find({}, {'_id': 0})),
+        'temp': temperature.rollups_for([f.get('id') for f in fields]),
+        'thaka': list(get_collection('thaka_records').find({}, {'_id': 0})),
+        'daily': list(get_collection('daily_register').find({}, {'_id': 0})),
+    }
+
+
+def _generate_built_in_insights(data=None):
+    """Generate summary and recommendations from your data (_farm_data) — no API key needed."""
+    data = _farm_data() if data is None else data
+    fields, expenses, incomes, water, temp, thaka = (
+        data[k] for k in ('fields', 'expenses', 'incomes', 'water', 'temp', 'thaka'))
 
     total_exp = sum(e.get('amount', 0) for e in expenses)
     total_inc = sum(i.get('amount', 0) for i in incomes)
@@ -626,7 +708,7 @@ def _generate_built_in_insights():
     if active_thaka:
         parts.append(f"{active_thaka} active Thaka (lease) agreement(s).")
     if water:
-        parts.append(f"{len(water)} water record(s) and {len(temp)} temperature record(s) on file.")
+        parts.append(f"{len(water)} water record(s) on file; temperature readings for {len(temp)} field(s).")
     else:
         parts.append("Add water and temperature records for better insights.")
     summary = " ".join(parts)
@@ -712,18 +794,16 @@ def _generate_built_in_insights():
     return {"summary": summary, "recommendations": out_recs}
 
 
-def _build_ai_context():
-    """Build a concise text summary of all land/farm data for the LLM."""
-    fields = list(get_collection('fields').find({}, {'_id': 0}))
-    expenses = list(get_collection('expenses').find({}, {'_id': 0}))
-    incomes = list(get_collection('incomes').find({}, {'_id': 0}))
-    water = list(get_collection('water_records').find({}, {'_id': 0}))
-    temp = list(get_collection('temperature_records').find({}, {'_id': 0}))
-    thaka = list(get_collection('thaka_records').find({}, {'_id': 0}))
-    daily = list(get_collection('daily_register').find({}, {'_id': 0}))
+def _build_ai_context(data=None):
+    """Build a concise text summary of all land/farm data (_farm_data) for the LLM."""
+    data = _farm_data() if data is None else data
+    fields, expenses, incomes, water, temp, thaka, daily = (
+        data[k] for k in ('fields', 'expenses', 'incomes', 'water', 'temp', 'thaka', 'daily'))
 
     total_exp = sum(e.get('amount', 0) for e in expenses)
     total_inc = sum(i.get('amount', 0) for i in incomes)
+    week = [r['last7d'] for r in temp.values() if (r.get('last7d') or {}).get('count')]
+    week_count = sum(w['count'] for w in week)
     by_status = {}
     for f in fields:
         s = f.get('status', 'unknown')
@@ -743,7 +823,10 @@ def _build_ai_context():
         f"Records: {len(water)}. Recent: " + (f"{water[0].get('date')} ({water[0].get('durationMinutes')} min)" if water else "none"),
         "",
         "## Temperature",
-        f"Records: {len(temp)}. " + (f"Latest avg: {sum(t.get('temperatureC', 0) for t in temp[:10]) / min(10, len(temp)):.1f} °C" if temp else "No data"),
+        f"Fields with readings: {len(temp)}. " + (
+            f"Latest 7-day avg: {sum(w['mean'] * w['count'] for w in week) / week_count:.1f} °C "
+            f"(min {min(w['min'] for w in week)}, max {max(w['max'] for w in week)})" if week_count else "No data"
+        ),
         "",
         "## Thaka (leases)",
         f"Active: {len([t for t in thaka if t.get('status') == 'active'])}. Total records: {len(thaka)}.",
@@ -754,97 +837,34 @@ def _build_ai_context():
     return "\n".join(lines)
 
 
-@csrf_exempt
-@require_http_methods(["POST"])
-def ai_insights(request):
-    """Generate AI insights. Primary: Hugging Face (HF_TOKEN). Fallback: built-in rule-based."""
-    # Ensure .env is loaded (e.g. when run from project root)
-    from pathlib import Path
-    from dotenv import load_dotenv
-    _backend_dir = Path(__file__).resolve().parent.parent
-    load_dotenv(_backend_dir / ".env", override=True)
-
-    hf_token = os.environ.get("HF_TOKEN", "").strip() or os.environ.get("HUGGINGFACE_TOKEN", "").strip()
-
-    # No Hugging Face token: use built-in rule-based only
-    if not hf_token:
-        try:
-            result = _generate_built_in_insights()
-            return _json_response({
-                "summary": result["summary"],
-                "recommendations": result["recommendations"],
-                "model": "built-in",
-            })
-        except Exception as e:
-            return JsonResponse({"error": "Insights error", "detail": str(e)}, status=502)
-
-    context = _build_ai_context()
-    system_prompt = """You are an expert land and farm management advisor for Pakistan/ South Asia. You analyze the owner's land data and give concise, actionable insights. Respond only with valid JSON, no markdown or extra text. Use this exact structure:
+INSIGHTS_SYSTEM_PROMPT = """You are an expert land and farm management advisor for Pakistan/ South Asia. You analyze the owner's land data and give concise, actionable insights. Respond only with valid JSON, no markdown or extra text. Use this exact structure:
 {"summary": "2-4 sentence overall summary of the farm situation and main opportunities or risks.", "recommendations": [{"type": "warning"|"suggestion"|"insight", "title": "Short title", "message": "One or two sentence actionable message.", "priority": "high"|"medium"|"low", "fieldId": "optional field id if relevant"}]}
 - type: use "warning" for risks/losses, "suggestion" for actions (e.g. Thaka, irrigation), "insight" for observations.
 - Give 3-8 recommendations. Be specific (mention field names, amounts, dates when you know them)."""
-    user_prompt = f"Analyze this farm/land data and provide a JSON response with summary and recommendations:\n\n{context}"
-
-    content = None
-    model_used = None
-    last_hf_error = None
-
-    # 1. Hugging Face (OpenAI-compatible router; try primary model then fallbacks)
-    if content is None and hf_token:
-        # Try HF_MODEL, then common free Llama models
-        default_hf = os.environ.get("HF_MODEL", "meta-llama/Meta-Llama-3-8B-Instruct")
-        hf_models_to_try = [
-            default_hf,
-            "meta-llama/Llama-3.2-3B-Instruct",
-            "Qwen/Qwen2.5-72B-Instruct",
-            "mistralai/Mistral-Nemo-Instruct-2407",
-        ]
-        import urllib.request
-        seen = set()
-        for hf_model in hf_models_to_try:
-            if not hf_model or hf_model in seen:
-                continue
-            seen.add(hf_model)
-            try:
-                payload = {
-                    "model": hf_model,
-                    "messages": [
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": user_prompt}
-                    ],
-                    "temperature": 0.3
-                }
-                req = urllib.request.Request("https://router.huggingface.co/v1/chat/completions", data=json.dumps(payload).encode("utf-8"), method="POST")
-                req.add_header("Authorization", f"Bearer {hf_token}")
-                req.add_header("Content-Type", "application/json")
-                with urllib.request.urlopen(req, timeout=10) as resp:
-                    resp_data = json.loads(resp.read().decode())
-                content = (resp_data.get("choices", [{}])[0].get("message", {}).get("content", "")).strip()
-                if content:
-                    model_used = hf_model
-                    break
-            except Exception as _hf_err:
-                last_hf_error = _hf_err
-                logger.warning("HF API failed (ai_insights) model=%s: %s", hf_model, _hf_err)
-                if os.environ.get("DEBUG", "").lower() in ("true", "1"):
-                    logger.exception("HF full traceback")
-                content = None
+CHAT_SYSTEM_PROMPT = """You are a helpful land and farm management assistant for Pakistan and South Asia. Use the following data about the user's land when answering. Be concise and friendly. If the user asks about something not in the data, say so politely and suggest they add it. Answer in the same language the user uses (e.g. English or Urdu)."""
+
+
+def _insights_prompt(context):
+    return f"Analyze this farm/land data and provide a JSON response with summary and recommendations:\n\n{context}"
+
+
+def _built_in_insights_response(model, data=None, debug_error=None):
+    try:
+        result = _generate_built_in_insights(data)
+    except Exception as e:
+        return JsonResponse({"error": "Insights error", "detail": str(e)}, status=502)
+    payload = {
+        "summary": result["summary"],
+        "recommendations": result["recommendations"],
+        "model": model,
+    }
+    if os.environ.get("DEBUG", "").lower() in ("true", "1") and debug_error:
+        payload["debug_hf_error"] = debug_error
+    return _json_response(payload)
 
-    # If Hugging Face failed or unavailable, use built-in so you always get insights
-    if not content:
-        try:
-            result = _generate_built_in_insights()
-            payload = {
-                "summary": result["summary"],
-                "recommendations": result["recommendations"],
-                "model": "built-in (API quota exceeded or unavailable)",
-            }
-            if os.environ.get("DEBUG", "").lower() in ("true", "1") and last_hf_error is not None:
-                payload["debug_hf_error"] = str(last_hf_error)
-            return _json_response(payload)
-        except Exception as e:
-            return JsonResponse({"error": "Insights error", "detail": str(e)}, status=502)
 
+def _insights_response(content, model_used):
+    """Response for an LLM reply to INSIGHTS_SYSTEM_PROMPT."""
     try:
         if content.startswith("```"):
             content = re.sub(r"^```(?:json)?\s*", "", content)
@@ -869,67 +889,30 @@ def ai_insights(request):
         return JsonResponse({"error": "Invalid AI response", "detail": str(e)}, status=502)
 
 
-def _call_ai_chat(system_prompt: str, user_content: str) -> tuple[str | None, str, str | None]:
-    """Primary: Hugging Face. Fallback: None (caller uses built-in or 503). Returns (reply_text, model_name, debug_error)."""
-    from pathlib import Path
-    from dotenv import load_dotenv
-    _backend_dir = Path(__file__).resolve().parent.parent
-    load_dotenv(_backend_dir / ".env", override=True)
-
-    hf_token = os.environ.get("HF_TOKEN", "").strip() or os.environ.get("HUGGINGFACE_TOKEN", "").strip()
-    last_hf_error = None
-
-    # Hugging Face (primary) – try configured model then fallback models
-    if hf_token:
-        default_hf = os.environ.get("HF_MODEL", "meta-llama/Meta-Llama-3-8B-Instruct")
-        hf_candidates = [default_hf, "meta-llama/Llama-3.2-3B-Instruct", "Qwen/Qwen2.5-72B-Instruct", "mistralai/Mistral-Nemo-Instruct-2407"]
-        import urllib.request
-        seen_hf = set()
-        for hf_model in hf_candidates:
-            if not hf_model or hf_model in seen_hf:
-                continue
-            seen_hf.add(hf_model)
-            try:
-                payload = {
-                    "model": hf_model,
-                    "messages": [
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": user_content}
-                    ],
-                    "temperature": 0.4
-                }
-                req = urllib.request.Request("https://router.huggingface.co/v1/chat/completions", data=json.dumps(payload).encode("utf-8"), method="POST")
-                req.add_header("Authorization", f"Bearer {hf_token}")
-                req.add_header("Content-Type", "application/json")
-                with urllib.request.urlopen(req, timeout=10) as resp:
-                    resp_data = json.loads(resp.read().decode())
-                text = (resp_data.get("choices", [{}])[0].get("message", {}).get("content", "")).strip()
-                if text:
-                    return (text, hf_model, None)
-            except Exception as _hf_err:
-                last_hf_error = _hf_err
-                logger.warning("HF API failed (_call_ai_chat) model=%s: %s", hf_model, _hf_err)
-                if os.environ.get("DEBUG", "").lower() in ("true", "1"):
-                    logger.exception("HF full traceback")
-
-    # No Gemini/OpenAI: fallback is built-in (handled by caller) or 503 for chat
-    return (None, "", str(last_hf_error) if last_hf_error else None)
-
-
 @csrf_exempt
 @require_http_methods(["POST"])
-def ai_chat(request):
-    """Chat with Hugging Face (primary); uses land data as context. Fallback: built-in message."""
-    body = _parse_body(request)
-    message = (body.get("message") or "").strip()
-    if not message:
-        return JsonResponse({"error": "Missing message", "reply": ""}, status=400)
+def ai_insights(request):
+    """Generate AI insights. Primary: Hugging Face (HF_TOKEN). Fallback: built-in rule-based."""
+    hf_token, _ = llm.hf_config()
 
-    context = _build_ai_context()
-    system_prompt = """You are a helpful land and farm management assistant for Pakistan and South Asia. Use the following data about the user's land when answering. Be concise and friendly. If the user asks about something not in the data, say so politely and suggest they add it. Answer in the same language the user uses (e.g. English or Urdu)."""
-    user_content = f"Land data:\n{context}\n\nUser question: {message}"
+    # No Hugging Face token: use built-in rule-based only
+    if not hf_token:
+        return _built_in_insights_response("built-in")
 
-    reply, model_used, debug_error = _call_ai_chat(system_prompt, user_content)
+    data = _farm_data()
+    content, model_used, debug_error = llm.chat(INSIGHTS_SYSTEM_PROMPT, _insights_prompt(_build_ai_context(data)),
+                                                  temperature=0.3)
+    # If Hugging Face failed or unavailable, use built-in so you always get insights
+    if not content:
+        return _built_in_insights_response("built-in (API quota exceeded or unavailable)", data, debug_error)
+    return _insights_response(content, model_used)
+
+
+def _chat_prompt(message, context):
+    return f"Land data:\n{context}\n\nUser question: {message}"
+
+
+def _chat_response(reply, model_used, debug_error):
     if reply:
         return _json_response({"reply": reply, "model": model_used})
     body = {
@@ -941,8 +924,78 @@ def ai_chat(request):
     return JsonResponse(body, status=503)
 
 
+@csrf_exempt
+@require_http_methods(["POST"])
+def ai_chat(request):
+    """Chat with Hugging Face (primary); uses land data as context. Fallback: built-in message."""
+    body = _parse_body(request)
+    message = (body.get("message") or "").strip()
+    if not message:
+        return JsonResponse({"error": "Missing message", "reply": ""}, status=400)
+
+    context = _build_ai_context()
+    return _chat_response(*llm.chat(CHAT_SYSTEM_PROMPT, _chat_prompt(message, context)))
+
+
 # --- Dashboard / All Data ---
 
+DASHBOARD_LEGACY = ("expenses", "incomes", "water_records")
+
+
+def _dashboard_payload(fields, activities, thaka, temp, legacy):
+    """Dashboard response; `legacy` holds the old expenses, incomes and water_records lists."""
+    # Shim for transition: map old structures to activities so things don't immediately crash if partially updated
+    expenses_shim = [{
+        "id": a.get("id"),
+        "amount": a.get("cost", 0),
+        "fieldId": a.get("field_id"),
+        "date": a.get("date"),
+        "category": a.get("activity_type", "other"),
+        "description": a.get("notes", "")
+    } for a in activities if a.get("cost", 0) > 0]
+
+    incomes_shim = [{
+        "id": a.get("id"),
+        "amount": a.get("income", 0),
+        "fieldId": a.get("field_id"),
+        "date": a.get("date"),
+        "type": a.get("activity_type", "crop"),
+        "description": a.get("notes", "")
+    } for a in activities if a.get("income", 0) > 0]
+
+    # Unified water: irrigation activities
+    water_shim = [{"id": a.get("id"), "durationMinutes": a.get("quantity_used", 0), "fieldId": a.get("field_id"), "date": a.get("date"), "notes": a.get("notes")} for a in activities if a.get("activity_type") == "irrigation"]
+
+    # Merge in legacy records whose id is not already there
+    for shim, docs, shape in (
+        (expenses_shim, legacy.get("expenses", []), None),
+        (incomes_shim, legacy.get("incomes", []), None),
+        (water_shim, legacy.get("water_records", []), lambda lw: {
+            "id": lw.get("id"),
+            "durationMinutes": lw.get("durationMinutes", 0),
+            "fieldId": lw.get("fieldId"),
+            "date": lw.get("date"),
+            "notes": lw.get("notes")
+        }),
+    ):
+        seen = {row["id"] for row in shim}
+        for doc in docs:
+            if doc.get("id") not in seen:
+                shim.append(shape(doc) if shape else doc)
+                seen.add(doc.get("id"))
+
+    return {
+        "fields": fields,
+        "activities": activities,
+        "thakaRecords": thaka,
+        "temperatureRecords": temp,
+        # Legacy shims (can be removed once frontend fully refactored)
+        "expenses": expenses_shim,
+        "incomes": incomes_shim,
+        "waterRecords": water_shim,
+    }
+
+
 @csrf_exempt
 @require_http_methods(["GET"])
 def dashboard(request):
@@ -952,72 +1005,23 @@ def dashboard(request):
         return _api_error("Authentication required", status=401)
 
     try:
-        fields = list(get_collection("fields").find({}, {"_id": 0}))
+        zoom = lod.parse_zoom(request.GET.get("zoom"))
+    except ValueError as e:
+        return _api_error("Invalid zoom", status=400, detail=e)
+
+    try:
+        fields = _fields_at_zoom(zoom)
         activities = list(get_collection("activities").find({}, {"_id": 0}))
         thaka = list(get_collection("thaka_records").find({}, {"_id": 0}))
-        temp = list(get_collection("temperature_records").find({}, {"_id": 0}))
-        
-        # Shim for transition: map old structures to activities so things don't immediately crash if partially updated
-        expenses_shim = [{
-            "id": a.get("id"), 
-            "amount": a.get("cost", 0), 
-            "fieldId": a.get("field_id"), 
-            "date": a.get("date"),
-            "category": a.get("activity_type", "other"),
-            "description": a.get("notes", "")
-        } for a in activities if a.get("cost", 0) > 0]
-        
-        incomes_shim = [{
-            "id": a.get("id"), 
-            "amount": a.get("income", 0), 
-            "fieldId": a.get("field_id"), 
-            "date": a.get("date"),
-            "type": a.get("activity_type", "crop"),
-            "description": a.get("notes", "")
-        } for a in activities if a.get("income", 0) > 0]
-
-        # Merge in legacy collections if they exist
-        try:
-            legacy_exp = list(get_collection("expenses").find({}, {"_id": 0}))
-            for le in legacy_exp:
-                if not any(e["id"] == le.get("id") for e in expenses_shim):
-                    expenses_shim.append(le)
-        except: pass
-
-        try:
-            legacy_inc = list(get_collection("incomes").find({}, {"_id": 0}))
-            for li in legacy_inc:
-                if not any(i["id"] == li.get("id") for i in incomes_shim):
-                    incomes_shim.append(li)
-        except: pass
-        
-        # Unified water: irrigation activities
-        water_shim = [{"id": a.get("id"), "durationMinutes": a.get("quantity_used", 0), "fieldId": a.get("field_id"), "date": a.get("date"), "notes": a.get("notes")} for a in activities if a.get("activity_type") == "irrigation"]
-        
-        # Fallback: legacy water_records collection
-        try:
-            legacy_water = list(get_collection("water_records").find({}, {"_id": 0}))
-            for lw in legacy_water:
-                if not any(w["id"] == lw.get("id") for w in water_shim):
-                    water_shim.append({
-                        "id": lw.get("id"),
-                        "durationMinutes": lw.get("durationMinutes", 0),
-                        "fieldId": lw.get("fieldId"),
-                        "date": lw.get("date"),
-                        "notes": lw.get("notes")
-                    })
-        except: pass
-
-        return _json_response({
-            "fields": fields,
-            "activities": activities,
-            "thakaRecords": thaka,
-            "temperatureRecords": temp,
-            # Legacy shims (can be removed once frontend fully refactored)
-            "expenses": expenses_shim,
-            "incomes": incomes_shim,
-            "waterRecords": water_shim,
-        })
+        temp = temperature.list_readings()
+        legacy = {}
+        # Legacy collections, if they exist
+        for name in DASHBOARD_LEGACY:
+            try:
+                legacy[name] = list(get_collection(name).find({}, {"_id": 0}))
+            except Exception:
+                legacy[name] = []
+        return _json_response(_dashboard_payload(fields, activities, thaka, temp, legacy))
     except Exception as e:
         logger.exception("dashboard: failed to load data")
         return _api_error("Failed to load dashboard data", status=500, detail=e)
@@ -1025,228 +1029,257 @@ def dashboard(request):
 
 # --- ML Predict (production: real data + optional AI) ---
 
-def _get_field_context(field_id):
-    """Return field plus its water, temperature, expenses, incomes for prediction logic."""
-    fields_col = get_collection('fields')
-    field = fields_col.find_one({'id': field_id}, {'_id': 0}) if field_id else None
+def _get_field_context(field_id, field=None):
+    """Return field plus its water, temperature rollup (api/temperature.py), expenses, incomes for prediction logic."""
+    if field is None and field_id:
+        field = get_collection('fields').find_one(field_deletion.live({'id': field_id}), {'_id': 0})
     if not field_id:
         return None, [], [], [], []
     water = list(get_collection('water_records').find({'fieldId': field_id}, {'_id': 0}))
-    temp = list(get_collection('temperature_records').find({'fieldId': field_id}, {'_id': 0}))
+    temp = temperature.rollup_for(field_id)
     expenses = list(get_collection('expenses').find({'fieldId': field_id}, {'_id': 0}))
     incomes = list(get_collection('incomes').find({'fieldId': field_id}, {'_id': 0}))
     # Sort by date descending for "recent"
-    for lst, key in [(water, 'date'), (temp, 'date')]:
-        try:
-            lst.sort(key=lambda x: x.get(key) or '', reverse=True)
-        except Exception:
-            pass
+    try:
+        water.sort(key=lambda x: x.get('date') or '', reverse=True)
+    except Exception:
+        pass
     return field, water, temp, expenses, incomes
 
 
-def _prediction_ai_summary(field_id, field_name, context_payload):
-    """Optional: get 2–3 sentence AI summary for prediction context. Returns (text, model) or (None, '')."""
+def _prediction_ai_prompt(field_id, field_name, context_payload):
     system = "You are a land management advisor for Pakistan/South Asia. In 2-3 short sentences, summarize the prediction outlook for this field and give one actionable recommendation. Be concise; no bullet lists."
     user = f"Field: {field_name or field_id}. Context: {context_payload}"
-    text, model, _ = _call_ai_chat(system, user)
+    return system, user
+
+
+def _prediction_ai_summary(field_id, field_name, context_payload):
+    """Optional: get 2–3 sentence AI summary for prediction context. Returns (text, model) or (None, '')."""
+    text, model, _ = llm.chat(*_prediction_ai_prompt(field_id, field_name, context_payload))
     return (text, model)
 
 
 @csrf_exempt
 @require_http_methods(["POST"])
 def predict(request):
-    import random
-    from datetime import datetime, timedelta
-
+    """Field predictions. Deterministic per field and day; memoized until the field's data changes."""
     try:
         body = _parse_body(request)
         pred_type = body.get('type')
         field_id = (body.get('fieldId') or '').strip()
         data = body.get('data', {}) or {}
         include_ai = body.get('includeAiSummary', False)
-
-        field, water, temp, expenses, incomes = _get_field_context(field_id)
-        field_name = (field.get('name') or 'Field') if field else 'Field'
-        status = (field.get('status') or data.get('status') or 'available') if field else data.get('status') or 'available'
-        area = _to_num(field.get('area') or data.get('area') or 1) if field else _to_num(data.get('area') or 1)
-
-        # --- crop_health: use water + temp + status for score ---
-        if pred_type == 'crop_health':
-            base = 70 if status == 'cultivated' else 45 if status in ('available', 'uncultivated') else 25
-            # Recent irrigation: last 14 days water boosts health
-            recent_water_mins = 0
-            if water:
-                try:
-                    cutoff = (datetime.utcnow() - timedelta(days=14)).strftime('%Y-%m-%d')
-                    recent_water_mins = sum(w.get('durationMinutes', 0) for w in water if (w.get('date') or '') >= cutoff)
-                except Exception:
-                    recent_water_mins = sum(w.get('durationMinutes', 0) for w in water[:5])
-            water_bonus = min(15, recent_water_mins // 30)  # up to +15 for regular irrigation
-            # Temperature: moderate temps better
-            temp_bonus = 0
-            if temp:
-                avg_temp = sum(t.get('temperatureC', 0) for t in temp[:10]) / min(10, len(temp))
-                if 18 <= avg_temp <= 32:
-                    temp_bonus = 8
-                elif 15 <= avg_temp <= 35:
-                    temp_bonus = 4
-            health = min(100, base + water_bonus + temp_bonus + round(random.random() * 10))
-            ndvi = round(0.35 + (health / 100) * 0.45 + random.random() * 0.05, 2)
-            ndvi = min(0.85, ndvi)
-            if health < 50:
-                rec = 'Schedule irrigation soon and check soil moisture.'
-            elif health > 85:
-                rec = 'Optimal. Maintain current irrigation and monitor for pests.'
-            else:
-                rec = 'Monitor growth; consider light irrigation if soil is dry.'
-            factors_used = []
-            if water:
-                factors_used.append(f"{len(water)} water record(s)")
-            if temp:
-                factors_used.append(f"{len(temp)} temperature record(s)")
-            factors_used.append(f"status={status}")
-            out = {
-                'fieldId': field_id,
-                'healthScore': health,
-                'ndvi': ndvi,
-                'recommendation': rec,
-                'factorsUsed': factors_used,
-            }
-            if include_ai:
-                ctx = f"Health score {health}, NDVI {ndvi}. Recommendation: {rec}. Water records: {len(water)}; temp records: {len(temp)}."
-                ai_text, model = _prediction_ai_summary(field_id, field_name, ctx)
-                if ai_text:
-                    out['aiSummary'] = ai_text
-                    out['aiModel'] = model
-            return _json_response(out)
-
-        # --- yield_prediction: area × historical yield with data-driven adjustment ---
-        if pred_type == 'yield_prediction':
-            hist_yield = _to_num(data.get('historicalYield') or 500)
-            # If we have income for this field, rough inverse: income/price ≈ yield (kg) for planning
-            if incomes and field_id:
-                total_income = sum(i.get('amount', 0) for i in incomes)
-                if total_income > 0 and area > 0:
-                    # Assume Rs 80–120/kg range; use as soft prior
-                    implied_yield = total_income / 100
-                    hist_yield = (hist_yield * 0.6 + (implied_yield / max(0.01, area)) * 0.4)
-            yield_per_acre = max(100, hist_yield)
-            pred_kg = round(area * yield_per_acre * (0.88 + random.random() * 0.18))
-            confidence = 0.72 + random.random() * 0.2
-            if water and temp:
-                confidence = min(0.95, confidence + 0.08)
-            factors_used = [f"area={area} ac", f"historicalYield≈{round(yield_per_acre)} kg/ac"]
-            if incomes:
-                factors_used.append("income history used")
-            out = {
-                'fieldId': field_id,
-                'predictedYieldKg': pred_kg,
-                'confidence': round(confidence, 2),
-                'factorsUsed': factors_used,
-            }
-            if include_ai:
-                ctx = f"Field {field_name}: {area} acres, predicted yield {pred_kg} kg (confidence {confidence:.0%})."
-                ai_text, model = _prediction_ai_summary(field_id, field_name, ctx)
-                if ai_text:
-                    out['aiSummary'] = ai_text
-                    out['aiModel'] = model
-            return _json_response(out)
-
-        # --- price_prediction: crop base + optional AI ---
-        if pred_type == 'price_prediction':
-            crop = (data.get('cropType') or 'wheat').lower()
-            base_prices = {'wheat': 80, 'rice': 120, 'cotton': 200, 'sugarcane': 8, 'maize': 60}
-            base = base_prices.get(crop, 80)
-            pred = round(base * (0.88 + random.random() * 0.28), 2)
-            confidence = round(0.72 + random.random() * 0.22, 2)
-            factors_used = [f"cropType={crop}", "local market baseline (Rs/kg)"]
-            out = {
-                'fieldId': field_id,
-                'cropType': crop,
-                'predictedPricePerKg': pred,
-                'confidence': confidence,
-                'factorsUsed': factors_used,
-            }
-            if include_ai:
-                ctx = f"Crop: {crop}. Predicted price Rs {pred}/kg. Use for planning; harvest-time prices may vary."
-                ai_text, model = _prediction_ai_summary(field_id, field_name, ctx)
-                if ai_text:
-                    out['aiSummary'] = ai_text
-                    out['aiModel'] = model
-            return _json_response(out)
-
-        # --- water_forecast: last irrigation + temp → next date and minutes ---
-        if pred_type == 'water_forecast':
-            base_mins = 40
-            days_ahead = 7
-            if water:
-                last = water[0]
-                last_date_s = last.get('date') or ''
-                last_mins = last.get('durationMinutes', 30)
-                base_mins = max(25, min(90, last_mins + round(random.random() * 20 - 5)))
-                try:
-                    if last_date_s:
-                        last_d = datetime.strptime(last_date_s[:10], '%Y-%m-%d')
-                        days_ahead = max(4, min(10, 5 + (35 - (datetime.utcnow() - last_d.replace(tzinfo=None)).days) // 5))
-                except Exception:
-                    pass
-            if temp:
-                avg_t = sum(t.get('temperatureC', 0) for t in temp[:7]) / min(7, len(temp))
-                if avg_t > 32:
-                    base_mins = min(90, base_mins + 10)
-                    days_ahead = max(4, days_ahead - 1)
-                elif avg_t < 20:
-                    days_ahead = min(10, days_ahead + 1)
-            next_d = (datetime.utcnow() + timedelta(days=days_ahead)).strftime('%Y-%m-%d')
-            suggested_mins = round(base_mins + random.random() * 10)
-            factors_used = []
-            if water:
-                factors_used.append(f"last irrigation: {water[0].get('date', '')} ({water[0].get('durationMinutes', 0)} min)")
-            if temp:
-                factors_used.append(f"{len(temp)} temperature record(s)")
-            factors_used.append("seasonal baseline")
-            out = {
-                'fieldId': field_id,
-                'suggestedIrrigationMinutes': suggested_mins,
-                'nextRecommendedDate': next_d,
-                'factorsUsed': factors_used,
-            }
-            if include_ai:
-                ctx = f"Next irrigation: {next_d}, {suggested_mins} minutes. {', '.join(factors_used)}."
-                ai_text, model = _prediction_ai_summary(field_id, field_name, ctx)
-                if ai_text:
-                    out['aiSummary'] = ai_text
-                    out['aiModel'] = model
-            return _json_response(out)
-
-        # --- prediction_ai_summary: standalone AI summary for field ---
-        if pred_type == 'prediction_ai_summary':
-            if not field_id:
-                return _json_response({'error': 'fieldId required'}, 400)
-            context_parts = [f"Field: {field_name}, area: {area} acres, status: {status}."]
-            if water:
-                context_parts.append(f"Water records: {len(water)}; last: {water[0].get('date', '')}.")
-            if temp:
-                context_parts.append(f"Temperature records: {len(temp)}.")
-            if expenses:
-                context_parts.append(f"Expenses: {len(expenses)}.")
-            if incomes:
-                context_parts.append(f"Incomes: {len(incomes)}.")
-            ctx = " ".join(context_parts)
-            ai_text, model = _prediction_ai_summary(field_id, field_name, ctx)
-            if ai_text:
-                return _json_response({'fieldId': field_id, 'aiSummary': ai_text, 'model': model})
-            return _json_response({
-                'fieldId': field_id,
-                'aiSummary': 'AI summary is not available. Add GEMINI_API_KEY or OPENAI_API_KEY in backend .env for AI-powered summaries.',
-                'model': 'built-in',
-            })
-
-        return _json_response({'error': 'Unknown prediction type'}, 400)
+        today = datetime.utcnow().strftime('%Y-%m-%d')
+
+        field = get_collection('fields').find_one(field_deletion.live({'id': field_id}), {'_id': 0}) if field_id else None
+        key = prediction_key(field_id, field, pred_type, data, include_ai, today)
+        cached = prediction_cache.get(key)
+        if cached is not None:
+            return _json_response(cached)
+
+        out, status, cacheable = _run_prediction(pred_type, field_id, field, data, include_ai, today)
+        if cacheable:
+            prediction_cache.set(key, out)
+        return _json_response(out, status)
     except Exception as e:
         return _json_response({'error': str(e)}, 500)
 
 
+def _run_prediction(pred_type, field_id, field, data, include_ai, today):
+    """Compute one prediction. Returns (payload, status, cacheable).
+
+    Not cacheable: errors, and answers where the wanted AI summary could not be fetched, so an
+    LLM outage is not served from the cache for the rest of the day.
+    """
+    context = _get_field_context(field_id, field)
+    out, status, ai_request = _prediction(pred_type, field_id, context, data, include_ai, today)
+    ai_text = None
+    if ai_request:
+        ai_text, model = _prediction_ai_summary(field_id, *ai_request)
+        out, status = _with_ai_summary(pred_type, field_id, out, status, ai_text, model)
+    return out, status, status == 200 and (not ai_request or bool(ai_text))
+
+
+def _with_ai_summary(pred_type, field_id, out, status, ai_text, model):
+    if pred_type == 'prediction_ai_summary':
+        if ai_text:
+            return {'fieldId': field_id, 'aiSummary': ai_text, 'model': model}, 200
+        return {
+            'fieldId': field_id,
+            'aiSummary': 'AI summary is not available. Add GEMINI_API_KEY or OPENAI_API_KEY in backend .env for AI-powered summaries.',
+            'model': 'built-in',
+        }, 200
+    if ai_text:
+        out['aiSummary'] = ai_text
+        out['aiModel'] = model
+    return out, status
+
+
+def _prediction(pred_type, field_id, context, data, include_ai, today):
+    """Prediction from the field's context (_get_field_context), without the AI summary.
+
+    Returns (payload, status, ai_request): ai_request is (field name, prompt context) when an
+    AI summary is wanted, to be fetched and merged in with _with_ai_summary.
+    """
+    from datetime import timedelta
+
+    field, water, temp, expenses, incomes = context
+    field_name = (field.get('name') or 'Field') if field else 'Field'
+    status = (field.get('status') or data.get('status') or 'available') if field else data.get('status') or 'available'
+    area = _to_num(field.get('area') or data.get('area') or 1) if field else _to_num(data.get('area') or 1)
+
+    # --- crop_health: use water + temp + status for score ---
+    if pred_type == 'crop_health':
+        base = 70 if status == 'cultivated' else 45 if status in ('available', 'uncultivated') else 25
+        # Recent irrigation: last 14 days water boosts health
+        recent_water_mins = 0
+        if water:
+            try:
+                cutoff = (datetime.utcnow() - timedelta(days=14)).strftime('%Y-%m-%d')
+                recent_water_mins = sum(w.get('durationMinutes', 0) for w in water if (w.get('date') or '') >= cutoff)
+            except Exception:
+                recent_water_mins = sum(w.get('durationMinutes', 0) for w in water[:5])
+        water_bonus = min(15, recent_water_mins // 30)  # up to +15 for regular irrigation
+        # Temperature: moderate temps better
+        temp_bonus = 0
+        avg_temp = temperature.window_mean(temp, 14)
+        if avg_temp is not None:
+            if 18 <= avg_temp <= 32:
+                temp_bonus = 8
+            elif 15 <= avg_temp <= 35:
+                temp_bonus = 4
+        health = min(100, base + water_bonus + temp_bonus + round(stable_jitter(field_id, today, 'health') * 10))
+        # Measured vegetation index (python manage.py compute_ndvi); weighs more than the records
+        satellite = ndvi.latest(field_id) if field_id else None
+        ndvi_value = satellite['mean'] if satellite else None
+        if satellite:
+            ndvi_health = min(1.0, max(0.0, (ndvi_value - 0.1) / 0.7)) * 100
+            health = round(0.6 * ndvi_health + 0.4 * health)
+        if health < 50:
+            rec = 'Schedule irrigation soon and check soil moisture.'
+        elif health > 85:
+            rec = 'Optimal. Maintain current irrigation and monitor for pests.'
+        else:
+            rec = 'Monitor growth; consider light irrigation if soil is dry.'
+        factors_used = []
+        if water:
+            factors_used.append(f"{len(water)} water record(s)")
+        if avg_temp is not None:
+            factors_used.append(f"14-day mean {avg_temp} °C to {temp['lastDate']}")
+        factors_used.append(f"status={status}")
+        if satellite:
+            factors_used.append(f"NDVI {ndvi_value} ({satellite.get('date')}, {satellite.get('pixelCount')} px)")
+        out = {
+            'fieldId': field_id,
+            'healthScore': health,
+            'ndvi': ndvi_value,
+            'ndviStats': satellite,
+            'recommendation': rec,
+            'factorsUsed': factors_used,
+        }
+        if include_ai:
+            ndvi_text = f"NDVI {ndvi_value} on {satellite.get('date')}" if satellite else "no NDVI imagery"
+            ctx = f"Health score {health}, {ndvi_text}. Recommendation: {rec}. Water records: {len(water)}; 14-day mean temperature: {'n/a' if avg_temp is None else f'{avg_temp} °C'}."
+            return out, 200, (field_name, ctx)
+        return out, 200, None
+
+    # --- yield_prediction: area × historical yield with data-driven adjustment ---
+    if pred_type == 'yield_prediction':
+        hist_yield = _to_num(data.get('historicalYield') or 500)
+        # If we have income for this field, rough inverse: income/price ≈ yield (kg) for planning
+        if incomes and field_id:
+            total_income = sum(i.get('amount', 0) for i in incomes)
+            if total_income > 0 and area > 0:
+                # Assume Rs 80–120/kg range; use as soft prior
+                implied_yield = total_income / 100
+                hist_yield = (hist_yield * 0.6 + (implied_yield / max(0.01, area)) * 0.4)
+        yield_per_acre = max(100, hist_yield)
+        pred_kg = round(area * yield_per_acre * (0.88 + stable_jitter(field_id, today, 'yield') * 0.18))
+        confidence = 0.72 + stable_jitter(field_id, today, 'yield_confidence') * 0.2
+        if water and temp:
+            confidence = min(0.95, confidence + 0.08)
+        factors_used = [f"area={area} ac", f"historicalYield≈{round(yield_per_acre)} kg/ac"]
+        if incomes:
+            factors_used.append("income history used")
+        out = {
+            'fieldId': field_id,
+            'predictedYieldKg': pred_kg,
+            'confidence': round(confidence, 2),
+            'factorsUsed': factors_used,
+        }
+        if include_ai:
+            ctx = f"Field {field_name}: {area} acres, predicted yield {pred_kg} kg (confidence {confidence:.0%})."
+            return out, 200, (field_name, ctx)
+        return out, 200, None
+
+    # --- price_prediction: crop base + optional AI ---
+    if pred_type == 'price_prediction':
+        crop = (data.get('cropType') or 'wheat').lower()
+        base_prices = {'wheat': 80, 'rice': 120, 'cotton': 200, 'sugarcane': 8, 'maize': 60}
+        base = base_prices.get(crop, 80)
+        pred = round(base * (0.88 + stable_jitter(field_id, today, crop, 'price') * 0.28), 2)
+        confidence = round(0.72 + stable_jitter(field_id, today, crop, 'price_confidence') * 0.22, 2)
+        factors_used = [f"cropType={crop}", "local market baseline (Rs/kg)"]
+        out = {
+            'fieldId': field_id,
+            'cropType': crop,
+            'predictedPricePerKg': pred,
+            'confidence': confidence,
+            'factorsUsed': factors_used,
+        }
+        if include_ai:
+            ctx = f"Crop: {crop}. Predicted price Rs {pred}/kg. Use for planning; harvest-time prices may vary."
+            return out, 200, (field_name, ctx)
+        return out, 200, None
+
+    # --- water_forecast: soil water balance (api/irrigation.py), same engine as water/analysis ---
+    if pred_type == 'water_forecast':
+        plan_field = field or {'id': field_id or '', 'status': status, 'area': area}
+        plans = irrigation.schedule([plan_field], datetime.strptime(today, '%Y-%m-%d').date(),
+                                    rollups={plan_field.get('id', ''): temp} if temp else {})
+        plan = plans[plan_field.get('id', '')]
+        suggested_mins = plan['suggestedMinutes']
+        next_d = plan['suggestedNextDate']
+        factors_used = []
+        if plan['lastWaterDate']:
+            factors_used.append(f"last irrigation: {plan['lastWaterDate']} ({plan['lastDurationMinutes']} min)")
+        avg_t = temperature.window_mean(temp, 7)
+        if avg_t is not None:
+            factors_used.append(f"7-day mean {avg_t} °C to {temp['lastDate']}")
+        factors_used.append(f"crop ET {plan['etcMmPerDay']} mm/day, soil deficit {plan['depletionMm']} mm")
+        out = {
+            'fieldId': field_id,
+            'suggestedIrrigationMinutes': suggested_mins,
+            'nextRecommendedDate': next_d,
+            'factorsUsed': factors_used,
+        }
+        if include_ai:
+            ctx = f"Next irrigation: {next_d}, {suggested_mins} minutes. {', '.join(factors_used)}."
+            return out, 200, (field_name, ctx)
+        return out, 200, None
+
+    # --- prediction_ai_summary: standalone AI summary for field ---
+    if pred_type == 'prediction_ai_summary':
+        if not field_id:
+            return {'error': 'fieldId required'}, 400, None
+        context_parts = [f"Field: {field_name}, area: {area} acres, status: {status}."]
+        if water:
+            context_parts.append(f"Water records: {len(water)}; last: {water[0].get('date', '')}.")
+        if temp:
+            month = temp.get('last30d') or {}
+            context_parts.append(
+                f"Temperature: 7-day mean {temperature.window_mean(temp, 7)} °C, 30-day range "
+                f"{month.get('min')}–{month.get('max')} °C over {month.get('count', 0)} reading(s) to {temp.get('lastDate')}."
+            )
+        if expenses:
+            context_parts.append(f"Expenses: {len(expenses)}.")
+        if incomes:
+            context_parts.append(f"Incomes: {len(incomes)}.")
+        return {'fieldId': field_id}, 200, (field_name, " ".join(context_parts))
+
+    return {'error': 'Unknown prediction type'}, 400, None
+
+
 # --- Materials (supply chain) ---
 
 @csrf_exempt
@@ -1259,20 +1292,22 @@ def materials_list(request):
 
     body = _parse_body(request)
     # Accept both old (currentStock) and new (stock_quantity) field names
-    stock = body.get('stock_quantity') if body.get('stock_quantity') is not None else body.get('currentStock', 0)
+    qty = body.get('stock_quantity') if body.get('stock_quantity') is not None else body.get('currentStock', 0)
     doc = {
         'id': body.get('id') or generate_id(),
         'name': body.get('name', ''),
         'category': body.get('category', 'other'),
         'unit': body.get('unit', 'kg'),
-        'stock_quantity': _to_num(stock or 0),
+        'stock_quantity': _to_num(qty or 0),
         'price_per_unit': _to_num(body.get('price_per_unit') or 0),
         'created_at': body.get('created_at', ''),
     }
+    doc['currentStock'] = doc['stock_quantity']
     from datetime import datetime
     now = datetime.utcnow().isoformat() + 'Z'
     doc['created_at'] = doc['created_at'] or now
     col.insert_one(doc)
+    stock.record_opening(doc['id'], doc['stock_quantity'])
     del doc['_id']
     return _json_response(doc, 201)
 
@@ -1296,22 +1331,48 @@ def materials_detail(request, pk):
             body['stock_quantity'] = _to_num(body.pop('currentStock') or 0)
         if 'price_per_unit' in body:
             body['price_per_unit'] = _to_num(body['price_per_unit'] or 0)
-        result = col.find_one_and_update(
-            {'id': pk},
-            {'$set': body},
-            return_document=True
-        )
-        if not result:
+        body.pop('_id', None)
+        if 'stock_quantity' in body:
+            body['currentStock'] = body['stock_quantity']
+        before = col.find_one_and_update({'id': pk}, {'$set': body}, projection={'_id': 0})
+        if not before:
             return _json_response({'error': 'Not found'}, 404)
-        del result['_id']
-        return _json_response(result)
+        if 'stock_quantity' in body:
+            # A manual stock edit is recorded as a ledger adjustment
+            stock.set_stock(pk, _to_num(before.get('stock_quantity')), body['stock_quantity'])
+        return _json_response({**before, **body})
 
     if request.method == 'DELETE':
         col.delete_one({'id': pk})
         get_collection('material_transactions').delete_many({'materialId': pk})
+        stock.forget_material(pk)
         return _json_response({}, 204)
 
 
+@csrf_exempt
+@require_http_methods(["GET"])
+def material_stock(request, pk):
+    """Stock of one material at the end of ?date=YYYY-MM-DD (default today), from the ledger."""
+    date = request.GET.get('date') or datetime.utcnow().strftime('%Y-%m-%d')
+    try:
+        datetime.strptime(date, '%Y-%m-%d')
+    except ValueError:
+        return _api_error('date must be YYYY-MM-DD', 400)
+    mat = get_collection('materials').find_one({'id': pk}, {'_id': 0, 'stock_quantity': 1, 'unit': 1})
+    if not mat:
+        return _json_response({'error': 'Not found'}, 404)
+    result = stock.stock_on(pk, date)
+    result['unit'] = mat.get('unit')
+    result['currentStock'] = mat.get('stock_quantity', 0)
+    return _json_response(result)
+
+
+def _transaction_delta(doc):
+    """Stock change a material transaction applies: +quantity for 'in', -quantity otherwise."""
+    qty = _to_num(doc.get('quantity', 0))
+    return qty if doc.get('type', 'in') == 'in' else -qty
+
+
 @csrf_exempt
 @require_http_methods(["GET", "POST"])
 def material_transactions_list(request):
@@ -1344,16 +1405,8 @@ def material_transactions_list(request):
         'notes': body.get('notes'),
     }
     col.insert_one(doc)
-    # update material stock
-    mat_col = get_collection('materials')
-    mat = mat_col.find_one({'id': doc['materialId']})
-    if mat:
-        delta = float(doc['quantity']) if doc['type'] == 'in' else -float(doc['quantity'])
-        # Update both for safety/compatibility, but primarily stock_quantity
-        mat_col.update_one(
-            {'id': doc['materialId']}, 
-            {'$inc': {'stock_quantity': delta, 'currentStock': delta}}
-        )
+    # update material stock (no-op for unknown materials)
+    stock.apply_delta(doc['materialId'], _transaction_delta(doc), doc['date'], 'material_transaction', doc['id'])
     del doc['_id']
     return _json_response(doc, 201)
 
@@ -1362,7 +1415,6 @@ def material_transactions_list(request):
 @require_http_methods(["GET", "PUT", "DELETE"])
 def material_transactions_detail(request, pk):
     col = get_collection('material_transactions')
-    mat_col = get_collection('materials')
     if request.method == 'GET':
         doc = col.find_one({'id': pk}, {'_id': 0})
         if not doc:
@@ -1370,43 +1422,32 @@ def material_transactions_detail(request, pk):
         return _json_response(doc)
     if request.method == 'PUT':
         body = _parse_body(request)
-        old = col.find_one({'id': pk}, {'_id': 0})
-        if not old:
-            return _json_response({'error': 'Not found'}, 404)
         allowed = {'materialId', 'type', 'quantity', 'date', 'fieldId', 'cost', 'notes'}
         update = {k: body[k] for k in allowed if k in body}
         if not update:
-            del old['_id']
+            old = col.find_one({'id': pk}, {'_id': 0})
+            if not old:
+                return _json_response({'error': 'Not found'}, 404)
             return _json_response(old)
-        # reverse old stock delta, then apply new
-        mid_old = old.get('materialId')
-        qty_old = old.get('quantity', 0)
-        type_old = old.get('type', 'in')
-        if mid_old:
-            delta_old = float(qty_old) if type_old == 'in' else -float(qty_old)
-            mat_col.update_one({'id': mid_old}, {'$inc': {'stock_quantity': -delta_old, 'currentStock': -delta_old}})
-        result = col.find_one_and_update(
-            {'id': pk}, {'$set': update}, return_document=True
-        )
-        mid_new = result.get('materialId', mid_old)
-        qty_new = result.get('quantity', 0)
-        type_new = result.get('type', 'in')
-        if mid_new:
-            delta_new = float(qty_new) if type_new == 'in' else -float(qty_new)
-            mat_col.update_one({'id': mid_new}, {'$inc': {'stock_quantity': delta_new, 'currentStock': delta_new}})
-        del result['_id']
+        old = col.find_one_and_update({'id': pk}, {'$set': update}, projection={'_id': 0})
+        if not old:
+            return _json_response({'error': 'Not found'}, 404)
+        result = {**old, **update}
+        # reverse old stock delta, then apply new (one net entry if material and date are unchanged)
+        mid_old, mid_new = old.get('materialId'), result.get('materialId')
+        delta_old, delta_new = _transaction_delta(old), _transaction_delta(result)
+        if mid_old == mid_new and old.get('date') == result.get('date'):
+            stock.apply_delta(mid_new, delta_new - delta_old, result.get('date'), 'material_transaction', pk)
+        else:
+            stock.apply_delta(mid_old, -delta_old, old.get('date'), 'material_transaction', pk)
+            stock.apply_delta(mid_new, delta_new, result.get('date'), 'material_transaction', pk)
         return _json_response(result)
     if request.method == 'DELETE':
-        doc = col.find_one({'id': pk}, {'_id': 0})
+        doc = col.find_one_and_delete({'id': pk}, projection={'_id': 0})
         if not doc:
             return _json_response({'error': 'Not found'}, 404)
-        mid = doc.get('materialId')
-        qty = doc.get('quantity', 0)
-        t = doc.get('type', 'in')
-        if mid:
-            add_back = qty if t == 'in' else -qty
-            mat_col.update_one({'id': mid}, {'$inc': {'stock_quantity': -add_back, 'currentStock': -add_back}})
-        col.delete_one({'id': pk})
+        stock.apply_delta(doc.get('materialId'), -_transaction_delta(doc), doc.get('date'),
+                          'material_transaction', pk)
         return _json_response({}, 204)
 
 
@@ -1428,41 +1469,63 @@ def daily_register_list(request):
         return _json_response(items)
 
     body = _parse_body(request)
-    from datetime import datetime
-    now = datetime.utcnow().isoformat() + 'Z'
-    materials_used = body.get('materialsUsed') or []
-    doc = {
+    # A whole day's sheet: [entry, ...] or {"date": ..., "entries": [entry, ...]}
+    if isinstance(body, list) or isinstance(body.get('entries'), list):
+        sheet_date = None if isinstance(body, list) else body.get('date')
+        entries = body if isinstance(body, list) else body['entries']
+        if not entries or not all(isinstance(e, dict) for e in entries):
+            return _api_error('entries must be a non-empty list of objects', 400)
+        docs = _save_register_entries([
+            {**e, 'date': e.get('date') or sheet_date or ''} for e in entries
+        ])
+        return _json_response(docs, 201)
+    return _json_response(_save_register_entries([body])[0], 201)
+
+
+def _register_doc(body):
+    return {
         'id': body.get('id') or generate_id(),
         'date': body.get('date', ''),
         'fieldId': body.get('fieldId', ''),
         'activity': body.get('activity', 'other'),
-        'materialsUsed': materials_used,
+        'materialsUsed': body.get('materialsUsed') or [],
         'laborCost': body.get('laborCost'),
         'waterMinutes': body.get('waterMinutes'),
         'notes': body.get('notes'),
     }
-    col.insert_one(doc)
+
+
+def _save_register_entries(bodies):
+    """Insert register entries with their material usage: one insert_many for the entries, one
+    for the generated 'out' transactions and one bulk stock update, however many entries."""
+    docs = [_register_doc(b) for b in bodies]
+    get_collection('daily_register').insert_many(docs)
+    bump_data_version(*{doc['fieldId'] for doc in docs})
     # record material usage (out transactions) and deduct stock
-    trans_col = get_collection('material_transactions')
-    mat_col = get_collection('materials')
-    for mu in materials_used:
-        mid = mu.get('materialId')
-        qty = mu.get('quantity', 0)
-        if not mid or qty <= 0:
-            continue
-        tdoc = {
-            'id': generate_id(),
-            'materialId': mid,
-            'type': 'out',
-            'quantity': qty,
-            'date': doc['date'],
-            'fieldId': doc['fieldId'],
-            'notes': f"Daily register: {doc.get('activity', '')}",
-        }
-        trans_col.insert_one(tdoc)
-        mat_col.update_one({'id': mid}, {'$inc': {'stock_quantity': -_to_num(qty), 'currentStock': -_to_num(qty)}})
-    del doc['_id']
-    return _json_response(doc, 201)
+    tdocs, changes = [], []
+    for doc in docs:
+        for mu in doc['materialsUsed']:
+            mid = mu.get('materialId') if isinstance(mu, dict) else None
+            qty = _to_num(mu.get('quantity', 0)) if mid else 0
+            if not mid or qty <= 0:
+                continue
+            tdocs.append({
+                'id': generate_id(),
+                'materialId': mid,
+                'type': 'out',
+                'quantity': qty,
+                'date': doc['date'],
+                'fieldId': doc['fieldId'],
+                'notes': f"Daily register: {doc.get('activity', '')}",
+                'registerId': doc['id'],
+            })
+            changes.append((mid, -qty, doc['date'], 'daily_register', doc['id']))
+    if tdocs:
+        get_collection('material_transactions').insert_many(tdocs)
+        stock.apply_deltas(changes)
+    for doc in docs:
+        doc.pop('_id', None)
+    return docs
 
 
 @csrf_exempt
@@ -1482,43 +1545,51 @@ def daily_register_detail(request, pk):
             doc = col.find_one({'id': pk}, {'_id': 0})
             if not doc:
                 return _json_response({'error': 'Not found'}, 404)
-            del doc['_id']
             return _json_response(doc)
-        result = col.find_one_and_update(
-            {'id': pk}, {'$set': update}, return_document=True
-        )
-        if not result:
+        # Read the pre-update doc so both the old and new field are invalidated
+        before = col.find_one_and_update({'id': pk}, {'$set': update}, {'_id': 0})
+        if not before:
             return _json_response({'error': 'Not found'}, 404)
-        del result['_id']
+        result = {**before, **update}
+        bump_data_version(before.get('fieldId'), result.get('fieldId'))
         return _json_response(result)
     if request.method == 'DELETE':
-        doc = col.find_one({'id': pk}, {'_id': 0})
+        doc = col.find_one_and_delete({'id': pk}, projection={'_id': 0})
         if not doc:
             return _json_response({'error': 'Not found'}, 404)
-        
-        # 1. Deduct/Revert stock and delete associated material transactions
-        mat_used = doc.get('materialsUsed') or []
-        if mat_used:
-            mat_col = get_collection('materials')
-            trans_col = get_collection('material_transactions')
-            for mu in mat_used:
-                mid = mu.get('materialId')
-                qty = mu.get('quantity', 0)
-                if mid and qty > 0:
-                    # Revert stock (was 'out', so add back)
-                    mat_col.update_one({'id': mid}, {'$inc': {'stock_quantity': _to_num(qty), 'currentStock': _to_num(qty)}})
-                    # Delete the 'out' transaction created by this register entry
-                    trans_col.delete_many({
-                        'materialId': mid,
-                        'fieldId': doc.get('fieldId'),
-                        'quantity': qty,
-                        'type': 'out',
-                        'date': doc.get('date'),
-                        'notes': {'$regex': f"Daily register:.*"}
-                    })
-        
-        # 2. Finally delete the register entry itself
-        col.delete_one({'id': pk})
+        bump_data_version(doc.get('fieldId'))
+
+        # Revert stock and delete the 'out' transactions this entry generated (linked by registerId)
+        trans_col = get_collection('material_transactions')
+        linked = list(trans_col.find({'registerId': pk}, {'_id': 0, 'materialId': 1, 'quantity': 1, 'date': 1}))
+        if linked:
+            stock.apply_deltas([(t.get('materialId'), _to_num(t.get('quantity')), t.get('date'), 'daily_register', pk)
+                                for t in linked])
+            trans_col.delete_many({'registerId': pk})
+        else:
+            # Quantities normalised as _save_register_entries stored them
+            used = [(mu['materialId'], _to_num(mu.get('quantity', 0))) for mu in doc.get('materialsUsed') or []
+                    if isinstance(mu, dict) and mu.get('materialId')]
+            used = [(mid, qty) for mid, qty in used if qty > 0]
+            if used:
+                # Entry predates registerId links (see `manage.py backfill_register_links`)
+                logger.warning("daily register %s has no linked transactions; matching by content", pk)
+                stock.apply_deltas([(mid, qty, doc.get('date'), 'daily_register', pk) for mid, qty in used])
+                # (materialId, quantity) -> unlinked transaction ids, oldest first
+                candidates = {}
+                for t in trans_col.find({
+                    'registerId': {'$exists': False},
+                    'type': 'out',
+                    'fieldId': doc.get('fieldId'),
+                    'date': doc.get('date'),
+                    'notes': {'$regex': '^Daily register:'},
+                    '$or': [{'materialId': mid, 'quantity': qty} for mid, qty in used],
+                }, {'_id': 1, 'materialId': 1, 'quantity': 1}).sort('_id', 1):
+                    candidates.setdefault((t['materialId'], t['quantity']), []).append(t['_id'])
+                # At most one transaction per material line, as the insert wrote them
+                matched = [candidates[key].pop(0) for key in used if candidates.get(key)]
+                if matched:
+                    trans_col.delete_many({'_id': {'$in': matched}})
         return _json_response({}, 204)
 
 
@@ -1528,61 +1599,7 @@ def daily_register_detail(request, pk):
 @require_http_methods(["GET"])
 def field_recommendations(request):
     """Suggest which fields need attention today (water, last activity, etc.)."""
-    fields_col = get_collection('fields')
-    water_col = get_collection('water_records')
-    daily_col = get_collection('daily_register')
-    fields = list(fields_col.find({}, {'_id': 0}))
-    from datetime import datetime, timedelta
-    today = datetime.utcnow().strftime('%Y-%m-%d')
-    week_ago = (datetime.utcnow() - timedelta(days=7)).strftime('%Y-%m-%d')
-
-    recs = []
-    for f in fields:
-        fid = f.get('id', '')
-        name = f.get('name', 'Field')
-        if f.get('status') == 'not_usable':
-            continue
-        # Last water on this field
-        last_water = list(water_col.find({'fieldId': fid}).sort('date', -1).limit(1))
-        last_daily = list(daily_col.find({'fieldId': fid}).sort('date', -1).limit(1))
-        last_water_date = last_water[0]['date'] if last_water else None
-        last_activity_date = last_daily[0]['date'] if last_daily else None
-        # Suggest irrigation if no water in 3+ days
-        if last_water_date:
-            try:
-                dw = datetime.strptime(last_water_date, '%Y-%m-%d')
-                dt = datetime.strptime(today, '%Y-%m-%d')
-                if (dt - dw).days >= 3:
-                    recs.append({
-                        'fieldId': fid,
-                        'fieldName': name,
-                        'reason': 'irrigation',
-                        'message': f'No irrigation since {last_water_date}. Consider watering.',
-                        'priority': 'high',
-                    })
-            except Exception:
-                pass
-        else:
-            recs.append({
-                'fieldId': fid,
-                'fieldName': name,
-                'reason': 'irrigation',
-                'message': 'No water record yet. Add irrigation if needed.',
-                'priority': 'medium',
-            })
-        # Suggest activity if no daily entry in 5+ days
-        if last_activity_date:
-            try:
-                da = datetime.strptime(last_activity_date, '%Y-%m-%d')
-                dt = datetime.strptime(today, '%Y-%m-%d')
-                if (dt - da).days >= 5:
-                    recs.append({
-                        'fieldId': fid,
-                        'fieldName': name,
-                        'reason': 'activity',
-                        'message': f'No activity since {last_activity_date}. Log today\'s work.',
-                        'priority': 'medium',
-                    })
-            except Exception:
-                pass
+    fields = list(get_collection('fields').find(field_deletion.LIVE, analytics.FIELD_PROJECTION))
+    values, _, _ = analytics.load('field_recommendations', fields, datetime.utcnow().date())
+    recs = [r for f in fields for r in values[f.get('id', '')]]
     return _json_response(recs[:30])
@@ -0,0 +1,12 @@
+"""ASGI entry point: the I/O-bound views run async (api/async_views.py), the rest in a thread pool.
+
+    gunicorn config.asgi:application -k uvicorn_worker.UvicornWorker --workers 1
+"""
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+os.environ.setdefault('ASYNC_VIEWS', 'true')
+
+application = get_asgi_application()
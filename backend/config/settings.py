@@ -32,6 +32,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.metrics.metrics_middleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -74,6 +75,41 @@ MONGO_DB = os.environ.get('MONGO_DB', 'land_management')
 MONGO_CONNECT_TIMEOUT_MS = int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', '30000'))
 MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '30000'))
 
+# Request metrics (/api/metrics). Each gunicorn worker writes its counters to METRICS_DIR;
+# the endpoint merges all worker files. Scrapes need METRICS_TOKEN as a Bearer token when it is
+# set, otherwise a normal login token; METRICS_PUBLIC=true serves them without any check.
+METRICS_DIR = os.environ.get('METRICS_DIR', '')
+METRICS_FLUSH_SECONDS = float(os.environ.get('METRICS_FLUSH_SECONDS', '5'))
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+METRICS_PUBLIC = os.environ.get('METRICS_PUBLIC', 'false').lower() == 'true'
+
+# Temperature reading layout: 'documents' (one doc per reading in temperature_records) or
+# 'buckets' (one doc per field per month in temperature_buckets). Run
+# `python manage.py migrate_temperature_buckets` before switching to 'buckets'.
+TEMPERATURE_STORAGE = os.environ.get('TEMPERATURE_STORAGE', 'documents').strip().lower()
+
+# On-disk cache for /api/tiles/fields/<z>/<x>/<y> (default: <tmp>/slm-tiles), LRU-evicted past the size cap
+TILE_CACHE_DIR = os.environ.get('TILE_CACHE_DIR', '')
+TILE_CACHE_MAX_MB = int(os.environ.get('TILE_CACHE_MAX_MB', '256'))
+
+# `manage.py test` starts a temporary mongod for MongoTestCase suites when MONGO_TEST_URI is
+# unset, and says so on stderr when it cannot (api/tests/runner.py)
+TEST_RUNNER = 'api.tests.runner.MongoTestRunner'
+
+# Seconds a worker trusts its field overlap index before re-reading the tile version token;
+# other workers' field writes can go unnoticed by the overlap check for this long (api/spatial.py)
+SPATIAL_VERSION_TTL = float(os.environ.get('SPATIAL_VERSION_TTL', '1'))
+
+# Pump delivery rate (litres/second) used to turn irrigation minutes into water depth (api/irrigation.py)
+IRRIGATION_FLOW_LPS = float(os.environ.get('IRRIGATION_FLOW_LPS', '28'))
+
+# Max memoized /api/predict results per worker (entries are invalidated by field dataVersion bumps)
+PREDICTION_CACHE_SIZE = int(os.environ.get('PREDICTION_CACHE_SIZE', '1024'))
+
+# Serve dashboard, water analysis, AI and predict from api/async_views.py (async Mongo and LLM
+# calls). Set by config/asgi.py; only useful under an ASGI server such as uvicorn
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', 'false').lower() == 'true'
+
 # CORS - allow only production frontend origins. Never use CORS_ALLOW_ALL_ORIGINS.
 PRODUCTION_CORS_ORIGINS = [
     'https://www.mashorifarm.com',
@@ -136,6 +172,10 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Bulk endpoints (e.g. a season of temperature readings in one POST) need larger bodies than
+# Django's 2.5 MB default.
+DATA_UPLOAD_MAX_MEMORY_SIZE = int(os.environ.get('DATA_UPLOAD_MAX_MEMORY_SIZE', str(32 * 1024 * 1024)))
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Security headers (production-friendly)
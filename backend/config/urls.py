@@ -2,6 +2,8 @@ import logging
 from django.urls import path, include
 from django.http import JsonResponse
 
+from api.metrics import metrics_view
+
 logger = logging.getLogger("api")
 
 def root_view(request):
@@ -59,5 +61,6 @@ urlpatterns = [
     # API endpoints use no trailing slash so they match Next.js /api/* routes without redirects.
     path('api/health', health_view),
     path('api/ready', ready_view),
+    path('api/metrics', metrics_view),
     path('api/', include('api.urls')),
 ]
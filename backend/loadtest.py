@@ -0,0 +1,333 @@
+#!/usr/bin/env python
+"""Concurrent load test against a running API: throughput, latency percentiles and error rates.
+
+    python loadtest.py --url http://localhost:8000 --clients 4,8,16,32 --duration 30
+    python loadtest.py --url https://smart-land-management-api.fly.dev --mix dashboard=70,activity_write=25,ai=5 --json fly.json
+
+Logs in once through /api/auth/login (ADMIN_EMAIL / ADMIN_PASSWORD from the environment or
+backend/.env, or --email/--password) and shares the token: logins are rate-limited per IP.
+Then, for each concurrency level, that many clients replay the operation mix for --duration
+seconds, each on its own keep-alive connection, back to back (or with --think ms between
+requests, like a person clicking). Activities created by `activity_write` are deleted when
+the run ends. Standard library only, so it runs from any machine with Python 3.
+
+Sizing gunicorn: run levels from below to well above the expected concurrency against one
+machine, once per GUNICORN_WORKERS / GUNICORN_THREADS setting (Dockerfile.backend). Throughput
+stops growing and p95 climbs once the workers are saturated; pick the setting with the best
+throughput at an acceptable p95 that still fits the machine's memory.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import date
+from pathlib import Path
+from urllib.parse import urlsplit
+
+# name -> (method, path); activity_write and ai send a body, see _request_for
+OPERATIONS = {
+    "dashboard": ("GET", "/api/dashboard"),
+    "fields": ("GET", "/api/fields"),
+    "activities": ("GET", "/api/activities"),
+    "water": ("GET", "/api/water/analysis"),
+    "recommendations": ("GET", "/api/field-recommendations"),
+    "activity_write": ("POST", "/api/activities"),
+    "ai": ("POST", "/api/ai/chat"),
+}
+DEFAULT_MIX = "dashboard=40,fields=15,activities=15,water=10,activity_write=15,ai=5"
+AI_QUESTIONS = (
+    "Which field needs water first?",
+    "How is my wheat doing this season?",
+    "Which fields are losing money?",
+)
+PERCENTILES = (50, 90, 95, 99)
+
+
+def parse_mix(text):
+    """"dashboard=70,ai=5" -> [("dashboard", 70.0), ("ai", 5.0)]."""
+    mix = []
+    for part in text.split(","):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"unknown operation {name!r} (known: {', '.join(OPERATIONS)})")
+        try:
+            weight = float(weight or 1)
+        except ValueError:
+            raise ValueError(f"weight of {name!r} must be a number")
+        if weight < 0:
+            raise ValueError(f"weight of {name!r} must not be negative")
+        if weight:
+            mix.append((name, weight))
+    if not mix:
+        raise ValueError("the mix is empty")
+    return mix
+
+
+def percentile(values, p):
+    values = sorted(values)
+    if not values:
+        return None
+    k = (len(values) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+def _latency(ms):
+    out = {f"p{p}Ms": round(percentile(ms, p), 1) for p in PERCENTILES} if ms else {f"p{p}Ms": None for p in PERCENTILES}
+    out["maxMs"] = round(max(ms), 1) if ms else None
+    return out
+
+
+def summarize(samples, clients, seconds):
+    """Report for one level. `samples` are (operation, status or None, ms, error or None)."""
+    def block(rows):
+        errors = sum(1 for _, status, _, _ in rows if status is None or status >= 400)
+        return {
+            "requests": len(rows),
+            "errors": errors,
+            "errorRate": round(errors / len(rows), 4) if rows else 0.0,
+            **_latency([ms for _, _, ms, _ in rows]),
+        }
+
+    by_op = {}
+    for row in samples:
+        by_op.setdefault(row[0], []).append(row)
+    return {
+        "clients": clients,
+        "seconds": round(seconds, 2),
+        "throughputRps": round(len(samples) / seconds, 2) if seconds else 0.0,
+        **block(samples),
+        "statuses": dict(sorted(Counter(str(s if s is not None else e) for _, s, _, e in samples).items())),
+        "operations": {name: block(rows) for name, rows in sorted(by_op.items())},
+    }
+
+
+class Client:
+    """One keep-alive connection to the API; reconnects after a network error."""
+
+    def __init__(self, url, token=None, timeout=60, origin=None):
+        parts = urlsplit(url)
+        self.https = parts.scheme == "https"
+        self.host = parts.netloc
+        self.base = parts.path.rstrip("/")
+        self.timeout = timeout
+        self.headers = {"Content-Type": "application/json", "Accept": "application/json"}
+        if token:
+            self.headers["Authorization"] = "Bearer " + token
+        if origin:
+            self.headers["Origin"] = origin
+        self.conn = None
+
+    def request(self, method, path, body=None):
+        """Returns (status, parsed JSON or None). Raises OSError / HTTPException on network errors."""
+        if self.conn is None:
+            cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            self.conn = cls(self.host, timeout=self.timeout)
+        try:
+            self.conn.request(method, self.base + path, body=json.dumps(body) if body is not None else None,
+                              headers=self.headers)
+            response = self.conn.getresponse()
+            raw = response.read()
+        except (OSError, http.client.HTTPException):
+            self.close()
+            raise
+        try:
+            data = json.loads(raw) if raw else None
+        except ValueError:
+            data = None
+        return response.status, data
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+def login(url, email, password, timeout=60, origin=None):
+    client = Client(url, timeout=timeout, origin=origin)
+    try:
+        status, data = client.request("POST", "/api/auth/login", {"email": email, "password": password})
+    finally:
+        client.close()
+    if status != 200 or not (data or {}).get("token"):
+        raise SystemExit(f"login failed ({status}): {(data or {}).get('error', data)}")
+    return data["token"]
+
+
+class Run:
+    """Shared state of one load test: field ids to write against and activities to clean up."""
+
+    def __init__(self, url, token, mix, timeout=60, origin=None, think_ms=0, seed=0):
+        self.url, self.token, self.timeout, self.origin = url, token, timeout, origin
+        self.names = [name for name, _ in mix]
+        self.weights = [weight for _, weight in mix]
+        self.think = think_ms / 1000
+        self.seed = seed
+        self.field_ids = []
+        self.created = []
+        self.lock = threading.Lock()
+
+    def client(self):
+        return Client(self.url, self.token, self.timeout, self.origin)
+
+    def prepare(self):
+        """Field ids for activity writes (only needed when the mix writes)."""
+        if "activity_write" not in self.names:
+            return
+        client = self.client()
+        try:
+            status, data = client.request("GET", "/api/fields")
+        finally:
+            client.close()
+        self.field_ids = [f["id"] for f in data or [] if f.get("status") != "not_usable"] if status == 200 else []
+        if not self.field_ids:
+            raise SystemExit("activity_write needs at least one usable field (GET /api/fields returned none)")
+
+    def _request_for(self, name, rng):
+        method, path = OPERATIONS[name]
+        if name == "activity_write":
+            return method, path, {
+                "date": date.today().isoformat(), "field_id": rng.choice(self.field_ids),
+                "activity_type": "labor", "cost": rng.randint(1, 20) * 100, "notes": "loadtest",
+            }
+        if name == "ai":
+            return method, path, {"message": rng.choice(AI_QUESTIONS)}
+        return method, path, None
+
+    def _worker(self, index, deadline, samples):
+        rng = random.Random(f"{self.seed}:{index}")
+        client = self.client()
+        try:
+            while time.monotonic() < deadline:
+                name = rng.choices(self.names, self.weights)[0]
+                method, path, body = self._request_for(name, rng)
+                started = time.perf_counter()
+                try:
+                    status, data = client.request(method, path, body)
+                    error = None
+                except (OSError, http.client.HTTPException) as e:
+                    status, data, error = None, None, type(e).__name__
+                samples.append((name, status, (time.perf_counter() - started) * 1000, error))
+                if name == "activity_write" and status == 201 and isinstance(data, dict) and data.get("id"):
+                    with self.lock:
+                        self.created.append(data["id"])
+                if self.think:
+                    time.sleep(rng.uniform(0.5, 1.5) * self.think)
+        finally:
+            client.close()
+
+    def level(self, clients, seconds):
+        """Run `clients` concurrent clients for `seconds`; returns the level's report."""
+        samples = []  # list.append is atomic, so workers share one list
+        deadline = time.monotonic() + seconds
+        started = time.perf_counter()
+        threads = [threading.Thread(target=self._worker, args=(i, deadline, samples), daemon=True)
+                   for i in range(clients)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return summarize(samples, clients, time.perf_counter() - started)
+
+    def cleanup(self):
+        """Delete the activities this run created. Returns how many could not be deleted."""
+        client = self.client()
+        failed = 0
+        try:
+            for activity_id in self.created:
+                try:
+                    status, _ = client.request("DELETE", f"/api/activities/{activity_id}")
+                except (OSError, http.client.HTTPException):
+                    status = None
+                failed += status not in (200, 204)
+        finally:
+            client.close()
+        return failed
+
+
+def _print_level(report, out):
+    lat = lambda r: " ".join(f"p{p} {r[f'p{p}Ms']:>8}" for p in (50, 95, 99))
+    out.write(f"\n{report['clients']:>4} clients  {report['throughputRps']:>8.1f} req/s  "
+              f"errors {report['errorRate'] * 100:5.1f}%  {lat(report)} ms  ({report['requests']} requests)\n")
+    for name, op in report["operations"].items():
+        out.write(f"     {name:16} {op['requests']:>7}  errors {op['errorRate'] * 100:5.1f}%  {lat(op)} ms\n")
+    out.write(f"     statuses: {', '.join(f'{k} x{v}' for k, v in report['statuses'].items())}\n")
+
+
+def _load_env():
+    """ADMIN_EMAIL / ADMIN_PASSWORD from backend/.env when python-dotenv is installed."""
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        return
+    env_path = Path(__file__).resolve().parent / ".env"
+    if env_path.exists():
+        load_dotenv(env_path)
+
+
+def main(argv=None):
+    _load_env()
+    parser = argparse.ArgumentParser(description="Concurrent load test against a running API.")
+    parser.add_argument("--url", default="http://localhost:8000", help="API base URL (default http://localhost:8000).")
+    parser.add_argument("--email", default=os.environ.get("ADMIN_EMAIL", ""), help="Login email (default ADMIN_EMAIL).")
+    parser.add_argument("--password", default=os.environ.get("ADMIN_PASSWORD", ""),
+                        help="Login password (default ADMIN_PASSWORD).")
+    parser.add_argument("--clients", default="1,4,16", help="Concurrency levels, comma-separated (default 1,4,16).")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds per level (default 30).")
+    parser.add_argument("--mix", default=DEFAULT_MIX,
+                        help=f"Operation weights (default {DEFAULT_MIX}). Operations: {', '.join(OPERATIONS)}.")
+    parser.add_argument("--think", type=float, default=0, help="Mean pause between a client's requests, ms (default 0).")
+    parser.add_argument("--timeout", type=float, default=60, help="Per-request timeout, seconds (default 60).")
+    parser.add_argument("--origin", help="Origin header to send (for CORS-restricted deployments).")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the request sequence (default 0).")
+    parser.add_argument("--json", help="Also write the full report to this file.")
+    args = parser.parse_args(argv)
+
+    try:
+        mix = parse_mix(args.mix)
+        levels = [int(n) for n in args.clients.split(",") if n.strip()]
+    except ValueError as e:
+        parser.error(str(e))
+    if not levels or min(levels) < 1 or args.duration <= 0:
+        parser.error("--clients must be positive integers and --duration positive")
+    if not args.email or not args.password:
+        parser.error("pass --email/--password or set ADMIN_EMAIL/ADMIN_PASSWORD")
+
+    token = login(args.url, args.email, args.password, args.timeout, args.origin)
+    run = Run(args.url, token, mix, args.timeout, args.origin, args.think, args.seed)
+    run.prepare()
+    report = {
+        "url": args.url,
+        "mix": dict(mix),
+        "durationSeconds": args.duration,
+        "thinkMs": args.think,
+        "levels": [],
+    }
+    out = sys.stdout
+    out.write(f"Load test {args.url}: mix {args.mix}, {args.duration:g}s per level\n")
+    try:
+        for clients in levels:
+            report["levels"].append(run.level(clients, args.duration))
+            _print_level(report["levels"][-1], out)
+    finally:
+        failed = run.cleanup()
+        out.write(f"\nRemoved {len(run.created) - failed} test activit{'y' if len(run.created) - failed == 1 else 'ies'}"
+                  + (f"; {failed} could not be deleted\n" if failed else "\n"))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+            fh.write("\n")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -11,7 +11,8 @@ const CROPS = ["wheat", "rice", "cotton", "sugarcane", "maize"];
 type CropHealthResult = {
   fieldId: string;
   healthScore: number;
-  ndvi: number;
+  ndvi: number | null;
+  ndviStats?: import("@/types").FieldNdvi | null;
   recommendation: string;
   factorsUsed?: string[];
   aiSummary?: string;
@@ -205,7 +206,10 @@ export default function PredictionsPage() {
                   <p className="text-emerald-500 font-black text-sm uppercase tracking-widest">{t("healthScore")}</p>
                   <p className="text-2xl font-black text-emerald-400">{cropHealth.healthScore}%</p>
                 </div>
-                <p className="text-xs text-theme-muted font-bold">NDVI INDEX: {cropHealth.ndvi}</p>
+                <p className="text-xs text-theme-muted font-bold">
+                  NDVI INDEX: {cropHealth.ndvi ?? "no satellite data"}
+                  {cropHealth.ndviStats && ` (${cropHealth.ndviStats.date}, p10–p90 ${cropHealth.ndviStats.p10}–${cropHealth.ndviStats.p90})`}
+                </p>
                 <div className="p-3 rounded-lg bg-white/5 border border-white/5 text-sm text-theme italic">
                   "{cropHealth.recommendation}"
                 </div>
@@ -14,13 +14,15 @@ import {
   TrendingUp,
   AlertCircle,
   Cloud,
+  Leaf,
 } from "lucide-react";
 import { useLandStore } from "@/lib/store";
+import { api } from "@/lib/api";
 import { format } from "date-fns";
 import { centroid } from "@/lib/geo";
 import { fetchLiveWeather, clearWeatherCache, type LiveWeatherResult } from "@/lib/weather";
 import { computeFieldActivity, type FieldActivityStats } from "@/lib/fieldActivity";
-import type { GeoFence } from "@/types";
+import type { FieldNdvi, GeoFence } from "@/types";
 
 const DEFAULT_CENTER: [number, number] = [31.5204, 74.3587];
 
@@ -104,6 +106,11 @@ export default function SatellitePage() {
   const [weatherRefreshing, setWeatherRefreshing] = useState(false);
 
   const { live: liveWeather, refresh: refreshWeather } = useLiveWeatherForFields(fields);
+  const [ndviByField, setNdviByField] = useState<Record<string, FieldNdvi>>({});
+
+  useEffect(() => {
+    api.getNdvi().then(setNdviByField).catch(() => setNdviByField({}));
+  }, []);
 
   const fieldLiveTemp = useMemo(() => {
     const out: Record<string, number> = {};
@@ -233,11 +240,12 @@ export default function SatellitePage() {
               Field health & activity (real data)
             </h3>
             <p className="mb-4 text-sm text-theme-muted">
-              Activity score from your records: water, expenses, temperature, and data bank. Live temperature from weather API where available.
+              Activity score from your records: water, expenses, temperature, and data bank. NDVI from processed satellite scenes; live temperature from weather API where available.
             </p>
             <div className="grid gap-3 sm:gap-4 grid-cols-1 xs:grid-cols-2 lg:grid-cols-3">
               {activityStats.map((stat) => {
                 const liveTemp = fieldLiveTemp[stat.fieldId];
+                const vegetation = ndviByField[stat.fieldId];
                 return (
                   <div
                     key={stat.fieldId}
@@ -264,6 +272,12 @@ export default function SatellitePage() {
                       </span>
                     </div>
                     <div className="space-y-1.5 text-xs text-theme-muted">
+                      {vegetation && (
+                        <p className="flex items-center gap-2 text-green-400">
+                          <Leaf className="h-3.5 w-3.5" />
+                          NDVI {vegetation.mean.toFixed(2)} (p10–p90 {vegetation.p10.toFixed(2)}–{vegetation.p90.toFixed(2)}) · {format(new Date(vegetation.date), "MMM d")}
+                        </p>
+                      )}
                       {liveTemp != null && (
                         <p className="flex items-center gap-2 text-orange-300">
                           <Cloud className="h-3.5 w-3.5" />
@@ -59,7 +59,7 @@ export default function MapView() {
 
   const handleDetectAddress = useCallback(async () => {
     if (!selectedField || !selectedField.coordinates?.length) return;
-    const center = selectedField.coordinates[0];
+    const center = selectedField.centroid ?? selectedField.coordinates[0];
     const { reverseGeocode } = await import("@/lib/geo");
     const result = await reverseGeocode(center.lat, center.lng);
     if (result) {
@@ -1,11 +1,12 @@
 "use client";
 
-import { useState, useCallback, useEffect, useMemo } from "react";
-import { MapContainer, TileLayer, Polygon, Popup, Circle, useMap } from "react-leaflet";
+import { useState, useCallback, useEffect, useMemo, useRef } from "react";
+import { MapContainer, TileLayer, Polygon, Popup, Circle, useMap, useMapEvents } from "react-leaflet";
 import L from "leaflet";
 import "leaflet/dist/leaflet.css";
 import { MAPBOX_TOKEN, getMapboxTileUrl } from "@/lib/mapbox";
 import { getArea } from "@/lib/field-utils";
+import { api } from "@/lib/api";
 
 const SATELLITE_URL = MAPBOX_TOKEN
   ? getMapboxTileUrl("satellite")
@@ -68,6 +69,26 @@ function MapInstanceHandler({ setMapInstance }) {
   return null;
 }
 
+// Loads only the fields in view (GET /fields/within), with outlines simplified for the current
+// zoom, whenever the map settles or `fields` changes.
+// Reports null on failure so the map falls back to the full list.
+function ViewportFields({ fields, onLoad }) {
+  const map = useMap();
+  const latest = useRef(0);
+  const load = useCallback(() => {
+    const request = ++latest.current;
+    api.getFieldsWithin(map.getBounds().toBBoxString(), map.getZoom())
+      .then((items) => request === latest.current && onLoad(items))
+      .catch(() => request === latest.current && onLoad(null));
+  }, [map, onLoad]);
+
+  useMapEvents({ moveend: load });
+  useEffect(() => {
+    load();
+  }, [load, fields]);
+  return null;
+}
+
 export default function MapComponent({
   mapInstance,
   setMapInstance,
@@ -81,6 +102,7 @@ export default function MapComponent({
   sidebarCollapsed,
   children,
 }) {
+  const [visibleFields, setVisibleFields] = useState(null);
   const activeLayer = useMemo(
     () => MAP_LAYERS.find((l) => l.id === viewMode) ?? MAP_LAYERS[0],
     [viewMode]
@@ -106,6 +128,7 @@ export default function MapComponent({
         style={{ background: "#0d1117" }}
       >
         <MapInstanceHandler setMapInstance={setMapInstance} />
+        <ViewportFields fields={fields} onLoad={setVisibleFields} />
 
         {preview && <MapCenterer center={preview.center} zoom={16} />}
         {preview && preview.coordinates.length >= 2 && <FitBounds coords={preview.coordinates} />}
@@ -120,7 +143,7 @@ export default function MapComponent({
           errorTileUrl="https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png"
         />
 
-        {fields?.filter(field => field?.coordinates?.length > 0).map((field, index) => {
+        {(visibleFields ?? fields)?.filter(field => field?.coordinates?.length > 0).map((field, index) => {
           const colors = statusColors[field.status] || statusColors.cultivated;
           const isSelected = selectedField?.id === field.id;
 
@@ -136,7 +159,8 @@ export default function MapComponent({
                 opacity: 0.9,
               }}
               eventHandlers={{
-                click: () => onFieldClick?.(field),
+                // Hand out the stored field, not the simplified outline drawn here
+                click: () => onFieldClick?.(fields.find((f) => f.id === field.id) ?? field),
               }}
             >
               <Popup maxWidth={350} minWidth={300}>
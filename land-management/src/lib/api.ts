@@ -76,6 +76,38 @@ export const api = {
   async getFields() {
     return fetchJson<import('@/types').GeoFence[]>('/fields');
   },
+  /** Fields intersecting the map viewport; `bbox` is Leaflet's `getBounds().toBBoxString()`.
+   * With `zoom`, outlines are simplified to what that zoom can show. */
+  async getFieldsWithin(bbox: string, zoom?: number) {
+    const params = new URLSearchParams({ bbox });
+    if (zoom !== undefined) params.set('zoom', String(zoom));
+    return fetchJson<import('@/types').GeoFence[]>(`/fields/within?${params}`);
+  },
+  /** Field outlines for one XYZ map tile, clipped and quantized to a 4096 grid (`extent`). */
+  async getFieldTile(z: number, x: number, y: number) {
+    return fetchJson<{
+      z: number; x: number; y: number; extent: number;
+      features: {
+        id: string;
+        properties: { name: string; status: import('@/types').LandStatus; area?: number };
+        geometry: { type: 'Polygon'; coordinates: number[][][] };
+      }[];
+    }>(`/tiles/fields/${z}/${x}/${y}`);
+  },
+  /** Latest NDVI statistics per field, keyed by field id. */
+  async getNdvi() {
+    return fetchJson<Record<string, import('@/types').FieldNdvi>>('/ndvi');
+  },
+  /** NDVI statistics for one field, newest first (at most `limit` scenes). */
+  async getFieldNdvi(id: string, limit = 30) {
+    return fetchJson<import('@/types').FieldNdvi[]>(`/fields/${id}/ndvi?limit=${limit}`);
+  },
+  /** Fields within `radius` metres of a point, nearest first. */
+  async getFieldsNear(lat: number, lng: number, radius = 1000) {
+    return fetchJson<(import('@/types').GeoFence & { distance: number })[]>(
+      `/fields/near?lat=${lat}&lng=${lng}&radius=${radius}`
+    );
+  },
   async addField(field: Omit<import('@/types').GeoFence, 'id'> & { id?: string }) {
     return fetchJson<import('@/types').GeoFence>('/fields', {
       method: 'POST',
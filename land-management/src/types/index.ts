@@ -12,7 +12,12 @@ export interface GeoFence {
   id: string;
   name: string;
   coordinates: Coordinates[];
+  /** Acres; measured by the server from `coordinates` when they form a polygon. */
   area?: number;
+  areaM2?: number | null;
+  centroid?: Coordinates | null;
+  /** [west, south, east, north] */
+  bbox?: [number, number, number, number] | null;
   status: LandStatus;
   notUsableReason?: string;
   address?: string;
@@ -80,9 +85,11 @@ export interface WaterFieldAnalysis {
   fieldId: string;
   fieldName: string;
   lastWaterDate: string | null;
-  lastDurationMinutes: number;
+  lastDurationMinutes: number | null;
   suggestedNextDate: string;
   suggestedMinutes: number;
+  depletionMm: number;
+  etcMmPerDay: number;
   warning: string | null;
   aiNote: string | null;
 }
@@ -121,6 +128,25 @@ export interface AIRecommendation {
   createdAt: string;
 }
 
+/** Per-field NDVI statistics from one satellite scene (backend `compute_ndvi`). */
+export interface FieldNdvi {
+  fieldId: string;
+  date: string;
+  scene: string;
+  mean: number;
+  median: number;
+  p10: number;
+  p25: number;
+  p75: number;
+  p90: number;
+  min: number;
+  max: number;
+  stdDev: number;
+  pixelCount: number;
+  coverage: number;
+  computedAt: string;
+}
+
 export interface CropHealthData {
   fieldId: string;
   ndvi?: number;